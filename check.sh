@@ -1,7 +1,23 @@
 #!/usr/bin/env bash
 
+# Usage: ./check.sh [--track [seconds]]
+#   --track: then follow ledger close and validation timings on the same nodes (until interrupted if no seconds)
+
 address=$(docker network inspect config_rippled-net | jq -r '.[0].IPAM.Config[0].Subnet')
 address=$(echo "${address%${address##*.}}")
-curl ${address}{3,4,5,6,7,8,9}:5005 \
+# Every validator and the workload node
+nodes=$(echo ${address}{3,4,5,6,7,8,9})
+curl $(printf "%s:5005 " ${nodes}) \
     --silent \
     --data '{"method": "server_info"}' | jq -r '.result.info | {hostid, build_version, complete_ledgers, server_state, uptime, peers, validated_ledger, last_close, closed_ledger}'
+
+if [ "$1" = "--track" ]; then
+  docker run --rm -it \
+    -v $(realpath config/volumes/workload):/root \
+    -w /root/auto \
+    --network config_rippled-net \
+    --name tmp_consensus_tracker \
+    workload:antithesis python3 scripts/track_consensus.py \
+      --nodes $(printf "%s:6005," ${nodes} | sed 's/,$//') \
+      --duration "${2:-0}"
+fi
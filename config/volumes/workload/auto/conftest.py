@@ -6,11 +6,18 @@ import time
 import signal
 import sys
 
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests.async_rippled import AsyncRippledServer
 from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests.rippled import RippledServer
 from rippled_automation.rippled_end_to_end_scenarios.clio_tests.clio import ClioServer
 from rippled_automation.rippled_end_to_end_scenarios.sidechain import sidechain_config
 from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
 from rippled_automation.rippled_end_to_end_scenarios.utils import helper
+from rippled_automation.rippled_end_to_end_scenarios.utils.account_pool import AccountPool
+from rippled_automation.rippled_end_to_end_scenarios.utils.latency import TransactionLatencyRecorder
+from rippled_automation.rippled_end_to_end_scenarios.utils.ledger_driver import StandaloneLedgerDriver
+from rippled_automation.rippled_end_to_end_scenarios.utils.node_pool import NodePool, POLICY_ROUND_ROBIN
+from rippled_automation.rippled_end_to_end_scenarios.utils.transport import HttpTransport
+from rippled_automation.rippled_end_to_end_scenarios.utils.tx_signer import RequestSigner
 from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
 
 home_dir = str(pathlib.Path.home())
@@ -18,6 +25,7 @@ repo_base_dir = os.path.dirname(os.path.realpath(__file__))
 log = log_helper.get_logger()
 log_dir = None
 fx_rippled_info = {}
+latency_recorder = None
 funding_accounts_info = {}
 
 
@@ -41,6 +49,10 @@ def pytest_configure(config):
     cmd_args.multipleTestSuiteInParallel = True if cmd_args.multipleTestSuiteInParallel == "true" else False
 
     log_helper.setup_logging(cmd_args)
+    HttpTransport.configure(pool_size=cmd_args.httpPoolSize, read_timeout=cmd_args.httpTimeout,
+                            keep_alive=False if cmd_args.httpKeepAlive == "false" else True)
+    StandaloneLedgerDriver.configure(batch_size=cmd_args.standaloneLedgerBatchSize,
+                                     interval=cmd_args.standaloneLedgerInterval)
     helper.update_parallel_run_pid_file(constants.TEST_RUN_PID_TEST_RESULT_DIR_KEY, log_dir)
     log.info("****************************************************************************************************")
     log.info("Log directory: {}".format(log_dir))
@@ -61,6 +73,30 @@ def pytest_addoption(parser):
                      default="{}/automation_data".format(home_dir))
     parser.addoption("--publishStats", help="Publish stats to prometheus", default=False)
     parser.addoption('--useWebsockets', default=False, help="Use websockets instead of JSON-RPC")
+    parser.addoption("--httpPoolSize", help="Max keep-alive JSON-RPC connections per server",
+                     default=constants.HTTP_POOL_SIZE)
+    parser.addoption("--httpTimeout", help="JSON-RPC read timeout in seconds", default=constants.HTTP_READ_TIMEOUT)
+    parser.addoption("--httpKeepAlive", help="Set to false to open a new connection per JSON-RPC request",
+                     default=True)
+    parser.addoption("--wsPort", help="rippled websocket port for ledger/transaction streams (0 to poll instead)",
+                     default=constants.WS_STREAM_PORT)
+    parser.addoption("--standaloneLedgerBatchSize", help="Submissions closing a ledger right away in standalone mode",
+                     default=constants.STANDALONE_LEDGER_BATCH_SIZE)
+    parser.addoption("--standaloneLedgerInterval",
+                     help="Seconds a submission waits for its ledger to close in standalone mode",
+                     default=constants.STANDALONE_LEDGER_INTERVAL)
+    parser.addoption("--accountPoolSize", help="Pre-funded accounts kept ready for tests (0 to fund on demand)",
+                     default=constants.ACCOUNT_POOL_SIZE)
+    parser.addoption("--localSigning", help="Set to true to sign transactions locally and submit tx_blobs",
+                     default="false")
+    parser.addoption("--nodePool", help="Comma-separated host:port of more rippled nodes to spread requests over",
+                     default=None)
+    parser.addoption("--nodePolicy", help="Node pool policy (round_robin, least_outstanding)",
+                     default=POLICY_ROUND_ROBIN)
+    parser.addoption("--fundingTickets", help="Set to true to fund accounts with tickets of the funding account",
+                     default="false")
+    parser.addoption("--latencySummary", help="Write submit/validation latency histograms to this JSON file",
+                     default=None)
     parser.addoption("--rippled", help="rippled exec", default="/opt/ripple/bin/rippled")
     parser.addoption("--rippledConfig", help="rippled config", default="/opt/ripple/etc/rippled.cfg")
     parser.addoption("--standaloneMode", help="Set to true if rippled is started in standalone mode", default=False)
@@ -82,13 +118,22 @@ def pytest_keyboard_interrupt(excinfo):
 
 @pytest.fixture(scope="session")
 def fx_rippled(request):
+    global latency_recorder
     sidechain = None
     witnesses = None
     feature = cmd_args.feature
     address = f"{cmd_args.hostname}:{cmd_args.port}"
+    ws_address = f"{cmd_args.hostname}:{cmd_args.wsPort}" if int(cmd_args.wsPort) else None
     use_websockets = True if cmd_args.useWebsockets == "true" else False
     xchain_bridge_create = True if cmd_args.xchainBridgeCreate == "true" else False
     standalone_mode = True if cmd_args.standaloneMode == "true" else False
+    signer = RequestSigner() if cmd_args.localSigning == "true" else None
+    funding_tickets = True if cmd_args.fundingTickets == "true" else False
+    node_pool = None
+    if cmd_args.nodePool:
+        node_addresses = [address] + [node for node in cmd_args.nodePool.split(",") if node != address]
+        node_pool = NodePool([AsyncRippledServer(node_address, use_websockets=use_websockets, server_name=node_address)
+                              for node_address in node_addresses], policy=cmd_args.nodePolicy)
     sidechain_setup_config = sidechain_config.get_sidechain_config(standalone_mode, cmd_args.network) \
         if cmd_args.sidechainConfig is None else cmd_args.sidechainConfig
 
@@ -103,10 +148,14 @@ def fx_rippled(request):
             pytest.exit("**** Failed to initialize locking chain/create funding account. Check logs for more info")
 
     else:
+        if cmd_args.latencySummary:
+            latency_recorder = TransactionLatencyRecorder()
         try:
             rippled_server = RippledServer(address=address, use_websockets=use_websockets, rippled_exec=cmd_args.rippled,
                                            rippled_config=cmd_args.rippledConfig,
-                                           standalone_mode=standalone_mode)
+                                           standalone_mode=standalone_mode, ws_address=ws_address,
+                                           funding_tickets=funding_tickets, signer=signer, node_pool=node_pool,
+                                           latency_recorder=latency_recorder)
         except Exception as e:
             pytest.exit("**** Failed to initialize rippled server/create funding account. Check logs for more info")
 
@@ -120,6 +169,9 @@ def fx_rippled(request):
 
     save_testrun_info(rippled_server=rippled_server, clio_server=clio_server, feature=feature)
 
+    if latency_recorder:
+        latency_recorder.start_publishing(summary_path=cmd_args.latencySummary)
+
     prometheus_handle = None
     if cmd_args.publishStats == "true":
         log.info("**** Initializing prometheus client handler...")
@@ -139,6 +191,14 @@ def fx_rippled(request):
     }
 
 
+@pytest.fixture(scope="session")
+def fx_account_pool(fx_rippled):
+    account_pool = AccountPool(fx_rippled["rippled_server"], size=cmd_args.accountPoolSize)
+    account_pool.start()
+    yield account_pool
+    account_pool.stop()
+
+
 def save_testrun_info(rippled_server=None, clio_server=None, feature=None):
     server = rippled_server if rippled_server else clio_server
 
@@ -171,8 +231,21 @@ def save_testrun_info(rippled_server=None, clio_server=None, feature=None):
     log.info("")
 
 
+def is_offline_test_suite(module):
+    """
+    Test modules setting offlineTestSuite (unit tests of the client code) need no server
+    """
+    return "offlineTestSuite" in dir(module)
+
+
 @pytest.fixture(autouse=True)
-def pre_and_post_test(request, fx_rippled):
+def pre_and_post_test(request):
+    if is_offline_test_suite(request.module):
+        log.info("Testname: {}".format(request.node.name))
+        yield
+        return
+
+    fx_rippled = request.getfixturevalue("fx_rippled")
     if "standaloneModeOnly" in dir(request.module) and not fx_rippled["rippled_server"].standalone_mode:
         pytest.skip("Amendment Blocked on network")
     elif "skipTestSuite" in dir(request.module):
@@ -201,7 +274,12 @@ def pre_and_post_test(request, fx_rippled):
 
 
 @pytest.fixture(scope='session', autouse=True)
-def pre_and_post_session(fx_rippled):
+def pre_and_post_session(request):
+    if all(is_offline_test_suite(item.module) for item in request.session.items):
+        yield
+        return
+
+    fx_rippled = request.getfixturevalue("fx_rippled")
     global fx_rippled_info
     fx_rippled_info = fx_rippled
     for rippled_server in [fx_rippled["rippled_server"], fx_rippled["sidechain"]]:
@@ -216,6 +294,16 @@ def pre_and_post_session(fx_rippled):
         pytest.exit("**** Failed to initialize clio server. Check logs for more info")
 
     yield
+    for rippled_server in [fx_rippled["rippled_server"], fx_rippled["sidechain"]]:
+        if rippled_server:
+            rippled_server.aio.close()
+    if latency_recorder:
+        latency_recorder.stop()
+        latency_recorder.log_summary()
+    for address, stats in HttpTransport.get_all_stats().items():
+        log.info("**** {}: {} requests, {} new connections, {} reused connections".format(
+            address, stats["requests"], stats["new_connections"], stats["reused_connections"]))
+
     if cmd_args.publishStats == "true":
         log.info("Wait 20 seconds for prometheus to scrape the last metric before exiting this module (and web server)")
         time.sleep(20)
@@ -11,10 +11,10 @@ log = log_helper.get_logger()
 
 
 @pytest.fixture(scope="session")
-def create_max_valid_accounts_with_one_oracle_each(fx_rippled):
+def create_max_valid_accounts_with_one_oracle_each(fx_rippled, fx_account_pool):
     rippled_server = fx_rippled["rippled_server"]
     log.info(f"Creating {constants.MAX_ACCOUNT_COUNT_FOR_PRICE_ORACLE_AGGREGATE} accounts")
-    accounts = [rippled_server.create_account(fund=True, verbose=False) for _ in range(constants.MAX_ACCOUNT_COUNT_FOR_PRICE_ORACLE_AGGREGATE)]
+    accounts = fx_account_pool.get_accounts(constants.MAX_ACCOUNT_COUNT_FOR_PRICE_ORACLE_AGGREGATE)
 
     log.info(f"Creating a PriceOracle for each of the {constants.MAX_ACCOUNT_COUNT_FOR_PRICE_ORACLE_AGGREGATE} accounts")
     for account in accounts:
@@ -0,0 +1,643 @@
+import asyncio
+import concurrent.futures
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.src.commands.account import Account
+from rippled_automation.rippled_end_to_end_scenarios.utils import keypairs
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.utils.ledger_driver import StandaloneLedgerDriver
+from rippled_automation.rippled_end_to_end_scenarios.utils.ledger_events import LedgerCloseMonitor
+from rippled_automation.rippled_end_to_end_scenarios.utils.sequence_allocator import SequenceAllocator
+from rippled_automation.rippled_end_to_end_scenarios.utils.ticket_manager import TicketManager
+from rippled_automation.rippled_end_to_end_scenarios.utils.transport import HttpTransport
+from rippled_automation.rippled_end_to_end_scenarios.utils.tx_tracker import TransactionTracker
+from rippled_automation.rippled_end_to_end_scenarios.utils.ws_client import WebSocketClient
+
+log = log_helper.get_logger()
+
+
+def to_websocket_command(data):
+    """
+    Convert a JSON-RPC request ({"method": ..., "params": [{...}]}) to websocket format ({"command": ..., ...})
+    """
+    new_data = deepcopy(data)
+    if 'command' not in data:
+        command = new_data.get('method')
+        del new_data['method']
+        new_data.update({"command": command})
+        params = new_data.get('params')[0]
+        del new_data['params']
+        new_data.update(params)
+    log.debug(new_data)
+    return new_data
+
+
+class AsyncRippledServer:
+    """
+    Asyncio API to a rippled server.
+
+    Every RPC is awaitable, so a single event loop can keep hundreds of requests in flight. Over websockets all of
+    them are multiplexed on the server's persistent connection; over HTTP they are served by the pooled keep-alive
+    transport from a thread pool sized to the connection pool. Ledger and validation waits block on the shared ledger
+    and transactions streams of ws_address (the RPC address itself over websockets) and poll only if those are
+    unavailable. In standalone mode no ledger closes on its own: a StandaloneLedgerDriver closes them in batches and
+    waits poll. With funding_tickets, fund_account() pays from the funding account with tickets (TicketManager), so
+    concurrent fundings do not queue up on its sequence.
+
+    Optional features are collaborators passed in by the caller: a RequestSigner signs transactions on the client, a
+    NodePool spreads requests over several nodes, a TransactionLatencyRecorder times submissions, a TrafficRecorder
+    logs every request and response, and a wallet_rng makes the wallets of create_account() reproducible.
+    RippledServer wraps an instance of this class for its wire protocol and retry policy, so both share connections to
+    the same server.
+    """
+    def __init__(self, address=None, use_websockets=False, server_name=constants.RIPPLED_SERVER_NAME,
+                 standalone_mode=False, funding_account=None, ws_address=None, funding_tickets=False, signer=None,
+                 node_pool=None, latency_recorder=None, traffic_recorder=None, wallet_rng=None):
+        """
+        @param signer: RequestSigner signing transactions on the client, None to sign on the server
+        @param node_pool: NodePool of the nodes to spread requests over, None to send every request to address
+        @param latency_recorder: TransactionLatencyRecorder timing every transaction submitted
+        @param traffic_recorder: TrafficRecorder logging every request and response
+        @param wallet_rng: random.Random drawing the seeds of create_account() wallets
+        """
+        proto = "ws" if use_websockets else "http"
+        self.websockets = use_websockets
+        self.address = f"{proto}://{address}"
+        self.transport = None if use_websockets else HttpTransport.get(self.address)
+        self.ws_client = WebSocketClient.get(self.address) if use_websockets else None
+        if ws_address is None and use_websockets and not standalone_mode:
+            ws_address = address
+        if standalone_mode:
+            ws_address = None
+        self.ledger_driver = StandaloneLedgerDriver(self._send_request) if standalone_mode else None
+        self.ledger_monitor = LedgerCloseMonitor.get(f"ws://{ws_address}") if ws_address else None
+        self.tx_tracker = TransactionTracker.get(f"ws://{ws_address}") if ws_address else None
+        self.sequence_allocator = SequenceAllocator.get(self.address)
+        self.name = server_name
+        self.standalone_mode = standalone_mode
+        self.funding_account = funding_account
+        self.network_id = None
+        self._network_id_fetched = False
+        self.funding_tickets = funding_tickets
+        self.signer = signer
+        self.node_pool = node_pool
+        self.latency_recorder = latency_recorder
+        self.traffic_recorder = traffic_recorder
+        self.wallet_rng = wallet_rng
+        self._executor = None
+        if latency_recorder and self.tx_tracker:
+            latency_recorder.attach(self.tx_tracker)
+
+    @staticmethod
+    def get_loop():
+        """
+        Background event loop used to run this API from synchronous code
+        """
+        return WebSocketClient.get_loop()
+
+    def run(self, coroutine, timeout=constants.ASYNC_RUN_TIMEOUT):
+        """
+        Run a coroutine on the background event loop and wait for its result. Must not be called from that loop
+        @param coroutine: coroutine object (example: server.tx(tx_id))
+        @param timeout: seconds to wait for the result before cancelling the coroutine (None to wait forever)
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.get_loop())
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        if self.ledger_driver:
+            self.ledger_driver.close()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def send_request(self, request, account_id=None):
+        """
+        Send a JSON-RPC request and return the decoded response in JSON-RPC format ({"result": {...}})
+        @param request: dict with "method" and "params"
+        @param account_id: account the request is for, keeping an account's requests on one node of a node pool
+        """
+        if self.ledger_driver:
+            await self.ledger_driver.before_request(request)
+        sent = time.monotonic()
+        response = await self._send_request(request, account_id)
+        if self.traffic_recorder:
+            self.traffic_recorder.record(request, response, sent)
+        if self.ledger_driver:
+            await self.ledger_driver.after_request(request)
+        return response
+
+    async def advance_ledger(self):
+        """
+        Close the current ledger (standalone mode)
+        """
+        if self.ledger_driver:
+            return (await self.ledger_driver.close_ledger())["result"]
+        return await self.execute_command({"method": "ledger_accept", "params": [{}]}, verbose=False)
+
+    async def _send_request(self, request, account_id=None):
+        if self.node_pool:
+            return await self.node_pool.send_request(request, account_id)
+        return await self._send_direct(request)
+
+    async def _send_direct(self, request):
+        if self.websockets:
+            response = await self.ws_client.async_request(to_websocket_command(request))
+            if response.get('status') == 'error':
+                response['result'] = deepcopy(response)
+            response['result']['status'] = response['status']
+            return response
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.transport.pool_size,
+                                                thread_name_prefix="rippled_rpc")
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(self._executor, self.transport.post, json.dumps(request))
+        if response.content:
+            return json.loads(response.content.decode('utf-8'))
+        return {}
+
+    def log_response(self, request_data, response_result, verbose=True):
+        request_print_str = None
+        try:
+            request_print_str = request_data["method"]
+            transaction_type = request_data["params"][0]["tx_json"]["TransactionType"]
+            request_print_str = "{} / {}".format(request_print_str, transaction_type)
+
+            ticket_sequence = request_data["params"][0]["tx_json"]["TicketSequence"]
+            log.debug("**** Using Ticket Sequence: {}".format(ticket_sequence))
+            request_print_str = "{} (** using TicketSequence: {} **)".format(request_print_str, ticket_sequence)
+
+            if request_data["params"][0]["tx_json"]["TransactionType"] == "NFTokenCreateOffer":
+                nftoken_create_offer = "Buy Offer"
+                nftoken_create_offer_flag = request_data["params"][0]["tx_json"]["Flags"]
+                if nftoken_create_offer_flag == constants.NFTOKEN_CREATE_OFFER_SELL_TOKEN:  # tfSellToken
+                    log.debug("**** Sell Offer: {}".format(nftoken_create_offer_flag))
+                    nftoken_create_offer = "Sell Offer"
+
+                log.debug("**** NFT Offer: {}".format(nftoken_create_offer))
+                request_print_str = "{} (** {} **)".format(request_print_str, nftoken_create_offer)
+        except (KeyError, TypeError) as e:
+            pass
+
+        if verbose:
+            log.info("  Request: {}".format(request_print_str))
+        log.debug(request_data)
+
+        log.debug("  Response")
+        if verbose:
+            try:
+                log.info("  Response status: {}".format(response_result["result"]["engine_result"]))
+            except KeyError:
+                log.info("  Response status: {}".format(response_result["result"]["status"]))
+        log.debug(response_result['result'])
+
+    async def execute_command(self, request, verbose=True, retry_busy=True):
+        """
+        Send a request, retrying while the server is busy or not synced, and return its "result"
+        @param request: dict with "method" and "params"
+        @param retry_busy: False to return transactions refused by a full queue (telCAN_NOT_QUEUE_FULL/FEE) as they
+                           are instead of retrying them, for load generators backing off on their own
+        """
+        request = deepcopy(request)
+        response_result = None
+        engine_result_message = None
+
+        sequence_passed = False
+        ticket_passed = False
+        try:
+            ticket_passed = "TicketSequence" in request["params"][0]["tx_json"]
+            if request["params"][0]["tx_json"]["Sequence"]:
+                sequence_passed = True
+        except (KeyError, IndexError, TypeError) as e:
+            pass
+
+        log.debug("Server address: {}".format(self.address))
+
+        # Sequence handed out locally for sign-and-submit requests not passing one
+        tx_json = self.get_sequence_allocation_tx_json(request)
+        sequence = None
+        sequence_resync_count = 0
+
+        # Submitters of an account take turns so sequences reach the server in order. The turn is given up while
+        # waiting out a busy server, so the account's other submitters are not held up behind the wait
+        turn = None
+        try:
+            retry_required = None
+            max_timeout = 120  # in sec waiting for server to sync up
+            wait_time = 20  # seconds
+            start_time = time.time()
+            end_time = start_time + max_timeout
+            while time.time() <= end_time and retry_required in (None, True):
+                if tx_json is not None and turn is None:
+                    previous, turn = self.sequence_allocator.join_queue(tx_json["Account"])
+                    if previous is not None:
+                        await asyncio.wrap_future(previous)
+                if tx_json is not None and sequence is None:
+                    sequence = await self.allocate_sequence(tx_json["Account"])
+                    if sequence is not None:
+                        tx_json["Sequence"] = sequence
+                try:
+                    wire_request, response_result = await self.signer.sign_request(request, self.send_request) \
+                        if self.signer else (request, None)
+                    if response_result is None:
+                        sent = time.monotonic()
+                        response_result = await self.send_request(wire_request, self.get_request_account(request))
+                        if self.latency_recorder and response_result:
+                            self.latency_recorder.record_submit(response_result, sent)
+                except Exception:
+                    if sequence is not None:
+                        self.sequence_allocator.release(tx_json["Account"], sequence)
+                    raise
+                if not response_result:
+                    log.error("No response received from server: {}".format(response_result))
+                    raise Exception("No response received from server: {}".format(response_result))
+
+                self.log_response(request, response_result, verbose=verbose)
+                result = response_result["result"]
+
+                retry_required = False
+                server_busy = False
+                if retry_busy and "engine_result" in result and \
+                        result["engine_result"] in ("telCAN_NOT_QUEUE_FULL", "telCAN_NOT_QUEUE_FEE"):
+                    retry_required = server_busy = True
+                    engine_result_message = result["engine_result_message"]
+                    log.warning("**** {} - Retry after {} seconds...".format(engine_result_message, wait_time))
+
+                elif "error" in result and "error_code" in result and \
+                        result["error_code"] in (constants.ERROR_CODE_noCurrent, constants.ERROR_CODE_noNetwork):
+                    retry_required = server_busy = True
+                    engine_result_message = result["error_message"]
+                    log.warning("**** {} - Retry after {} seconds...".format(engine_result_message, wait_time))
+
+                # Handle only payloads with no "Sequence" or ticket passed to support negative tests; a ticket that
+                # is gone is for its TicketManager to replace
+                elif "engine_result" in result and not sequence_passed and not ticket_passed and \
+                        (result["engine_result"] == "tefPAST_SEQ" or
+                         (result["engine_result"] == "terPRE_SEQ" and tx_json is not None)) and \
+                        sequence_resync_count < constants.MAX_SEQUENCE_RESYNC_RETRIES:
+                    retry_required = True
+                    sequence_resync_count += 1
+                    engine_result_message = result["engine_result_message"]
+                    account = request["params"][0]["tx_json"]["Account"]
+                    log.warning("**** {} - Resync sequence for {} and retry...".format(engine_result_message, account))
+                    self.sequence_allocator.invalidate(account)
+                    sequence = None
+                    if tx_json is None:
+                        request["params"][0]["tx_json"]["Sequence"] = await self.get_next_sequence(account)
+
+                if server_busy:
+                    # The transaction was not applied: give back its sequence and turn, then queue up again
+                    if sequence is not None:
+                        self.sequence_allocator.release(tx_json["Account"], sequence)
+                        del tx_json["Sequence"]
+                        sequence = None
+                    if turn is not None:
+                        self.sequence_allocator.leave_queue(tx_json["Account"], turn)
+                        turn = None
+                    await asyncio.sleep(wait_time)
+
+            if sequence is not None:
+                self.update_allocated_sequence(tx_json, sequence, response_result["result"])
+        finally:
+            if turn is not None:
+                self.sequence_allocator.leave_queue(tx_json["Account"], turn)
+
+        if retry_required:
+            log.error("********************************************************************************")
+            log.error("**** {} - Aborting execution! ****".format(engine_result_message))
+            log.error("********************************************************************************")
+            raise Exception(engine_result_message)
+
+        return response_result["result"]
+
+    @staticmethod
+    def get_request_account(request):
+        """
+        Account a request submits for or reads, None if it names none
+        """
+        try:
+            params = request["params"][0]
+            return params.get("account") or params.get("tx_json", {}).get("Account")
+        except (KeyError, IndexError, TypeError, AttributeError) as e:
+            return None
+
+    @staticmethod
+    def get_sequence_allocation_tx_json(request):
+        """
+        tx_json of a sign-and-submit request leaving its Sequence to the client, None for any other request
+        """
+        try:
+            params = request["params"][0]
+            tx_json = params["tx_json"]
+        except (KeyError, IndexError, TypeError) as e:
+            return None
+        if request.get("method") != "submit" or "secret" not in params or "Account" not in tx_json or \
+                "TransactionType" not in tx_json or "Sequence" in tx_json or "TicketSequence" in tx_json:
+            return None
+        return tx_json
+
+    async def get_next_sequence(self, account_id):
+        """
+        Next sequence of an account in the open ledger, after any transactions it has queued
+        """
+        account_info = await self.get_account_info(account_id, verbose=False)
+        sequence = account_info["account_data"]["Sequence"]
+        queue_data = account_info.get("queue_data", {})
+        if "highest_sequence" in queue_data:
+            sequence = max(sequence, queue_data["highest_sequence"] + 1)
+        return sequence
+
+    async def allocate_sequence(self, account_id):
+        """
+        Hand out the next sequence of an account, seeding it from account_info on first use
+        return: sequence, or None if the account is not in the ledger (left to the server to report)
+        """
+        if not self.sequence_allocator.is_seeded(account_id):
+            try:
+                self.sequence_allocator.seed(account_id, await self.get_next_sequence(account_id))
+            except KeyError as e:
+                log.debug("Sequence for {} not allocated: account not found".format(account_id))
+                return None
+        try:
+            return self.sequence_allocator.allocate(account_id)
+        except KeyError as e:
+            # Invalidated by a concurrent submission between seeding and allocation
+            return await self.allocate_sequence(account_id)
+
+    def update_allocated_sequence(self, tx_json, sequence, result):
+        engine_result = result.get("engine_result", "")
+        if engine_result in ("tefPAST_SEQ", "terPRE_SEQ"):
+            self.sequence_allocator.invalidate(tx_json["Account"])
+        elif engine_result[:3] not in ("tes", "tec") and engine_result != "terQUEUED":
+            log.debug("Sequence {} not consumed ({}); releasing".format(sequence, engine_result or "no result"))
+            self.sequence_allocator.release(tx_json["Account"], sequence)
+        elif tx_json["TransactionType"] == "TicketCreate":
+            # Tickets take sequences of their own
+            self.sequence_allocator.invalidate(tx_json["Account"])
+
+    async def execute_transaction(self, payload=None, method=None, secret=None, wait_for_ledger_close=True,
+                                  verbose=True, retry_busy=True):
+        """
+        Build and send a request from a payload ({"tx_json": {...}, "secret": ...}).
+        Transactions are submitted and, unless wait_for_ledger_close is False, awaited until validated
+        @param retry_busy: see execute_command()
+        """
+        payload = deepcopy(payload) if payload else {"tx_json": {}}
+        tx_json = payload["tx_json"]
+        secret = payload.get("secret", secret)
+        transaction_type = tx_json.get("TransactionType")
+
+        if transaction_type:
+            self.add_default_fee(payload)
+            await self.add_network_id(payload)
+            if method is None:
+                method = "submit"
+        elif "tx_blob" in tx_json:
+            method = "submit"
+        if method is None:
+            log.error("RPC method name missing in call to execute transaction")
+            raise Exception("RPC method name missing in call to execute transaction")
+
+        if verbose:
+            request_method_or_txn_type = "{} ({})".format(method, transaction_type) if transaction_type else method
+            if self.name != constants.RIPPLED_SERVER_NAME:
+                request_method_or_txn_type = "{} ({})".format(request_method_or_txn_type, self.name)
+            log.info("{}...".format(request_method_or_txn_type))
+
+        if secret:
+            request = {"method": method, "params": [dict(tx_json=tx_json, secret=secret)]}
+        else:
+            request = {"method": method, "params": [tx_json]}
+        response = await self.execute_command(request, verbose=verbose, retry_busy=retry_busy)
+
+        if wait_for_ledger_close and response.get("engine_result") in ("tesSUCCESS", "terQUEUED"):
+            if not await self.is_transaction_validated(response, verbose=False):
+                raise Exception("Transaction not validated")
+        return response
+
+    def add_default_fee(self, payload):
+        if "Fee" not in payload["tx_json"]:
+            log.debug(
+                "Adding default fee ({} XRP drops) for this transaction".format(constants.DEFAULT_TRANSACTION_FEE))
+            payload["tx_json"]["Fee"] = constants.DEFAULT_TRANSACTION_FEE
+
+    async def add_network_id(self, payload):
+        if not self._network_id_fetched:
+            self.network_id = await self.get_network_id(verbose=False)
+        if "NetworkID" not in payload["tx_json"] and \
+                self.network_id and int(self.network_id) > constants.MAX_LIMIT_NETWORK_ID_NOT_REQUIRED:
+            log.debug(f"Adding NetworkID ({self.network_id}) for this transaction")
+            payload["tx_json"]["NetworkID"] = self.network_id
+
+    async def get_server_info(self, verbose=True):
+        return await self.execute_transaction(method="server_info", verbose=verbose)
+
+    async def get_network_id(self, verbose=True):
+        network_id = None
+        try:
+            network_id = (await self.get_server_info(verbose=verbose))["info"]["network_id"]
+        except KeyError as e:
+            log.debug("Network ID not found")
+        self._network_id_fetched = True
+        return network_id
+
+    async def tx(self, tx_id, binary=False, min_ledger=None, max_ledger=None, verbose=True):
+        payload = {
+            "tx_json": {
+                "transaction": tx_id,
+                "binary": binary
+            }
+        }
+        if min_ledger:
+            payload["tx_json"]["min_ledger"] = min_ledger
+        if max_ledger:
+            payload["tx_json"]["max_ledger"] = max_ledger
+        return await self.execute_transaction(payload=payload, method="tx", verbose=verbose)
+
+    async def ledger_current(self, verbose=True):
+        response = await self.execute_transaction(method="ledger_current", verbose=verbose)
+        return response['ledger_current_index']
+
+    async def get_account_info(self, account_id=None, ledger_index="current", signer_lists=None, strict=True,
+                               queue=True, verbose=True):
+        payload = {
+            "tx_json": {
+                "account": account_id,
+                "ledger_index": ledger_index,
+                "strict": strict,
+                "queue": queue
+            },
+        }
+        if signer_lists:
+            payload["tx_json"]["signer_lists"] = signer_lists
+        return await self.execute_transaction(payload=payload, method="account_info", verbose=verbose)
+
+    async def get_account_sequence(self, account_object_or_id, verbose=False):
+        try:
+            account_id = account_object_or_id.account_id
+        except AttributeError as e:
+            account_id = account_object_or_id
+        account_info = await self.get_account_info(account_id, verbose=verbose)
+        return account_info["account_data"]["Sequence"]
+
+    async def get_account_balance(self, account_id, verbose=True):
+        response = await self.get_account_info(account_id, verbose=verbose)
+        try:
+            return response['account_data']['Balance']
+        except KeyError:
+            if verbose:
+                log.warning("'{}' is not a funded account".format(account_id))
+            return constants.NON_FUNDED_ACCOUNT_BALANCE
+
+    async def wallet_propose(self, seed=None, key_type=constants.DEFAULT_ACCOUNT_KEY_TYPE, verbose=True):
+        payload = {
+            "tx_json": {
+                "ledger_index": "current"
+            }
+        }
+        if seed:
+            payload["tx_json"]["seed"] = seed
+            payload["tx_json"]["key_type"] = key_type
+        return await self.execute_transaction(payload=payload, method="wallet_propose", verbose=verbose)
+
+    async def create_account(self, fund=False, amount=constants.DEFAULT_ACCOUNT_BALANCE, wallet=None, seed=None,
+                             key_type=constants.DEFAULT_ACCOUNT_KEY_TYPE, verbose=True):
+        if not wallet:
+            wallet = keypairs.generate_wallet(key_type=key_type, seed=seed, rng=self.wallet_rng)
+        account = Account(wallet, rippled=self)
+        if fund:
+            await self.fund_account(account.account_id, amount, verbose=verbose)
+        if verbose:
+            log.info("account: {}".format(account.account_id))
+        return account
+
+    async def fund_account(self, account_id, amount=constants.DEFAULT_ACCOUNT_BALANCE, wait_for_ledger_close=True,
+                           verbose=True):
+        if self.funding_account:
+            src_account_id, src_seed = self.funding_account.account_id, self.funding_account.master_seed
+        else:
+            src_account_id, src_seed = constants.TEST_GENESIS_ACCOUNT_ID, constants.TEST_GENESIS_ACCOUNT_SEED
+        log.debug("{}: funding from master account: {}".format(self.name, src_account_id))
+
+        payload = {
+            "tx_json": {
+                "TransactionType": "Payment",
+                "Account": src_account_id,
+                "Destination": account_id,
+                "Amount": amount,
+            },
+            "secret": src_seed
+        }
+        if self.funding_tickets:
+            return await TicketManager.get(self, src_account_id, src_seed).submit(
+                payload, wait_for_ledger_close=wait_for_ledger_close, verbose=verbose)
+        return await self.execute_transaction(payload=payload, wait_for_ledger_close=wait_for_ledger_close,
+                                              verbose=verbose)
+
+    async def make_payment(self, source, dest, amount, send_max=None, wait_for_ledger_close=True, verbose=True,
+                           retry_busy=True):
+        dest = dest if isinstance(dest, str) else dest.account_id
+        payload = {
+            "tx_json": {
+                "TransactionType": "Payment",
+                "Account": source.account_id,
+                "Destination": dest,
+                "Amount": amount
+            },
+        }
+        if send_max is not None:
+            payload["tx_json"]["SendMax"] = send_max
+        return await self.execute_transaction(secret=source.master_seed, payload=payload,
+                                              wait_for_ledger_close=wait_for_ledger_close, verbose=verbose,
+                                              retry_busy=retry_busy)
+
+    async def create_trustline(self, account_object, amount, limit=int(1e9), wait_for_ledger_close=True,
+                               verbose=True):
+        payload = {
+            "tx_json": {
+                "TransactionType": "TrustSet",
+                "Account": account_object.account_id,
+                "LimitAmount": dict(amount, value=str(limit))
+            },
+        }
+        return await self.execute_transaction(secret=account_object.master_seed, payload=payload,
+                                              wait_for_ledger_close=wait_for_ledger_close, verbose=verbose)
+
+    async def wait_for_ledger_close(self, seq, max_timeout=30, verbose=True):
+        """
+        Wait until the current (open) ledger index reaches seq
+        """
+        if self.ledger_monitor:
+            # The open ledger index reaches seq once ledger seq - 1 is validated
+            ledger_closed = await self.ledger_monitor.async_wait_for_ledger_index(int(seq) - 1, timeout=max_timeout)
+            if ledger_closed is not None:
+                if ledger_closed and verbose:
+                    log.info("Ledger closed. Validated ledger at {} [target: {}]".format(
+                        self.ledger_monitor.ledger_index, seq))
+                return ledger_closed
+
+        end_time = time.time() + max_timeout
+        while time.time() <= end_time:
+            current_ledger = await self.ledger_current(verbose=False)
+            if int(current_ledger) >= int(seq):
+                if verbose:
+                    log.info("Ledger closed. Current ledger at {} [target: {}]".format(current_ledger, seq))
+                return True
+            if self.ledger_driver:
+                # Nothing closes standalone ledgers without pending submissions
+                await self.ledger_driver.close_ledger()
+            else:
+                await asyncio.sleep(1)
+        return False
+
+    async def is_transaction_validated(self, response=None, tx_id=None, engine_result="tesSUCCESS", max_timeout=30,
+                                       verbose=True):
+        if verbose:
+            log.info("Wait for transaction to be validated...")
+
+        queued = False
+        if response:
+            tx_id = tx_id or response["tx_json"]["hash"]
+            if response.get("engine_result") not in (None, "tesSUCCESS", "terQUEUED", "tecKILLED"):
+                return False
+            queued = response.get("engine_result") == "terQUEUED"
+        elif not tx_id:
+            log.error("'response' or 'tx_id' should be passed")
+            return False
+
+        if self.tx_tracker:
+            transaction_result = await self.tx_tracker.async_wait_for_transaction(
+                tx_id, lambda tx_hash: self.tx(tx_hash, verbose=False), timeout=max_timeout)
+            if transaction_result is not None:
+                if transaction_result and self.latency_recorder:
+                    self.latency_recorder.validated(tx_id, transaction_result)
+                if transaction_result and (queued or transaction_result == engine_result):
+                    log.debug("  As expected, transaction is validated")
+                    return True
+                log.info("  Transaction not validated: {} ({})".format(tx_id, transaction_result or None))
+                return False
+
+        end_time = time.time() + max_timeout
+        transaction_result = None
+        while time.time() <= end_time:
+            tx_response = await self.tx(tx_id, verbose=False)
+            if "meta" in tx_response:
+                transaction_result = tx_response["meta"]["TransactionResult"]
+            if tx_response.get("validated"):
+                if self.latency_recorder:
+                    self.latency_recorder.validated(tx_id, transaction_result)
+                if queued or transaction_result == engine_result:
+                    log.debug("  As expected, transaction is validated")
+                    return True
+            await asyncio.sleep(1)
+        log.info("  Transaction not validated: {} ({})".format(tx_id, transaction_result))
+        return False
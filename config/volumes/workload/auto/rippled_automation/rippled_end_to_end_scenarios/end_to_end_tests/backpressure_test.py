@@ -0,0 +1,80 @@
+import asyncio
+from collections import Counter
+
+import pytest
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests.async_rippled import AsyncRippledServer
+from rippled_automation.rippled_end_to_end_scenarios.workload.backpressure import AdaptiveRateController
+
+offlineTestSuite = True  # unit tests of the adaptive rate controller: no rippled needed
+
+
+class FakeRippled:
+    """
+    server_info and fee results of an idle server
+    """
+    def __init__(self, current_ledger_size=0, expected_ledger_size=100):
+        self.current_ledger_size = current_ledger_size
+        self.expected_ledger_size = expected_ledger_size
+
+    async def execute_command(self, request, verbose=True):
+        if request["method"] == "server_info":
+            return {"info": {"load_factor": 1}}
+        return {
+            "current_ledger_size": str(self.current_ledger_size),
+            "expected_ledger_size": str(self.expected_ledger_size),
+            "current_queue_size": "0",
+            "max_queue_size": "2000",
+            "levels": {"open_ledger_level": "256", "reference_level": "256"},
+        }
+
+
+def test_refused_submits_decrease_rate():
+    controller = AdaptiveRateController(FakeRippled(), initial_tps=100, min_tps=1)
+    results = Counter({"tesSUCCESS": 80, "telCAN_NOT_QUEUE_FULL": 20})
+
+    rate = asyncio.run(controller.update(results))
+
+    assert rate == pytest.approx(100 * controller.decrease_factor)
+
+
+def test_rate_holds_without_new_refusals():
+    controller = AdaptiveRateController(FakeRippled(current_ledger_size=100), initial_tps=100, min_tps=1)
+    results = Counter({"tesSUCCESS": 80, "telCAN_NOT_QUEUE_FULL": 20})
+    asyncio.run(controller.update(results))
+
+    results["tesSUCCESS"] += 50
+    rate = asyncio.run(controller.update(results))
+
+    assert rate == pytest.approx(100 * controller.decrease_factor)
+
+
+def test_idle_server_increases_rate():
+    controller = AdaptiveRateController(FakeRippled(), initial_tps=100, min_tps=1)
+
+    rate = asyncio.run(controller.update(Counter({"tesSUCCESS": 100})))
+
+    assert rate > 100
+
+
+@pytest.mark.parametrize("retry_busy, sent", [(False, 1), (True, 2)])
+def test_queue_refusals_reach_the_caller(monkeypatch, retry_busy, sent):
+    server = AsyncRippledServer("localhost:1", server_name="test")
+    requests = []
+
+    async def send_request(request, account_id=None):
+        requests.append(request)
+        if len(requests) == 1:
+            return {"result": {"engine_result": "telCAN_NOT_QUEUE_FULL",
+                               "engine_result_message": "Transaction queue is full."}}
+        return {"result": {"engine_result": "tesSUCCESS"}}
+
+    async def no_wait(seconds):
+        pass
+    server.send_request = send_request
+    monkeypatch.setattr(asyncio, "sleep", no_wait)
+    request = {"method": "submit", "params": [{"tx_blob": "00"}]}
+
+    result = asyncio.run(server.execute_command(request, verbose=False, retry_busy=retry_busy))
+
+    assert len(requests) == sent
+    assert result["engine_result"] == ("tesSUCCESS" if retry_busy else "telCAN_NOT_QUEUE_FULL")
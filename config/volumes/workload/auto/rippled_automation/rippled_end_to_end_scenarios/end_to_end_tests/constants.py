@@ -49,6 +49,59 @@ MAX_STREAM_TIMEOUT = 60
 TEST_RUN_PID_TEST_SUITE_KEY = "test_suite"
 TEST_RUN_PID_TEST_RESULT_DIR_KEY = "results_dir"
 MAX_ACCOUNT_COUNT_FOR_PRICE_ORACLE_AGGREGATE = 200
+HTTP_POOL_SIZE = 16  # max keep-alive connections per server
+HTTP_CONNECT_TIMEOUT = 10  # seconds
+HTTP_READ_TIMEOUT = 120  # seconds
+WS_REQUEST_TIMEOUT = 120  # seconds
+ASYNC_RUN_TIMEOUT = HTTP_READ_TIMEOUT + 180  # seconds a synchronous call waits: a request and the busy retries
+WS_STREAM_PORT = 6005  # websocket port subscribed to for ledger/transaction streams when RPCs go over HTTP
+STREAM_CONNECT_TIMEOUT = 10  # seconds
+STREAM_RETRY_INTERVAL = 60  # seconds before reconnecting to an unavailable stream
+STREAM_WAIT_SLICE = 1  # seconds between stream health checks while waiting on stream events
+TX_TRACKER_MISSED_LEDGERS = 2  # validated ledgers without a streamed hash before looking it up with tx
+MAX_SEQUENCE_RESYNC_RETRIES = 5  # resubmissions after tefPAST_SEQ/terPRE_SEQ with a resynced sequence
+MAX_TICKETS_PER_ACCOUNT = 250  # tickets an account may own (and create with one TicketCreate)
+TICKET_BATCH_SIZE = 250  # tickets created per TicketCreate by a TicketManager
+TICKET_LOW_WATER = 50  # tickets left when a TicketManager creates more in the background
+TX_TRACKER_CACHE_SIZE = 50000  # recently validated transaction hashes kept by the transactions stream tracker
+STANDALONE_LEDGER_BATCH_SIZE = 100  # pending submissions closing a standalone ledger right away
+STANDALONE_LEDGER_INTERVAL = 1  # seconds a submission stays pending before its standalone ledger is closed
+ACCOUNT_POOL_SIZE = 20  # funded accounts kept ready by the session account pool
+ACCOUNT_POOL_BATCH_SIZE = 20  # accounts funded together by the account pool
+ACCOUNT_POOL_WAIT_TIMEOUT = 60  # seconds to wait for a pooled account before funding one directly
+ACCOUNT_POOL_RETRY_INTERVAL = 10  # seconds before the account pool retries after a failed batch
+WORKLOAD_ACCOUNT_BALANCE = "1000000000"  # XRP drops funded to each workload (more_txns.py) account
+WORKLOAD_IOU_BALANCE = 1000000  # tokens the workload issuer sends to each holder
+IOU_DISTRIBUTION_BATCH_SIZE = 500  # most holders per IOU distribution batch (also capped to half the open ledger)
+IOU_DISTRIBUTION_MAX_RETRIES = 3  # retries of an issuer payment that was not applied
+BUILDER_BATCH_SIZE = 1000  # objects submitted per batch by the ledger state builder (about one ledger's worth)
+BUILDER_PARALLEL_SUBMITS = 200  # ledger state builder submissions in flight at once
+BUILDER_MAX_FAILED_BATCHES = 3  # consecutive batches creating nothing before the ledger state builder gives up
+BUILDER_SPARE_OBJECTS = 10  # owner reserve headroom funded to each ledger state builder account
+BUILDER_TRUST_LIMIT = 1000000000  # trust line limit of ledger state builder holders
+BUILDER_ESCROW_FINISH_AFTER = 365 * 24 * 3600  # seconds: ledger state builder escrows stay in the ledger
+LATENCY_SUB_BUCKET_BITS = 7  # latency histogram buckets per power of two: 2^7 (under 1% error)
+LATENCY_PENDING_TIMEOUT = 120  # seconds before an applied transaction not seen validated counts as not validated
+LATENCY_LEDGER_HISTORY = 1000  # ledgers whose validated transaction counts are kept
+LATENCY_SUMMARY_INTERVAL = 30  # seconds between latency summary file updates
+LATENCY_PROMETHEUS_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 3, 4, 5, 7.5, 10, 15, 20, 30, 60)  # seconds
+BACKPRESSURE_INITIAL_TPS = 10  # adaptive workload rate before the first ledger's feedback
+BACKPRESSURE_MIN_TPS = 1  # adaptive workload rate floor
+BACKPRESSURE_INCREASE_STEP = 2  # TPS added per ledger while the open ledger has room
+BACKPRESSURE_INCREASE_FRACTION = 0.1  # or this share of the rate, whichever is larger
+BACKPRESSURE_DECREASE_FACTOR = 0.7  # rate multiplier when submits are refused or the queue fills
+BACKPRESSURE_HOLD_FACTOR = 0.95  # rate multiplier while the open ledger fee is escalated
+BACKPRESSURE_LEDGER_HEADROOM = 0.9  # increase while the open ledger is below this share of the expected size
+BACKPRESSURE_MAX_QUEUE_FILL = 0.1  # back off once the transaction queue is fuller than this
+BACKPRESSURE_MAX_QUEUED_SHARE = 0.05  # back off once more than this share of submits is queued (terQUEUED)
+TRAFFIC_RECORDER_FLUSH_LINES = 1000  # recorded requests buffered between writes of a traffic recording
+REPLAY_PROGRESS_INTERVAL = 10  # seconds between replay progress logs
+NODE_METRICS_INTERVAL = 1  # seconds between samples of every node's server_info counters and get_counts
+NODE_METRICS_TIMEOUT = 5  # seconds to wait for a node's metrics response before reporting it down
+CONSENSUS_FINALIZE_LEDGERS = 2  # later ledgers published before a ledger's consensus timings are summarized
+CONSENSUS_LAG_THRESHOLD = 1  # seconds behind the first node publishing a ledger before a node counts as lagging
+CONSENSUS_LEDGER_HISTORY = 1000  # ledger consensus summaries kept by the consensus tracker
+CONSENSUS_QUORUM_FRACTION = 0.8  # share of validators making a quorum when the node does not report it
 
 # Sidechain specific
 MAINCHAIN_NAME = "locking_chain"  # mainchain
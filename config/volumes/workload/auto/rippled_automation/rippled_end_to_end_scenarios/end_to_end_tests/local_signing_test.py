@@ -0,0 +1,122 @@
+import pytest
+from rippled_automation.rippled_end_to_end_scenarios.utils import keypairs
+from rippled_automation.rippled_end_to_end_scenarios.utils.binary_codec import BinaryCodec
+from rippled_automation.rippled_end_to_end_scenarios.utils.tx_signer import LocalSigner
+
+offlineTestSuite = True  # unit tests of offline wallets and signing: no rippled needed
+
+# Subset of a "server_definitions" result: the fields of the payments below
+DEFINITIONS = {
+    "TYPES": {"UInt16": 1, "UInt32": 2, "Amount": 6, "Blob": 7, "AccountID": 8},
+    "FIELDS": [
+        ["TransactionType", {"nth": 2, "isVLEncoded": False, "isSerialized": True, "isSigningField": True,
+                             "type": "UInt16"}],
+        ["Flags", {"nth": 2, "isVLEncoded": False, "isSerialized": True, "isSigningField": True, "type": "UInt32"}],
+        ["Sequence", {"nth": 4, "isVLEncoded": False, "isSerialized": True, "isSigningField": True,
+                      "type": "UInt32"}],
+        ["LastLedgerSequence", {"nth": 27, "isVLEncoded": False, "isSerialized": True, "isSigningField": True,
+                                "type": "UInt32"}],
+        ["Amount", {"nth": 1, "isVLEncoded": False, "isSerialized": True, "isSigningField": True, "type": "Amount"}],
+        ["Fee", {"nth": 8, "isVLEncoded": False, "isSerialized": True, "isSigningField": True, "type": "Amount"}],
+        ["SigningPubKey", {"nth": 3, "isVLEncoded": True, "isSerialized": True, "isSigningField": True,
+                           "type": "Blob"}],
+        ["TxnSignature", {"nth": 4, "isVLEncoded": True, "isSerialized": True, "isSigningField": False,
+                          "type": "Blob"}],
+        ["Account", {"nth": 1, "isVLEncoded": True, "isSerialized": True, "isSigningField": True,
+                     "type": "AccountID"}],
+        ["Destination", {"nth": 3, "isVLEncoded": True, "isSerialized": True, "isSigningField": True,
+                         "type": "AccountID"}],
+    ],
+    "TRANSACTION_TYPES": {"Payment": 0},
+    "LEDGER_ENTRY_TYPES": {},
+    "TRANSACTION_RESULTS": {},
+}
+
+# (seed, key type, public key, account, RFC 1751 master key)
+WALLETS = [
+    ("snoPBrXtMeMyMHUVTgbuqAfg1SUTb", keypairs.KEY_TYPE_SECP256K1,
+     "0330E7FC9D56BB25D6893BA3F317AE5BCF33B3291BD63DB32654A313222F7FD020", "rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh",
+     "I IRE BOND BOW TRIO LAID SEAT GOAL HEN IBIS IBIS DARE"),
+    ("sp5fghtJtpUorTwvof1NpDXAzNwf5", keypairs.KEY_TYPE_SECP256K1,
+     "030D58EB48B4420B1F7B9DF55087E0E29FEF0E8468F9A6825B01CA2C361042D435", "rU6K7V3Po4snVhBBaU29sesqs2qTQJWDw1",
+     "DUE DUNE FLUE GUY LIVE AWL BOG ROB FIST BOG OS ADD"),
+    ("sEdSKaCy2JT7JaM7v95H9SxkhP9wS2r", keypairs.KEY_TYPE_ED25519,
+     "ED01FA53FA5A7E77798F882ECE20B1ABC00BB358A9E55A202D0D0676BD0CE37A63", "rLUEXYuLiQptky37CqLcm9USQpPiz5rkpD",
+     "DUE DUNE FLUE GUY LIVE AWL BOG ROB FIST BOG OS ADD"),
+]
+
+# (seed, tx_blob, hash) of PAYMENT signed by the seed's account
+SIGNED_PAYMENTS = [
+    ("snoPBrXtMeMyMHUVTgbuqAfg1SUTb",
+     "12000022000000002400000001201B000000646140000000000F424068400000000000000A73210330E7FC9D56BB25D6893BA3F317"
+     "AE5BCF33B3291BD63DB32654A313222F7FD0207446304402200340021A2E82D9D874B83EB84C334B574DFC84331D329AD4422F7D24"
+     "AC002C8F0220467E7B8FBA4829D3E15E09584F7649BD94DB3FB55E27EE357046E82D53DD8CEC8114B5F762798A53D543A014CAF8B2"
+     "97CFF8F2F937E88314F667B0CA50CC7709A220B0561B85E53A48461FA8",
+     "EB42FBCE7DDC51593A8CAB7D30229C39B89A4F7B9F9BABDD34787CD84A902547"),
+    ("sEdSKaCy2JT7JaM7v95H9SxkhP9wS2r",
+     "12000022000000002400000001201B000000646140000000000F424068400000000000000A7321ED01FA53FA5A7E77798F882ECE20"
+     "B1ABC00BB358A9E55A202D0D0676BD0CE37A63744010144C8EC176633E0CEC8A2B37235A2F91912EB1D1CED2C1406901B0379626D4"
+     "196C9289E762891B8DAADD56474FC1885A5A8A49320C7001401126103A0005038114D28B177E48D9A8D057E70F7E464B498367281B"
+     "988314F667B0CA50CC7709A220B0561B85E53A48461FA8",
+     "C577F64DD90299D9E9BD7E6A2C00775E43ECE97CFA448547A44F29ABB275D3AB"),
+]
+
+PAYMENT = {
+    "TransactionType": "Payment",
+    "Destination": "rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe",
+    "Amount": "1000000",
+    "Fee": "10",
+    "Sequence": 1,
+    "Flags": 0,
+    "LastLedgerSequence": 100,
+}
+
+
+def der_decode(signature):
+    """
+    return: (r, s) of a DER encoded ECDSA signature
+    """
+    assert signature[0] == 0x30 and signature[1] == len(signature) - 2
+    r_length = signature[3]
+    r = int.from_bytes(signature[4:4 + r_length], "big")
+    s_start = 4 + r_length + 2
+    return r, int.from_bytes(signature[s_start:s_start + signature[s_start - 1]], "big")
+
+
+@pytest.mark.parametrize("seed, key_type, public_key, account_id, master_key", WALLETS)
+def test_wallet_from_seed(seed, key_type, public_key, account_id, master_key):
+    wallet = keypairs.wallet_from_seed(seed)
+
+    assert wallet["account_id"] == account_id
+    assert wallet["key_type"] == key_type
+    assert wallet["public_key_hex"] == public_key
+    assert wallet["master_seed"] == seed
+    assert wallet["master_key"] == master_key
+
+
+@pytest.mark.parametrize("key_type", [keypairs.KEY_TYPE_SECP256K1, keypairs.KEY_TYPE_ED25519])
+def test_generated_wallets_round_trip(key_type):
+    for wallet in keypairs.generate_wallets(5, key_type=key_type):
+        assert keypairs.wallet_from_seed(wallet["master_seed"]) == wallet
+
+
+@pytest.mark.parametrize("seed, tx_blob, tx_hash", SIGNED_PAYMENTS)
+def test_sign_payment(seed, tx_blob, tx_hash):
+    signer = LocalSigner(DEFINITIONS)
+    account_id = keypairs.wallet_from_seed(seed)["account_id"]
+
+    signed_tx_json, signed_tx_blob = signer.sign(dict(PAYMENT, Account=account_id), seed)
+
+    assert signed_tx_blob == tx_blob
+    assert signed_tx_json["hash"] == tx_hash
+    assert BinaryCodec.transaction_hash(bytes.fromhex(tx_blob)) == tx_hash
+
+
+def test_secp256k1_signatures_are_canonical():
+    seed = "snoPBrXtMeMyMHUVTgbuqAfg1SUTb"
+    private_key, public_key = keypairs.derive_keypair(seed)
+    for sequence in range(1, 51):
+        signature = keypairs.sign(b"STX\x00" + sequence.to_bytes(4, "big"), private_key, public_key)
+        r, s = der_decode(signature)
+        assert 0 < r < keypairs.SECP256K1_N
+        assert 0 < s <= keypairs.SECP256K1_N // 2, "High S signature for message {}".format(sequence)
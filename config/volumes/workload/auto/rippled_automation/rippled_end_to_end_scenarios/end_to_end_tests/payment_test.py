@@ -427,3 +427,29 @@ def test_xrp_payment_10_million_xrp(fx_rippled):
     }
     response = rippled_server.execute_transaction(payload=payload)
     test_validator.verify_test(rippled_server, response, accounts=[account_2])
+
+
+def test_xrp_payment_between_accounts_funded_with_tickets(fx_rippled):
+    rippled_server = fx_rippled["rippled_server"]
+
+    # Fund accounts from the funding account's tickets
+    funding_tickets = rippled_server.aio.funding_tickets
+    rippled_server.aio.funding_tickets = True
+    try:
+        account_1 = rippled_server.create_account(fund=True)
+        account_2 = rippled_server.create_account(fund=True)
+    finally:
+        rippled_server.aio.funding_tickets = funding_tickets
+    test_validator.validate_account_balance(rippled_server, [account_1, account_2])
+
+    payload = {
+        "tx_json": {
+            "TransactionType": "Payment",
+            "Account": account_1.account_id,
+            "Destination": account_2.account_id,
+            "Amount": constants.DEFAULT_TRANSFER_AMOUNT,
+        },
+        "secret": account_1.master_seed
+    }
+    response = rippled_server.execute_transaction(payload=payload)
+    test_validator.verify_test(rippled_server, response, accounts=[account_1, account_2])
@@ -0,0 +1,81 @@
+import asyncio
+import math
+
+import pytest
+from rippled_automation.rippled_end_to_end_scenarios.workload.rate_control import ARRIVAL_POISSON, \
+    OpenLoopGenerator, RateSchedule
+
+offlineTestSuite = True  # unit tests of the load generator's schedule: no rippled needed
+
+
+async def send():
+    return {"engine_result": "tesSUCCESS"}
+
+
+def test_constant_rate():
+    schedule = RateSchedule.parse(tps=20)
+    generator = OpenLoopGenerator(send, schedule)
+
+    assert schedule.rate_at(0) == schedule.rate_at(3600) == 20
+    assert generator.next_send_time(1) == pytest.approx(1.05)
+
+
+def test_ramp_rate():
+    schedule = RateSchedule.parse(ramp="0:10,60:100")
+
+    assert schedule.rate_at(0) == 10
+    assert schedule.rate_at(30) == pytest.approx(55)
+    assert schedule.rate_at(60) == schedule.rate_at(600) == 100
+
+
+@pytest.mark.parametrize("tps, ramp", [(0, None), (-5, None), (None, "0:10,60:0"), (None, "0:-1,60:10"),
+                                       (None, None)])
+def test_invalid_schedule(tps, ramp):
+    with pytest.raises(ValueError):
+        RateSchedule.parse(tps=tps, ramp=ramp)
+
+
+def test_next_send_time_skips_zero_rate():
+    generator = OpenLoopGenerator(send, RateSchedule.parse(ramp="0:0,2:0,4:20"))
+
+    assert 2 < generator.next_send_time(0) < 3
+    assert generator.next_send_time(0, duration=1) == math.inf
+
+
+def test_next_send_time_follows_ramp():
+    generator = OpenLoopGenerator(send, RateSchedule.parse(ramp="0:0,10:10"))
+
+    send_times = [0]
+    while send_times[-1] < 20:
+        send_times.append(generator.next_send_time(send_times[-1]))
+
+    assert send_times[1] == pytest.approx(math.sqrt(2))  # t^2 / 2 sends due by t
+    assert send_times[50] == pytest.approx(10)
+    assert send_times[60] == pytest.approx(11)
+
+
+def test_poisson_send_times_increase():
+    generator = OpenLoopGenerator(send, RateSchedule.parse(tps=100), arrival=ARRIVAL_POISSON)
+
+    send_time = 0
+    for _ in range(100):
+        next_send_time = generator.next_send_time(send_time)
+        assert next_send_time > send_time
+        send_time = next_send_time
+
+
+def test_run_stops_on_zero_rate():
+    generator = OpenLoopGenerator(send, RateSchedule.parse(ramp="0:0,60:0,120:10"))
+
+    asyncio.run(asyncio.wait_for(generator.run(duration=0.5), timeout=5))
+
+    assert generator.scheduled == 0
+
+
+def test_run_sends_at_target_rate():
+    generator = OpenLoopGenerator(send, RateSchedule.parse(tps=40))
+
+    asyncio.run(generator.run(duration=0.5))
+
+    assert generator.scheduled == generator.sent == generator.completed == 20
+    assert generator.results["tesSUCCESS"] == 20
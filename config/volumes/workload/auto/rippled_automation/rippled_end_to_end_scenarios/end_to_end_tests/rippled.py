@@ -1,34 +1,43 @@
-import asyncio
 import copy
 import json
 import os
 import queue
 import threading
 import time
-from copy import deepcopy
 
 import requests
 import websocket
-import websockets
 
 from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests.async_rippled import AsyncRippledServer
 from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests.price_oracle.price_oracle_test_data import \
     DEFAULT_ORACLE_DOCUMENT_ID, DEFAULT_ASSET_CLASS, DEFAULT_PROVIDER, DEFAULT_PRICE_DATA, DEFAULT_BASE_ASSET, \
     DEFAULT_ASSET_PRICE, DEFAULT_QUOTE_ASSET
 from rippled_automation.rippled_end_to_end_scenarios.src.commands.account import Account
 from rippled_automation.rippled_end_to_end_scenarios.utils import helper
+from rippled_automation.rippled_end_to_end_scenarios.utils import keypairs
 from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
 from rippled_automation.rippled_end_to_end_scenarios.utils.amm.amm_helper import AMM_mixin
+from rippled_automation.rippled_end_to_end_scenarios.utils.ticket_manager import TicketManager
 
 log = log_helper.get_logger()
 
 
 class RippledServer(AMM_mixin):
     def __init__(self, address=None, use_websockets=False, server_name=constants.RIPPLED_SERVER_NAME, rippled_exec=None,
-                 rippled_config=None, standalone_mode=False, server_type=constants.SERVER_TYPE_RIPPLED):
+                 rippled_config=None, standalone_mode=False, server_type=constants.SERVER_TYPE_RIPPLED,
+                 ws_address=None, funding_tickets=False, signer=None, node_pool=None, latency_recorder=None):
         proto = "ws" if use_websockets else "http"
         self.websockets = use_websockets
         self.address = f"{proto}://{address}"
+        self.aio = AsyncRippledServer(address=address, use_websockets=use_websockets, server_name=server_name,
+                                      standalone_mode=standalone_mode, ws_address=ws_address,
+                                      funding_tickets=funding_tickets, signer=signer, node_pool=node_pool,
+                                      latency_recorder=latency_recorder)
+        self.transport = self.aio.transport
+        self.ws_client = self.aio.ws_client
+        self.ledger_monitor = self.aio.ledger_monitor
+        self.tx_tracker = self.aio.tx_tracker
         self.name = server_name
         self.rippled_exec = rippled_exec
         self.rippled_config = rippled_config
@@ -55,9 +64,11 @@ class RippledServer(AMM_mixin):
 
         if self.server_type in (constants.SERVER_TYPE_RIPPLED, constants.SERVER_TYPE_CLIO):
             self.network_id = self.get_network_id(verbose=False)
+            self.aio.network_id = self.network_id
 
         if self.server_type == constants.SERVER_TYPE_RIPPLED:
             self.funding_account = self.create_funding_account()
+            self.aio.funding_account = self.funding_account
             # Initialize test genesis account balance
             wallet = self.create_wallet_from_account_id(account_id=constants.TEST_GENESIS_ACCOUNT_ID,
                                                         master_seed=constants.TEST_GENESIS_ACCOUNT_SEED)
@@ -86,24 +97,11 @@ class RippledServer(AMM_mixin):
         log.error("**** Unable to create funding account")
         return None
 
-    def convert_command(self, data):
-        new_data = deepcopy(data)
-        if 'command' not in data:
-            command = new_data.get('method')
-            del new_data['method']
-            new_data.update({"command": command})
-            params = new_data.get('params')[0]
-            del new_data['params']
-            new_data.update(params)
-        log.debug(new_data)
-        return new_data
-
-    async def send_command(self, client, command):
-        async with websockets.connect(client) as websocket:
-            command = json.dumps(command)
-            await websocket.send(command)
-            resp = await websocket.recv()
-            return resp
+    def advance_ledger(self):
+        """
+        Close the current ledger (standalone mode)
+        """
+        return self.aio.run(self.aio.advance_ledger())
 
     def get_rippled_epoch_time(self, seconds_elapsed=0):
         return int(time.time() + seconds_elapsed) - constants.RIPPLE_EPOCH
@@ -370,6 +368,8 @@ class RippledServer(AMM_mixin):
         if method == "subscribe":
             request = tx_json
         response = self.execute_command(json.dumps(request), verbose=verbose)
+        if transaction_type == "TicketCreate" and payload:
+            self.update_account_sequence(payload, response)
         if submit_only:
             response = self.submit_blob(response, verbose=True)
             calculate_balance = False  # submit_blob calculates balances
@@ -391,20 +391,7 @@ class RippledServer(AMM_mixin):
                     log.debug("Transaction validated")
                     if calculate_balance:
                         if transaction_type == "Payment":
-                            log.debug("Payment transaction")
-                            try:
-                                account_id = response["tx_json"]["Account"]
-                                dest_account_id = response["tx_json"]["Destination"]
-                                debit_amount = credit_amount = response["tx_json"]["Amount"]
-                                if 'SendMax' in response["tx_json"]:
-                                    log.debug("SendMax found in response")
-                                    debit_amount = response["tx_json"]["SendMax"]
-                                self.update_xrp_balance_with_txn_amount(account_id, debit_amount,
-                                                                        mode=constants.XRP_DEBIT)
-                                self.update_xrp_balance_with_txn_amount(dest_account_id, credit_amount,
-                                                                        mode=constants.XRP_CREDIT)
-                            except KeyError as e:
-                                log.debug("key '{}' not found".format(e))
+                            self.update_xrp_balance_with_payment(response)
 
                         elif transaction_type == "XChainCommit":
                             log.debug("XChainCommit transaction")
@@ -791,7 +778,7 @@ class RippledServer(AMM_mixin):
         account = None
         while not account_created and count <= max_retries:
             if not wallet:
-                wallet = self.wallet_propose(seed=seed, key_type=key_type, verbose=verbose)
+                wallet = keypairs.generate_wallet(key_type=key_type, seed=seed)
             log.debug("rippled: {}".format(self.address))
             log.debug("wallet: {}".format(wallet))
             account = Account(wallet, rippled=self)
@@ -834,17 +821,11 @@ class RippledServer(AMM_mixin):
             log.debug(f"{account} has no account lines.")
         return trustline_info
 
-    def fund_account(self, account_id, amount=constants.DEFAULT_ACCOUNT_BALANCE, verbose=True):
+    def fund_account(self, account_id, amount=constants.DEFAULT_ACCOUNT_BALANCE, wait_for_ledger_close=True,
+                     verbose=True):
         src_account = self.funding_account
         log.debug("{}: funding from master account: {}".format(self.name, src_account.account_id))
 
-        # Update XRP balance for test validation
-        try:
-            Account.last_recorded_account_sequence[self][account_id] = self.get_account_sequence(account_id)
-        except KeyError as e:
-            # Account not created yet
-            pass
-
         payload = {
             "tx_json": {
                 "TransactionType": "Payment",
@@ -855,7 +836,16 @@ class RippledServer(AMM_mixin):
             "secret": src_account.master_seed
         }
 
-        return self.execute_transaction(payload=payload, verbose=verbose)
+        if self.aio.funding_tickets:
+            # Submitted on the async server: keep the balances execute_transaction() would have kept
+            response = self.aio.run(TicketManager.get(self.aio, src_account.account_id, src_account.master_seed).submit(
+                payload, verbose=verbose))
+            self.update_account_xrp_balance_with_fee({"method": "submit"}, response, verbose=verbose)
+            if wait_for_ledger_close and response.get("engine_result") in ("tesSUCCESS", "terQUEUED") and \
+                    self.is_transaction_validated(response, verbose=False):
+                self.update_xrp_balance_with_payment(response)
+            return response
+        return self.execute_transaction(payload=payload, wait_for_ledger_close=wait_for_ledger_close, verbose=verbose)
 
     def create_wallet_from_account_id(self, account_id, master_seed=None, verbose=False):
         if verbose:
@@ -1417,141 +1407,17 @@ class RippledServer(AMM_mixin):
 
         return self.execute_transaction(payload=payload)
 
-    def parse_response(self, request_data, response, verbose=True):
-        request_print_str = None
-        try:
-            request_print_str = request_data["method"]
-            transaction_type = request_data["params"][0]["tx_json"]["TransactionType"]
-            request_print_str = "{} / {}".format(request_print_str, transaction_type)
-
-            ticket_sequence = request_data["params"][0]["tx_json"]["TicketSequence"]
-            log.debug("**** Using Ticket Sequence: {}".format(ticket_sequence))
-            request_print_str = "{} (** using TicketSequence: {} **)".format(request_print_str, ticket_sequence)
-
-            if request_data["params"][0]["tx_json"]["TransactionType"] == "NFTokenCreateOffer":
-                nftoken_create_offer = "Buy Offer"
-                nftoken_create_offer_flag = request_data["params"][0]["tx_json"]["Flags"]
-                if nftoken_create_offer_flag == constants.NFTOKEN_CREATE_OFFER_SELL_TOKEN:  # tfSellToken
-                    log.debug("**** Sell Offer: {}".format(nftoken_create_offer_flag))
-                    nftoken_create_offer = "Sell Offer"
-
-                log.debug("**** NFT Offer: {}".format(nftoken_create_offer))
-                request_print_str = "{} (** {} **)".format(request_print_str, nftoken_create_offer)
-        except KeyError as e:
-            pass
-
-        if verbose:
-            log.info("  Request: {}".format(request_print_str))
-        log.debug(request_data)
-
-        if self.websockets:
-            response_result = json.loads(response)
-            if response_result.get('status') == 'error':
-                response_result['result'] = deepcopy(response_result)
-            response_result['result']['status'] = response_result['status']
-        else:
-            if response.content:
-                response_result = json.loads(response.content.decode('utf-8'))
-            else:
-                return {}
-
-        log.debug("  Response")
-        if verbose:
-            try:
-                log.info("  Response status: {}".format(response_result["result"]["engine_result"]))
-            except KeyError:
-                log.info("  Response status: {}".format(response_result["result"]["status"]))
-        log.debug(response_result['result'])
-        return response_result
-
     def execute_command(self, data, verbose=True):
-        response = None
-        response_result = None
-        engine_result_message = None
         json_data = json.loads(data)
-
-        sequence_passed = False
         try:
-            if json_data["params"][0]["tx_json"]["Sequence"]:
-                sequence_passed = True
-        except KeyError as e:
-            pass
-
-        log.debug("Server address: {}".format(self.address))
-
-        retry_required = None
-        max_timeout = 120  # in sec waiting for server to sync up
-        wait_time = 20  # seconds
-        start_time = time.time()
-        end_time = start_time + max_timeout
-        while time.time() <= end_time and retry_required in (None, True):
-            try:
-                json_data = json.loads(data)
-                if self.websockets:
-                    converted_data = self.convert_command(json_data)
-                    response = asyncio.run(
-                        self.send_command(self.address, converted_data))
-                else:
-                    response = requests.post(self.address, data)
-                    if self.standalone_mode:
-                        log.debug("Standalone mode; advancing ledger...")
-                        cmd_ledger_advance = "{} --conf {} ledger_accept --silent".format(self.rippled_exec,
-                                                                                          self.rippled_config)
-                        helper.run_external_command(cmd_ledger_advance, skip_logging=True)
+            response = self.aio.run(self.aio.execute_command(json_data, verbose=verbose))
+        except requests.exceptions.RequestException as e:
+            log.error("Failed to establish connection to server: {} - {}".format(self.address, e))
+            raise
 
-            except KeyError as e:
-                pass
-            except requests.exceptions.RequestException as e:
-                log.error("Failed to establish connection to server: {} - {}".format(self.address, e))
-                raise
-
-            if not response:
-                log.error("No response received from server: {}".format(response))
-                raise Exception("No response received from server: {}".format(response))
-
-            response_result = self.parse_response(json_data, response, verbose=verbose)
-
-            retry_required = False
-            if "engine_result" in response_result["result"] and \
-                    response_result["result"]["engine_result"] in ("telCAN_NOT_QUEUE_FULL", "telCAN_NOT_QUEUE_FEE"):
-                retry_required = True
-                engine_result_message = response_result["result"]["engine_result_message"]
-                log.warning(
-                    "**** {} - Retry after {} seconds...".format(engine_result_message, wait_time))
-                time.sleep(wait_time)
-
-            elif "error" in response_result["result"] and "error_code" in response_result["result"] and \
-                    response_result["result"]["error_code"] in \
-                    (constants.ERROR_CODE_noCurrent, constants.ERROR_CODE_noNetwork):
-                retry_required = True
-                engine_result_message = response_result["result"]["error_message"]
-                log.warning(
-                    "**** {} - Retry after {} seconds...".format(engine_result_message, wait_time))
-                time.sleep(wait_time)
-
-            # Handle only payloads with no "Sequence" passed to support negative tests
-            elif "engine_result" in response_result["result"] and \
-                    response_result["result"]["engine_result"] == "tefPAST_SEQ" and not sequence_passed:
-                retry_required = True
-                engine_result_message = response_result["result"]["engine_result_message"]
-                log.warning(
-                    "**** {} - Retry after {} seconds...".format(engine_result_message, wait_time))
-                time.sleep(wait_time)
-                account = json_data["params"][0]["tx_json"]["Account"]
-                sequence = self.get_account_sequence(account)
-                log.debug("**** Current sequence {}...".format(sequence))
-                json_data["params"][0]["tx_json"]["Sequence"] = sequence
-                data = json.dumps(json_data)
-
-        if retry_required:
-            log.error("********************************************************************************")
-            log.error("**** {} - Aborting execution! ****".format(engine_result_message))
-            log.error("********************************************************************************")
-            raise Exception(engine_result_message)
-
-        self.wait_until_escalated_fee_drops(response_result["result"])
-        self.update_account_xrp_balance_with_fee(json_data, response_result["result"], verbose=verbose)
-        return response_result['result']
+        self.wait_until_escalated_fee_drops(response)
+        self.update_account_xrp_balance_with_fee(json_data, response, verbose=verbose)
+        return response
 
     def get_txn_sequence(self, response, verbose=False):
         log.debug("")
@@ -1665,10 +1531,10 @@ class RippledServer(AMM_mixin):
         if fee_escalated and account_id:
             max_retries = 60
             wait_time = 2  # second
-            count = 1
+            start_time = time.time()
             notified = False
             transactions = None
-            while count <= max_retries:
+            while time.time() - start_time < max_retries * wait_time:
                 try:
                     account_info = self.get_account_info(account_id, verbose=False)
                     txn_count = int(account_info["queue_data"]["txn_count"])
@@ -1680,10 +1546,12 @@ class RippledServer(AMM_mixin):
                             log.info(
                                 "  Wait for escalated fee to be dropped for held transaction: {}".format(txn_index))
                             notified = True
-                        time.sleep(wait_time)
-                        count += 1
+                        # Queued transactions only leave the queue when a ledger closes
+                        if not self.ledger_monitor or self.ledger_monitor.wait_for_next_ledger(
+                                timeout=max_retries * wait_time) is None:
+                            time.sleep(wait_time)
                     else:
-                        log.debug("  ** Transaction fee dropped after {} seconds".format(count * wait_time))
+                        log.debug("  ** Transaction fee dropped after {:.0f} seconds".format(time.time() - start_time))
                         return
                 except KeyError as e:
                     # This response does not have transactions queued
@@ -2133,12 +2001,18 @@ class RippledServer(AMM_mixin):
         ledger_close_time = self.get_ledger_close_time(verbose=False)
         log.info("  Waiting until ledger close time {} exceeds {}...".format(ledger_close_time, epoch_wait_time))
 
+        if self.ledger_monitor and ledger_close_time <= epoch_wait_time and \
+                self.ledger_monitor.wait_for_close_time(epoch_wait_time) is not None:
+            ledger_close_time = self.ledger_monitor.ledger_time
+
         sleep_time = 2  # seconds
         while ledger_close_time <= epoch_wait_time:
             if verbose:
                 log.info("  Wait {} seconds and retry for ledger close time {} to exceed {} [set wait time]...".
                          format(sleep_time, ledger_close_time, epoch_wait_time))
             time.sleep(sleep_time)
+            if self.standalone_mode:
+                self.advance_ledger()
             ledger_close_time = self.get_ledger_close_time(verbose=False)
 
         log.info("  Ledger close time {} exceeds wait time {}".format(ledger_close_time, epoch_wait_time))
@@ -2148,23 +2022,24 @@ class RippledServer(AMM_mixin):
         if verbose:
             log.info("")
             log.info("Waiting for ledger close...")
+        return self.aio.run(self.aio.wait_for_ledger_close(seq, verbose=verbose))
 
-        max_timeout = 30  # max sec for ledger close
-        start_time = time.time()
-        end_time = start_time + max_timeout
-        while time.time() <= end_time:
-            current_ledger = self.ledger_current(verbose=verbose)
-            if int(current_ledger) < int(seq):
-                if verbose:
-                    log.info(
-                        "Waiting for leger to close. Current ledger at {} [target: {}]".format(current_ledger, seq))
-                time.sleep(1)
-            else:
-                if verbose:
-                    log.info("Ledger closed. Current ledger at {} [target: {}]".format(current_ledger, seq))
-                return True
-
-        return False
+    def update_xrp_balance_with_payment(self, response):
+        """
+        Debit the sender and credit the destination of a validated Payment
+        """
+        log.debug("Payment transaction")
+        try:
+            account_id = response["tx_json"]["Account"]
+            dest_account_id = response["tx_json"]["Destination"]
+            debit_amount = credit_amount = response["tx_json"]["Amount"]
+            if 'SendMax' in response["tx_json"]:
+                log.debug("SendMax found in response")
+                debit_amount = response["tx_json"]["SendMax"]
+            self.update_xrp_balance_with_txn_amount(account_id, debit_amount, mode=constants.XRP_DEBIT)
+            self.update_xrp_balance_with_txn_amount(dest_account_id, credit_amount, mode=constants.XRP_CREDIT)
+        except KeyError as e:
+            log.debug("key '{}' not found".format(e))
 
     def update_xrp_balance_with_txn_amount(self, account_id, amount, mode):
         log.debug("")
@@ -2188,16 +2063,22 @@ class RippledServer(AMM_mixin):
         log.debug("{} {} for account '{}' [updated balance: {}]".format(amount, mode, account_id,
                                                                         Account.xrp_balance[self][account_id]))
 
-    def update_account_sequence(self, payload):
+    def update_account_sequence(self, payload, response=None):
         if "Account" in payload["tx_json"]:
             account_id = payload["tx_json"]["Account"]
 
             if "TicketSequence" in payload["tx_json"]:
+                if response:
+                    return
                 Account.last_recorded_account_sequence[self][account_id] = self.get_account_sequence(account_id) - 1
             elif "Sequence" in payload["tx_json"]:
                 Account.last_recorded_account_sequence[self][account_id] = payload["tx_json"]["Sequence"]
+            elif response and "Sequence" in response.get("tx_json", {}):
+                # Sequence allocated for the submitted transaction
+                Account.last_recorded_account_sequence[self][account_id] = response["tx_json"]["Sequence"]
             else:
-                Account.last_recorded_account_sequence[self][account_id] = self.get_account_sequence(account_id)
+                # Recorded from the response once submitted
+                return
 
             log.debug("")
             log.debug("'last recorded account sequence' for {} updated to: {}".format(
@@ -2227,54 +2108,20 @@ class RippledServer(AMM_mixin):
 
     def is_transaction_validated(self, response=None, tx_id=None, engine_result="tesSUCCESS", max_timeout=30,
                                  verbose=True):
-        if verbose:
-            log.info("Wait for transaction to be validated...")
-
-        perform_txn_validation = False
-        if tx_id:
-            perform_txn_validation = True
-        elif response:
+        if response and not tx_id:
             log.debug("Response to verify: {}".format(response))
-            tx_id = response["tx_json"]["hash"]
-            if "engine_result" in response:
-                if response["engine_result"] == "tesSUCCESS" or response["engine_result"] == "terQUEUED" or \
-                        response["engine_result"] == "tecKILLED":  # OfferCreate tecKILLED flag
-                    perform_txn_validation = True
-            elif response["status"] == "success":
-                perform_txn_validation = True
-        else:
-            log.error("'response' or 'tx_id' should be passed")
-
-        if perform_txn_validation:
-            log.debug("Transaction ID: '{}'".format(tx_id))
-            start_time = time.time()
-            end_time = start_time + max_timeout
-            transaction_result = None
-            while time.time() <= end_time:
-                tx_response = self.tx(tx_id, verbose=False)
-                if "validated" in tx_response:
-                    log.debug("Txn response \"validated\": {}".format(tx_response["validated"]))
-                    if "meta" in tx_response:
-                        transaction_result = tx_response["meta"]["TransactionResult"]
-                    if tx_response["validated"]:
-                        if response and response["engine_result"] == "terQUEUED":
-                            log.debug("  As expected, transaction is validated")
-                            return True
-                        else:
-                            if tx_response["meta"]["TransactionResult"] == engine_result:
-                                log.debug("  As expected, transaction is validated")
-                                return True
-                log.debug("  Wait for a second and retry...")
-                time.sleep(1)
-            log.info("  Transaction not validated: {} ({})".format(tx_id, transaction_result))
-
-        return False
+        return self.aio.run(self.aio.is_transaction_validated(response=response, tx_id=tx_id,
+                                                              engine_result=engine_result, max_timeout=max_timeout,
+                                                              verbose=verbose))
 
     def advance_ledger_with_transactions(self, num_of_txns):
         log.info("")
         log.info("Creating {} transactions to advance ledger faster...".format(num_of_txns))
 
-        account_1 = self.create_account(fund=True, verbose=False)
+        # Payments use tickets of account_1, so they are all in flight at once; fund it for their reserve
+        ticket_reserve = int(constants.OWNER_RESERVE) * min(num_of_txns + 1, constants.TICKET_BATCH_SIZE)
+        account_1 = self.create_account(fund=True, amount=str(int(constants.DEFAULT_ACCOUNT_BALANCE) + ticket_reserve),
+                                         verbose=False)
         account_2 = self.create_account(fund=True, verbose=False)
 
         payload = {
@@ -2287,10 +2134,18 @@ class RippledServer(AMM_mixin):
             "secret": account_1.master_seed
         }
 
-        for i in range(0, num_of_txns + 1):
-            payment_response = self.execute_transaction(payload=payload, wait_for_ledger_close=False, verbose=False)
+        self.aio.run(TicketManager.submit_all(self.aio, [payload] * (num_of_txns + 1)))
 
     def wait_for_ledger_to_advance_for_account_delete(self, account, num_of_seq=256):
+        if self.standalone_mode:
+            # Closing ledgers directly is one cheap request each; submitted transactions share ledgers
+            ledgers_to_close = self.get_account_sequence(account) + num_of_seq - int(self.ledger_current(verbose=False))
+            log.info("")
+            log.info("Closing {} ledgers for account delete...".format(max(ledgers_to_close + 1, 0)))
+            for _ in range(ledgers_to_close + 1):
+                self.advance_ledger()
+            return
+
         self.advance_ledger_with_transactions(num_of_seq)
         log.info("")
         log.info("Wait for current ledger index to be {} more than account sequence ({})...".format(
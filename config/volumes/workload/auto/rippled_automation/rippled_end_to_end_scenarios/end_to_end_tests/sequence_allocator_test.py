@@ -0,0 +1,84 @@
+import asyncio
+
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests.async_rippled import AsyncRippledServer
+from rippled_automation.rippled_end_to_end_scenarios.utils.sequence_allocator import SequenceAllocator
+
+offlineTestSuite = True  # unit tests of client-side sequence allocation: no rippled needed
+
+ACCOUNT = "rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh"
+
+
+def test_allocate_from_seed():
+    allocator = SequenceAllocator("test")
+    allocator.seed(ACCOUNT, 5)
+    allocator.seed(ACCOUNT, 100)  # the first seed wins
+
+    assert [allocator.allocate(ACCOUNT) for _ in range(3)] == [5, 6, 7]
+    assert allocator.peek(ACCOUNT) == 8
+
+
+def test_release_last_sequence():
+    allocator = SequenceAllocator("test")
+    allocator.seed(ACCOUNT, 5)
+    sequence = allocator.allocate(ACCOUNT)
+
+    allocator.release(ACCOUNT, sequence)
+
+    assert allocator.allocate(ACCOUNT) == 5
+
+
+def test_release_with_later_sequences_resyncs():
+    allocator = SequenceAllocator("test")
+    allocator.seed(ACCOUNT, 5)
+    sequence = allocator.allocate(ACCOUNT)
+    allocator.allocate(ACCOUNT)
+
+    allocator.release(ACCOUNT, sequence)
+
+    assert not allocator.is_seeded(ACCOUNT)
+
+
+def test_invalidate():
+    allocator = SequenceAllocator("test")
+    allocator.seed(ACCOUNT, 5)
+
+    allocator.invalidate(ACCOUNT)
+    allocator.invalidate(ACCOUNT)
+
+    assert not allocator.is_seeded(ACCOUNT)
+    allocator.seed(ACCOUNT, 9)
+    assert allocator.allocate(ACCOUNT) == 9
+
+
+def test_join_queue_in_order():
+    allocator = SequenceAllocator("test")
+    previous_1, turn_1 = allocator.join_queue(ACCOUNT)
+    previous_2, turn_2 = allocator.join_queue(ACCOUNT)
+
+    assert previous_1 is None
+    assert previous_2 is turn_1 and not previous_2.done()
+    allocator.leave_queue(ACCOUNT, turn_1)
+    assert previous_2.done()
+
+    allocator.leave_queue(ACCOUNT, turn_2)
+    assert allocator.join_queue(ACCOUNT)[0] is None
+
+
+def test_ticket_transaction_is_not_resynced():
+    server = AsyncRippledServer("localhost:1", server_name="test")
+    requests = []
+
+    async def send_request(request, account_id=None):
+        requests.append(request)
+        return {"result": {"engine_result": "tefPAST_SEQ", "engine_result_message": "This sequence number has "
+                                                                                     "already passed."}}
+    server.send_request = send_request
+    request = {"method": "submit", "params": [{"secret": "snoPBrXtMeMyMHUVTgbuqAfg1SUTb", "tx_json": {
+        "TransactionType": "Payment", "Account": ACCOUNT, "Destination": ACCOUNT, "Amount": "1",
+        "Sequence": 0, "TicketSequence": 10}}]}
+
+    result = asyncio.run(server.execute_command(request, verbose=False))
+
+    assert result["engine_result"] == "tefPAST_SEQ"
+    assert len(requests) == 1
+    assert requests[0]["params"][0]["tx_json"]["Sequence"] == 0
@@ -219,9 +219,7 @@ class Witnesses(RippledServer):
         while time.time() <= end_time:
             for chain in [mainchain, sidechain]:
                 log.debug(f"Advance '{chain}' ledger to trigger witness server to get initialized...")
-                cmd_ledger_advance = "{} --conf {} ledger_accept --silent".format(chain.rippled_exec,
-                                                                                  chain.rippled_config)
-                helper.run_external_command(cmd_ledger_advance, skip_logging=True)
+                chain.advance_ledger()
 
             response = witness_server.execute_transaction(payload=payload, method="server_info", verbose=False)
             log.debug(f"'{witness_name}' server_info: {response}")
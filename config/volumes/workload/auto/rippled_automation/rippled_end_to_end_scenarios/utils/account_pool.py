@@ -0,0 +1,131 @@
+import queue
+import threading
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+
+class AccountPool:
+    """
+    Pre-funded accounts ready for tests to use.
+
+    A background thread keeps up to `size` funded accounts in the pool. Funding payments of a batch are submitted
+    back to back (the funding account's sequences are allocated client-side), so many accounts are funded in the same
+    ledger, and are then awaited together. Tests draw accounts with get() or get_accounts(); a request larger than
+    what is ready is funded in batches by the caller alongside the background thread.
+    """
+    def __init__(self, rippled_server, size=constants.ACCOUNT_POOL_SIZE, batch_size=constants.ACCOUNT_POOL_BATCH_SIZE,
+                 amount=constants.DEFAULT_ACCOUNT_BALANCE):
+        """
+        @param rippled_server: RippledServer funding the accounts
+        @param size: accounts kept ready (0 to fund accounts on demand only)
+        @param batch_size: accounts funded per batch
+        @param amount: balance of each account (XRP drops)
+        """
+        self.rippled_server = rippled_server
+        self.size = int(size)
+        self.batch_size = max(int(batch_size), 1)
+        self.amount = amount
+        self.accounts_created = 0
+        self._accounts = queue.Queue()
+        self._stop_event = threading.Event()
+        self._replenish_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.size <= 0 or self._thread is not None:
+            return
+        log.debug("Starting account pool of {} accounts on {}".format(self.size, self.rippled_server.name))
+        self._thread = threading.Thread(target=self._replenish, name="account_pool", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._replenish_event.set()
+        if self._thread is not None:
+            self._thread.join(constants.ACCOUNT_POOL_WAIT_TIMEOUT)
+            self._thread = None
+        log.debug("Account pool: {} accounts created, {} unused".format(self.accounts_created,
+                                                                         self._accounts.qsize()))
+
+    def get(self, timeout=constants.ACCOUNT_POOL_WAIT_TIMEOUT):
+        """
+        Funded account from the pool, waiting up to timeout for the pool to refill before funding one directly
+        """
+        if self._thread is not None:
+            try:
+                account = self._accounts.get(timeout=timeout)
+                self._replenish_event.set()
+                return account
+            except queue.Empty:
+                log.warning("Account pool empty after {} seconds; funding account directly".format(timeout))
+        return self.get_accounts(1)[0]
+
+    def get_accounts(self, count):
+        """
+        List of count funded accounts; accounts not ready in the pool are funded right away in batches
+        """
+        accounts = []
+        while len(accounts) < count:
+            try:
+                accounts.append(self._accounts.get_nowait())
+            except queue.Empty:
+                break
+        self._replenish_event.set()
+
+        while len(accounts) < count:
+            funded_accounts = self.create_accounts(min(count - len(accounts), self.batch_size))
+            if not funded_accounts:
+                raise Exception("Account pool: unable to fund accounts")
+            accounts.extend(funded_accounts)
+        return accounts
+
+    def create_accounts(self, count):
+        """
+        Fund count new accounts together
+        return: list of accounts validated on ledger
+        """
+        accounts = []
+        responses = []
+        for _ in range(count):
+            account = self.rippled_server.create_account(verbose=False)
+            try:
+                response = self.rippled_server.fund_account(account.account_id, self.amount,
+                                                            wait_for_ledger_close=False, verbose=False)
+            except Exception as e:
+                response = {"error": str(e)}
+            responses.append(response)
+            accounts.append(account)
+
+        funded_accounts = []
+        for account, response in zip(accounts, responses):
+            if "tx_json" in response and self.rippled_server.is_transaction_validated(response, verbose=False):
+                # Funded without waiting for the ledger: keep the balances a waited funding would have kept
+                self.rippled_server.update_xrp_balance_with_payment(response)
+                funded_accounts.append(account)
+            else:
+                log.warning("Account pool: funding {} not validated: {}".format(
+                    account.account_id, response.get("engine_result", response.get("error"))))
+        self.accounts_created += len(funded_accounts)
+        log.debug("Account pool: {}/{} accounts funded".format(len(funded_accounts), count))
+        return funded_accounts
+
+    def _replenish(self):
+        while not self._stop_event.is_set():
+            missing = self.size - self._accounts.qsize()
+            if missing <= 0:
+                self._replenish_event.wait(constants.ACCOUNT_POOL_WAIT_TIMEOUT)
+                self._replenish_event.clear()
+                continue
+
+            try:
+                accounts = self.create_accounts(min(missing, self.batch_size))
+            except Exception as e:
+                log.warning("Account pool: failed to fund accounts ({}); retrying...".format(e))
+                accounts = []
+            for account in accounts:
+                self._accounts.put(account)
+            if not accounts:
+                self._stop_event.wait(constants.ACCOUNT_POOL_RETRY_INTERVAL)
@@ -1,7 +1,7 @@
-import requests
 import time
 from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
 from rippled_automation.rippled_end_to_end_scenarios.src.commands.account import Account
+from rippled_automation.rippled_end_to_end_scenarios.utils import keypairs
 from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
 
 log = log_helper.get_logger()
@@ -263,13 +263,12 @@ def payment(dest_account, amount=str(20_000000)):
 def setup_env(server, number_of_accounts, currency, trustline_limit=None):
     # TODO: Implement batch submission with exponential back-off to avoid rate-limiting by rippled and use for payments
     # and trustset
-    url = server.address
+    transport = server.transport
     base_wait = 0.05
     wait_factor = 2
 
     def wallet_propose():
-        data = {"method": "wallet_propose"}
-        account = requests.post(url, json=data).json()["result"]
+        account = keypairs.generate_wallet()
         return {"address": account["account_id"], "secret": account["master_seed"]}
 
     def trustline(account, currency):
@@ -293,7 +292,7 @@ def setup_env(server, number_of_accounts, currency, trustline_limit=None):
             account = wallet_propose()
             payload = payment(account["address"])  # TODO: pass server as a param to get server.funding_account.account_id?
             time.sleep(base_wait) # TODO: rewrite to back off like trustsets
-            result = requests.post(url, json=payload).json()["result"].get("engine_result")
+            result = transport.post(json=payload).json()["result"].get("engine_result")
             if result == 'tesSUCCESS':
                 accounts.append(account)
     except AttributeError as e:
@@ -312,7 +311,7 @@ def setup_env(server, number_of_accounts, currency, trustline_limit=None):
                 wait = base_wait
                 while not trustset:
                     trustset_payload = trustline(account, trustline_limit)
-                    result = requests.post(url, json=trustset_payload).json()["result"]
+                    result = transport.post(json=trustset_payload).json()["result"]
                     time.sleep(wait)
                     try:
                         if trustset := result["engine_result"] == "tesSUCCESS":
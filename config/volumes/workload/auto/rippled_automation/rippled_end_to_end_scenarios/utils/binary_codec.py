@@ -0,0 +1,256 @@
+import hashlib
+import struct
+from decimal import Decimal, InvalidOperation
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import keypairs
+
+TRANSACTION_SIGNING_PREFIX = b"STX\x00"
+TRANSACTION_MULTISIGNING_PREFIX = b"SMT\x00"
+TRANSACTION_ID_PREFIX = b"TXN\x00"
+
+OBJECT_END_MARKER = b"\xe1"
+ARRAY_END_MARKER = b"\xf1"
+PATH_SEPARATOR = b"\xff"
+PATHSET_END = b"\x00"
+PATH_TYPE_ACCOUNT = 0x01
+PATH_TYPE_CURRENCY = 0x10
+PATH_TYPE_ISSUER = 0x20
+
+UINT_SIZES = {"UInt8": 1, "UInt16": 2, "UInt32": 4, "UInt64": 8}
+HASH_SIZES = {"Hash128": 16, "Hash160": 20, "Hash192": 24, "Hash256": 32, "Hash384": 48, "Hash512": 64,
+              "UInt96": 12}
+UINT64_BASE_TEN_FIELDS = ("MaximumAmount", "OutstandingAmount", "MPTAmount")
+NAMED_UINT_FIELDS = {"TransactionType": "TRANSACTION_TYPES", "LedgerEntryType": "LEDGER_ENTRY_TYPES",
+                     "TransactionResult": "TRANSACTION_RESULTS"}
+# JSON keys of transactions returned by rippled that are not serialized fields
+NON_FIELD_KEYS = ("hash", "ctid", "date", "inLedger", "ledger_index", "validated")
+
+IOU_MIN_MANTISSA = 10 ** 15
+IOU_MAX_MANTISSA = 10 ** 16 - 1
+IOU_MIN_EXPONENT = -96
+IOU_MAX_EXPONENT = 80
+
+
+class UnsupportedTransaction(Exception):
+    """
+    Raised for transactions the codec cannot serialize exactly like rippled would; sign those on the server
+    """
+
+
+class BinaryCodec:
+    """
+    XRPL canonical binary serialization of transactions (tx_blob), driven by a server's "server_definitions"
+    response so field codes always match the server under test.
+
+    Fields are written sorted by (type code, field code), each behind its field id header. Transactions using a
+    field or value it does not know raise UnsupportedTransaction; rippled signs those (and reports their errors).
+    """
+    def __init__(self, definitions):
+        """
+        @param definitions: result of the "server_definitions" RPC
+        """
+        self.type_codes = definitions["TYPES"]
+        self.named_values = {field_name: definitions[key] for field_name, key in NAMED_UINT_FIELDS.items()}
+        self.fields = {}
+        for field_name, field_info in definitions["FIELDS"]:
+            type_code = self.type_codes.get(field_info["type"], -1)
+            if field_info["isSerialized"] and 0 < type_code < 256 and field_info["nth"] > 0:
+                self.fields[field_name] = dict(field_info, name=field_name, type_code=type_code,
+                                               header=self._field_header(type_code, field_info["nth"]))
+
+    def encode(self, tx_json, signing_only=False):
+        return self._encode_object(tx_json, signing_only)
+
+    def signing_data(self, tx_json):
+        return TRANSACTION_SIGNING_PREFIX + self.encode(tx_json, signing_only=True)
+
+    def multisigning_data(self, tx_json, account_id):
+        return TRANSACTION_MULTISIGNING_PREFIX + self.encode(tx_json, signing_only=True) + \
+            decode_account_id(account_id)
+
+    @staticmethod
+    def transaction_hash(tx_blob):
+        return hashlib.sha512(TRANSACTION_ID_PREFIX + tx_blob).digest()[:32].hex().upper()
+
+    @staticmethod
+    def _field_header(type_code, nth):
+        if type_code < 16:
+            return bytes([(type_code << 4) | nth]) if nth < 16 else bytes([type_code << 4, nth])
+        return bytes([nth, type_code]) if nth < 16 else bytes([0, type_code, nth])
+
+    def _encode_object(self, json_object, signing_only=False):
+        fields = []
+        for field_name, value in json_object.items():
+            if field_name in NON_FIELD_KEYS:
+                continue
+            if field_name == "DeliverMax" and "Amount" not in json_object:
+                field_name = "Amount"
+            field = self.fields.get(field_name)
+            if field is None:
+                raise UnsupportedTransaction("Unknown field: {}".format(field_name))
+            if signing_only and not field["isSigningField"]:
+                continue
+            fields.append((field, value))
+
+        encoded = b""
+        for field, value in sorted(fields, key=lambda field_value: (field_value[0]["type_code"],
+                                                                   field_value[0]["nth"])):
+            encoded += field["header"] + self._encode_field(field, value)
+        return encoded
+
+    def _encode_field(self, field, value):
+        field_type = field["type"]
+        try:
+            if field_type in UINT_SIZES:
+                return self._encode_uint(field, value)
+            if field_type in HASH_SIZES:
+                data = bytes.fromhex(value)
+                if len(data) != HASH_SIZES[field_type]:
+                    raise ValueError("expected {} bytes".format(HASH_SIZES[field_type]))
+                return data
+            if field_type == "Int32":
+                return struct.pack(">i", int(value))
+            if field_type == "Amount":
+                return encode_amount(value)
+            if field_type == "Blob":
+                return encode_length(len(bytes.fromhex(value))) + bytes.fromhex(value)
+            if field_type == "AccountID":
+                return encode_length(20) + decode_account_id(value)
+            if field_type == "Currency":
+                return encode_currency(value)
+            if field_type == "Issue":
+                return encode_issue(value)
+            if field_type == "XChainBridge":
+                return encode_length(20) + decode_account_id(value["LockingChainDoor"]) + \
+                    encode_issue(value["LockingChainIssue"]) + \
+                    encode_length(20) + decode_account_id(value["IssuingChainDoor"]) + \
+                    encode_issue(value["IssuingChainIssue"])
+            if field_type == "PathSet":
+                return encode_path_set(value)
+            if field_type == "Vector256":
+                data = b"".join(bytes.fromhex(item) for item in value)
+                return encode_length(len(data)) + data
+            if field_type == "STObject":
+                return self._encode_object(value) + OBJECT_END_MARKER
+            if field_type == "STArray":
+                return self._encode_array(value) + ARRAY_END_MARKER
+        except (ValueError, TypeError, KeyError, AttributeError, InvalidOperation, struct.error) as e:
+            raise UnsupportedTransaction("Invalid {} value for {}: {} ({})".format(field_type, field["name"],
+                                                                                  value, e))
+        raise UnsupportedTransaction("Unsupported field type {} ({})".format(field_type, field["name"]))
+
+    def _encode_uint(self, field, value):
+        field_name = field["name"]
+        if isinstance(value, str):
+            if field_name in self.named_values:
+                value = self.named_values[field_name][value]
+            elif field["type"] == "UInt64":
+                value = int(value, 10 if field_name in UINT64_BASE_TEN_FIELDS else 16)
+            else:
+                value = int(value)
+        if isinstance(value, bool):
+            raise ValueError("boolean")
+        return int(value).to_bytes(UINT_SIZES[field["type"]], "big")
+
+    def _encode_array(self, json_array):
+        encoded = b""
+        for element in json_array:
+            if len(element) != 1:
+                raise ValueError("array element must wrap one object")
+            (field_name, value), = element.items()
+            field = self.fields.get(field_name)
+            if field is None or field["type"] != "STObject":
+                raise UnsupportedTransaction("Unknown array element: {}".format(field_name))
+            encoded += field["header"] + self._encode_object(value) + OBJECT_END_MARKER
+        return encoded
+
+
+def encode_length(length):
+    if length <= 192:
+        return bytes([length])
+    if length <= 12480:
+        length -= 193
+        return bytes([193 + (length >> 8), length & 0xFF])
+    if length <= 918744:
+        length -= 12481
+        return bytes([241 + (length >> 16), (length >> 8) & 0xFF, length & 0xFF])
+    raise ValueError("length {} too large".format(length))
+
+
+def decode_account_id(address):
+    payload = keypairs.base58_check_decode(address)
+    if len(payload) != 21 or payload[:1] != keypairs.ACCOUNT_ID_PREFIX:
+        raise ValueError("Invalid account: {}".format(address))
+    return payload[1:]
+
+
+def encode_currency(currency):
+    if len(currency) == 40:
+        return bytes.fromhex(currency)
+    if len(currency) != 3:
+        raise ValueError("Invalid currency: {}".format(currency))
+    if currency == "XRP":
+        return bytes(20)
+    return bytes(12) + currency.encode("ascii") + bytes(5)
+
+
+def encode_issue(issue):
+    if "mpt_issuance_id" in issue:
+        return bytes.fromhex(issue["mpt_issuance_id"])
+    if issue["currency"] == "XRP":
+        return bytes(20)
+    return encode_currency(issue["currency"]) + decode_account_id(issue["issuer"])
+
+
+def encode_amount(amount):
+    if isinstance(amount, (str, int)) and not isinstance(amount, bool):
+        drops = int(amount)
+        sign_bit = 0x4000000000000000 if drops >= 0 else 0
+        return (sign_bit | abs(drops)).to_bytes(8, "big")
+    if "mpt_issuance_id" in amount:
+        value = int(amount["value"])
+        return bytes([0x60 if value >= 0 else 0x20]) + abs(value).to_bytes(8, "big") + \
+            bytes.fromhex(amount["mpt_issuance_id"])
+    return encode_iou_value(amount["value"]) + encode_currency(amount["currency"]) + \
+        decode_account_id(amount["issuer"])
+
+
+def encode_iou_value(value):
+    value = Decimal(str(value))
+    if value == 0:
+        return (0x8000000000000000).to_bytes(8, "big")
+    sign, digits, exponent = value.as_tuple()
+    mantissa = int("".join(str(digit) for digit in digits))
+    while mantissa < IOU_MIN_MANTISSA:
+        mantissa *= 10
+        exponent -= 1
+    while mantissa > IOU_MAX_MANTISSA:
+        if mantissa % 10:
+            raise ValueError("{} has more than 16 significant digits".format(value))
+        mantissa //= 10
+        exponent += 1
+    if not IOU_MIN_EXPONENT <= exponent <= IOU_MAX_EXPONENT:
+        raise ValueError("{} out of range".format(value))
+    encoded = 0x8000000000000000 | (0 if sign else 0x4000000000000000) | ((exponent + 97) << 54) | mantissa
+    return encoded.to_bytes(8, "big")
+
+
+def encode_path_set(path_set):
+    encoded = b""
+    for index, path in enumerate(path_set):
+        if index:
+            encoded += PATH_SEPARATOR
+        for step in path:
+            step_type = 0
+            step_data = b""
+            if "account" in step:
+                step_type |= PATH_TYPE_ACCOUNT
+                step_data += decode_account_id(step["account"])
+            if "currency" in step:
+                step_type |= PATH_TYPE_CURRENCY
+                step_data += encode_currency(step["currency"])
+            if "issuer" in step:
+                step_type |= PATH_TYPE_ISSUER
+                step_data += decode_account_id(step["issuer"])
+            encoded += bytes([step_type]) + step_data
+    return encoded + PATHSET_END
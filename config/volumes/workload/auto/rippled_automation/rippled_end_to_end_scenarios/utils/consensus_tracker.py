@@ -0,0 +1,298 @@
+import json
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from functools import partial
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.utils.ws_client import WebSocketClient
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+
+class LedgerConsensus:
+    """
+    What every node reported about one ledger index
+    """
+    def __init__(self, ledger_index):
+        self.ledger_index = ledger_index
+        self.closes = {}  # node -> (arrival time, ledger hash, ledger close time)
+        self.validations = {}  # node -> {validator key -> (arrival time on the node, ledger hash)}
+
+    def add_close(self, node, arrival_time, ledger_hash, ledger_time):
+        self.closes.setdefault(node, (arrival_time, ledger_hash, ledger_time))
+
+    def add_validation(self, node, validator, arrival_time, ledger_hash):
+        self.validations.setdefault(node, {}).setdefault(validator, (arrival_time, ledger_hash))
+
+    def first_validations(self):
+        """
+        validator key -> (first arrival time on any node, ledger hash)
+        """
+        first = {}
+        for validations in self.validations.values():
+            for validator, (arrival_time, ledger_hash) in validations.items():
+                if validator not in first or arrival_time < first[validator][0]:
+                    first[validator] = (arrival_time, ledger_hash)
+        return first
+
+    @staticmethod
+    def quorum_latency(validations, ledger_hash, quorum):
+        """
+        Time from the first validation of ledger_hash to the quorum-th one (None if fewer arrived)
+        @param validations: validator key -> (arrival time, ledger hash)
+        """
+        agreeing = sorted(arrival_time for arrival_time, validation_hash in validations.values()
+                          if validation_hash == ledger_hash)
+        return agreeing[quorum - 1] - agreeing[0] if quorum and len(agreeing) >= quorum else None
+
+    def summarize(self, nodes, previous_close, quorum, lag_threshold):
+        """
+        @param nodes: every tracked node (nodes without a close are lagging)
+        @param previous_close: first arrival of the previous ledger's close (None if unknown)
+        @param quorum: validations needed to validate a ledger (None: CONSENSUS_QUORUM_FRACTION of validators seen)
+        return: dict of the ledger's timings (one row of the time series)
+        """
+        validations = self.first_validations()
+        hashes = Counter(ledger_hash for _, ledger_hash, _ in self.closes.values())
+        hashes.update(ledger_hash for _, ledger_hash in validations.values())
+        ledger_hash = hashes.most_common(1)[0][0] if hashes else None
+        arrivals = sorted(arrival_time for arrival_time, _, _ in self.closes.values())
+        first_close = arrivals[0] if arrivals else None
+        quorum = quorum or math.ceil(len(validations) * constants.CONSENSUS_QUORUM_FRACTION)
+        disagreeing_validators = sum(1 for _, validation_hash in validations.values() if validation_hash != ledger_hash)
+
+        node_lag, node_hash, node_quorum_latency = {}, {}, {}
+        for node in nodes:
+            close = self.closes.get(node)
+            node_lag[node] = None if close is None else close[0] - first_close
+            node_hash[node] = None if close is None else close[1]
+            node_quorum_latency[node] = self.quorum_latency(self.validations.get(node, {}), ledger_hash, quorum)
+        return {
+            "ledger_index": self.ledger_index,
+            "ledger_hash": ledger_hash,
+            "close_time": first_close,
+            "ledger_time": next((ledger_time for _, _, ledger_time in self.closes.values()), None),
+            "close_interval": first_close - previous_close if first_close and previous_close else None,
+            "close_spread": arrivals[-1] - first_close if arrivals else None,
+            "quorum_latency": self.quorum_latency(validations, ledger_hash, quorum),
+            "validations": len(validations),
+            "disagreeing_validators": disagreeing_validators,
+            "node_hash": node_hash,  # hash each node validated (None: not published)
+            "disagreeing_nodes": [node for node, validated_hash in node_hash.items()
+                                  if validated_hash is not None and validated_hash != ledger_hash],
+            "node_quorum_latency": node_quorum_latency,
+            "node_lag": node_lag,
+            "lagging_nodes": [node for node, lag in node_lag.items() if lag is None or lag > lag_threshold],
+        }
+
+
+class ConsensusTracker:
+    """
+    Ledger close and validation timings of a network, seen from every node at once.
+
+    Subscribes to the "ledger" and "validations" streams of each node and records, per ledger index, when each node
+    published the validated ledger (and which hash) and when each validator's validation arrived on each node. A
+    ledger is summarized once CONSENSUS_FINALIZE_LEDGERS later ledgers were published: close interval (time between
+    the first publications of consecutive ledgers), close spread across nodes, validation quorum latency (first to
+    quorum-th validation of the network's hash) over the first arrivals on any node and as seen by each node,
+    disagreeing validators, the nodes that validated another hash and the nodes lagging the first one by more than
+    lag_threshold (or not publishing it at all). Summaries are kept as a time series, appended to a JSON lines file
+    and exported to Prometheus (collect()).
+    """
+    def __init__(self, ws_addresses, node_names=None, quorum=None, lag_threshold=constants.CONSENSUS_LAG_THRESHOLD):
+        """
+        @param ws_addresses: websocket address of every node (host:port or ws://host:port)
+        @param node_names: node label of each address (host:port by default)
+        @param quorum: validations needed to validate a ledger (default: validation_quorum of the first node)
+        @param lag_threshold: seconds behind the first node before a node counts as lagging
+        """
+        self.addresses = [address if "://" in address else "ws://{}".format(address) for address in ws_addresses]
+        self.nodes = node_names or [address.split("://", 1)[1] for address in self.addresses]
+        self.quorum = quorum
+        self.lag_threshold = lag_threshold
+        self.ledgers = OrderedDict()  # ledger index -> LedgerConsensus, not summarized yet
+        self.series = deque(maxlen=constants.CONSENSUS_LEDGER_HISTORY)
+        self.lagging = Counter()  # node -> ledgers it lagged on
+        self.disagreeing = Counter()  # node -> ledgers it validated with another hash
+        self.last_summarized = None
+        self._listeners = {}
+        self._output = None
+        self._lock = threading.Lock()
+
+    def start(self, path=None, timeout=constants.STREAM_CONNECT_TIMEOUT):
+        """
+        Subscribe to every node
+        @param path: JSON lines file the ledger summaries are appended to
+        return: number of nodes subscribed to
+        """
+        if path:
+            self._output = open(path, "a")
+        subscribed = 0
+        for address, node in zip(self.addresses, self.nodes):
+            ws_client = WebSocketClient.get(address)
+            listener = partial(self._on_message, node)
+            ws_client.add_stream_listener(listener)
+            try:
+                # Subscribed separately: the ledger stream may be shared with a LedgerCloseMonitor
+                for stream in ("ledger", "validations"):
+                    response = ws_client.subscribe(timeout=timeout, streams=[stream])
+                    if response.get("status") != "success":
+                        raise Exception(response.get("error", response))
+                if self.quorum is None:
+                    response = ws_client.request({"command": "server_info"}, timeout=timeout)
+                    self.quorum = response.get("result", {}).get("info", {}).get("validation_quorum")
+            except Exception as e:
+                log.warning("Cannot track consensus on {}: {}".format(node, e))
+                ws_client.remove_stream_listener(listener)
+                continue
+            self._listeners[address] = listener
+            subscribed += 1
+        log.info("Tracking consensus on {} of {} nodes (quorum {})".format(subscribed, len(self.nodes),
+                                                                            self.quorum or "unknown"))
+        return subscribed
+
+    def stop(self):
+        for address, listener in self._listeners.items():
+            ws_client = WebSocketClient.get(address)
+            ws_client.remove_stream_listener(listener)
+            try:
+                ws_client.unsubscribe(timeout=constants.STREAM_CONNECT_TIMEOUT, streams=["validations"])
+            except Exception as e:
+                log.debug("Cannot unsubscribe from {}: {}".format(address, e))
+        self._listeners = {}
+        if self._output is not None:
+            self._output.close()
+            self._output = None
+
+    def _on_message(self, node, message):
+        arrival_time = time.time()
+        message_type = message.get("type")
+        if message_type not in ("ledgerClosed", "validationReceived"):
+            return
+        ledger_index = int(message["ledger_index"])
+        with self._lock:
+            if self.last_summarized is not None and ledger_index <= self.last_summarized:
+                return
+            ledger = self.ledgers.get(ledger_index)
+            if ledger is None:
+                ledger = self.ledgers[ledger_index] = LedgerConsensus(ledger_index)
+            if message_type == "ledgerClosed":
+                ledger.add_close(node, arrival_time, message.get("ledger_hash"), message.get("ledger_time"))
+                self._summarize_until(ledger_index - constants.CONSENSUS_FINALIZE_LEDGERS)
+            else:
+                ledger.add_validation(node, message.get("master_key") or message.get("validation_public_key"),
+                                      arrival_time, message.get("ledger_hash"))
+
+    def _summarize_until(self, ledger_index):
+        for index in sorted(index for index in self.ledgers if index <= ledger_index):
+            ledger = self.ledgers.pop(index)
+            previous = self.series[-1] if self.series else None
+            previous_close = previous["close_time"] if previous and previous["ledger_index"] == index - 1 else None
+            row = ledger.summarize(self.nodes, previous_close, self.quorum, self.lag_threshold)
+            self.series.append(row)
+            self.lagging.update(row["lagging_nodes"])
+            self.disagreeing.update(row["disagreeing_nodes"])
+            self.last_summarized = index
+            self._log_row(row)
+            if self._output is not None:
+                self._output.write(json.dumps(row) + "\n")
+                self._output.flush()
+
+    @staticmethod
+    def _log_row(row):
+        lagging = ", ".join("{} ({})".format(node, "missing" if row["node_lag"][node] is None else
+                                             "{:.2f} s".format(row["node_lag"][node]))
+                            for node in row["lagging_nodes"])
+        log.info("Ledger {}: interval {}, spread {}, quorum in {}, {} validations ({} disagreeing){}{}".format(
+            row["ledger_index"], format_seconds(row["close_interval"]), format_seconds(row["close_spread"]),
+            format_seconds(row["quorum_latency"]), row["validations"], row["disagreeing_validators"],
+            ", NODES DISAGREE: {}".format(", ".join("{} ({})".format(node, row["node_hash"][node])
+                                                    for node in row["disagreeing_nodes"]))
+            if row["disagreeing_nodes"] else "", ", lagging: {}".format(lagging) if lagging else ""))
+
+    def summary(self):
+        with self._lock:
+            series = list(self.series)
+            lagging = dict(self.lagging)
+            disagreeing = dict(self.disagreeing)
+        intervals = [row["close_interval"] for row in series if row["close_interval"] is not None]
+        quorum_latencies = [row["quorum_latency"] for row in series if row["quorum_latency"] is not None]
+        return {
+            "ledgers": len(series),
+            "close_interval_mean": sum(intervals) / len(intervals) if intervals else None,
+            "close_interval_max": max(intervals, default=None),
+            "quorum_latency_mean": sum(quorum_latencies) / len(quorum_latencies) if quorum_latencies else None,
+            "quorum_latency_max": max(quorum_latencies, default=None),
+            "disagreements": sum(1 for row in series if row["disagreeing_nodes"]),
+            "disagreeing": disagreeing,
+            "lagging": lagging,
+        }
+
+    def log_summary(self):
+        summary = self.summary()
+        log.info("{} ledgers: close interval mean {} max {}, quorum latency mean {} max {}, {} disagreements "
+                 "(per node: {}), lagging ledgers per node: {}".format(
+                     summary["ledgers"], format_seconds(summary["close_interval_mean"]),
+                     format_seconds(summary["close_interval_max"]), format_seconds(summary["quorum_latency_mean"]),
+                     format_seconds(summary["quorum_latency_max"]), summary["disagreements"],
+                     summary["disagreeing"] or "none", summary["lagging"] or "none"))
+
+    def collect(self):
+        """
+        Prometheus collector: timings of the last summarized ledger, lagging and disagreeing ledgers per node
+        """
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        with self._lock:
+            row = self.series[-1] if self.series else None
+            lagging = dict(self.lagging)
+            disagreeing = dict(self.disagreeing)
+        if row is None:
+            return
+        for name, key, documentation in (
+                ("rippled_consensus_ledger_index", "ledger_index", "Last summarized validated ledger"),
+                ("rippled_consensus_close_interval_seconds", "close_interval",
+                 "Time between the first publications of consecutive validated ledgers"),
+                ("rippled_consensus_close_spread_seconds", "close_spread",
+                 "Time between the first and last node publishing the ledger"),
+                ("rippled_consensus_quorum_latency_seconds", "quorum_latency",
+                 "Time from the first validation to a quorum of agreeing validations"),
+                ("rippled_consensus_validations", "validations", "Validators that validated the ledger"),
+                ("rippled_consensus_disagreeing_validators", "disagreeing_validators",
+                 "Validators that validated another hash"),
+        ):
+            if row[key] is not None:
+                family = GaugeMetricFamily(name, documentation)
+                family.add_metric([], row[key])
+                yield family
+        lag_family = GaugeMetricFamily("rippled_consensus_node_lag_seconds",
+                                       "Time behind the first node publishing the ledger", labels=["node"])
+        for node, lag in row["node_lag"].items():
+            if lag is not None:
+                lag_family.add_metric([node], lag)
+        yield lag_family
+        node_quorum_family = GaugeMetricFamily("rippled_consensus_node_quorum_latency_seconds",
+                                               "Time from the first validation to a quorum of agreeing validations "
+                                               "on the node", labels=["node"])
+        for node, latency in row["node_quorum_latency"].items():
+            if latency is not None:
+                node_quorum_family.add_metric([node], latency)
+        yield node_quorum_family
+        lagging_family = CounterMetricFamily("rippled_consensus_lagging_ledgers",
+                                             "Ledgers the node published late or not at all", labels=["node"])
+        for node in self.nodes:
+            lagging_family.add_metric([node], lagging.get(node, 0))
+        yield lagging_family
+        disagreeing_family = CounterMetricFamily("rippled_consensus_disagreeing_ledgers",
+                                                 "Ledgers the node validated with another hash than the network",
+                                                 labels=["node"])
+        for node in self.nodes:
+            disagreeing_family.add_metric([node], disagreeing.get(node, 0))
+        yield disagreeing_family
+
+
+def format_seconds(seconds):
+    return "-" if seconds is None else "{:.3f} s".format(seconds)
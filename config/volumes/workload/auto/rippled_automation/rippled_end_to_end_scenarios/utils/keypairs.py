@@ -0,0 +1,499 @@
+"""
+Offline XRPL wallet generation and signing: seeds, secp256k1/ed25519 keypairs, classic addresses and signatures.
+
+Wallets have the same fields as a wallet_propose result (master_key is the RFC 1751 mnemonic of the seed), so they
+can be passed to Account() or written to account files as is. Elliptic curve
+multiplications only ever use the curve generator, so they are done with precomputed tables of multiples of the
+generator (one addition per byte of the scalar, no doublings), and generate_wallets() converts the resulting points
+of a whole batch to affine coordinates with a single modular inversion.
+"""
+import hashlib
+import hmac
+import os
+import struct
+
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.utils import rfc1751
+
+KEY_TYPE_SECP256K1 = "secp256k1"
+KEY_TYPE_ED25519 = "ed25519"
+
+XRPL_ALPHABET = "rpshnaf39wBUDNEGHJKLM4PQRST7VWXYZ2bcdeCg65jkm8oFqi1tuvAxyz"
+ACCOUNT_ID_PREFIX = b"\x00"
+ACCOUNT_PUBLIC_KEY_PREFIX = b"\x23"
+FAMILY_SEED_PREFIX = b"\x21"
+ED25519_SEED_PREFIX = b"\x01\xe1\x4b"
+SEED_LENGTH = 16
+
+# secp256k1
+SECP256K1_P = 2 ** 256 - 2 ** 32 - 977
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+SECP256K1_G = (0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+               0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8)
+
+# ed25519
+ED25519_Q = 2 ** 255 - 19
+ED25519_L = 2 ** 252 + 27742317777372353535851937790883648493
+ED25519_D = -121665 * pow(121666, -1, ED25519_Q) % ED25519_Q
+ED25519_B = (15112221349535400772501151409588531511454012693041857206046113283949847762202,
+             46316835694926478169428394003475163141307993866256225615783033603165251855960)
+
+WINDOW_BITS = 8
+WINDOW_SIZE = 1 << WINDOW_BITS
+WINDOW_COUNT = 256 // WINDOW_BITS
+
+_secp256k1_table = None
+_ed25519_table = None
+
+
+def generate_wallet(key_type=constants.DEFAULT_ACCOUNT_KEY_TYPE, seed=None, rng=None):
+    """
+    Wallet for a new random seed, or for seed if given
+    @param key_type: secp256k1 or ed25519
+    @param seed: base58 seed (example: snoPBrXtMeMyMHUVTgbuqAfg1SUTb)
+    @param rng: random.Random drawing the seed (reproducible wallets); os.urandom if None
+    """
+    if seed:
+        return wallet_from_seed(seed, key_type)
+    return generate_wallets(1, key_type=key_type, rng=rng)[0]
+
+
+def generate_wallets(count, key_type=constants.DEFAULT_ACCOUNT_KEY_TYPE, rng=None):
+    """
+    List of count wallets for new random seeds (drawn from rng if given)
+    """
+    random_bytes = rng.randbytes if rng else os.urandom
+    return _derive_wallets([random_bytes(SEED_LENGTH) for _ in range(count)], key_type)
+
+
+def wallet_from_seed(seed, key_type=None):
+    """
+    Wallet for a base58 seed. key_type defaults to the type the seed is encoded for (ed25519 for sEd... seeds)
+    """
+    seed_key_type, entropy = decode_seed(seed)
+    return _derive_wallets([entropy], key_type or seed_key_type)[0]
+
+
+def derive_keypair(seed, key_type=None):
+    """
+    return: (32 byte private key, 33 byte public key) of a base58 seed
+    """
+    seed_key_type, entropy = decode_seed(seed)
+    key_type = key_type or seed_key_type
+    if key_type == KEY_TYPE_ED25519:
+        private_key = _ed25519_private_keys([entropy])[0]
+        return private_key, _ed25519_public_keys([entropy])[0]
+    if key_type == KEY_TYPE_SECP256K1:
+        private_key = _secp256k1_private_keys([entropy])[0]
+        return private_key.to_bytes(32, "big"), _secp256k1_compressed_points([private_key])[0]
+    raise ValueError("Unsupported key type: {}".format(key_type))
+
+
+def sign(message, private_key, public_key):
+    """
+    Signature of message, as rippled signs transactions: ECDSA over SHA512-Half(message) with a deterministic
+    (RFC 6979) nonce and canonical low S, DER encoded, for secp256k1 keys; plain Ed25519 for ed25519 keys
+    @param private_key: 32 byte private key from derive_keypair()
+    @param public_key: 33 byte public key from derive_keypair(); ed25519 public keys start with 0xED
+    """
+    if public_key[:1] == b"\xed":
+        return _ed25519_sign(message, private_key, public_key[1:])
+    return _secp256k1_sign(hashlib.sha512(message).digest()[:32], int.from_bytes(private_key, "big"))
+
+
+def encode_seed(entropy, key_type=KEY_TYPE_SECP256K1):
+    prefix = ED25519_SEED_PREFIX if key_type == KEY_TYPE_ED25519 else FAMILY_SEED_PREFIX
+    return base58_check_encode(prefix + entropy)
+
+
+def decode_seed(seed):
+    """
+    return: (key type the seed is encoded for, 16 bytes of seed entropy)
+    """
+    payload = base58_check_decode(seed)
+    if len(payload) == len(ED25519_SEED_PREFIX) + SEED_LENGTH and payload.startswith(ED25519_SEED_PREFIX):
+        return KEY_TYPE_ED25519, payload[len(ED25519_SEED_PREFIX):]
+    if len(payload) == len(FAMILY_SEED_PREFIX) + SEED_LENGTH and payload.startswith(FAMILY_SEED_PREFIX):
+        return KEY_TYPE_SECP256K1, payload[len(FAMILY_SEED_PREFIX):]
+    raise ValueError("Invalid seed: {}".format(seed))
+
+
+def derive_account_id(public_key):
+    """
+    Classic address of a 33 byte public key
+    """
+    return base58_check_encode(ACCOUNT_ID_PREFIX + ripemd160(hashlib.sha256(public_key).digest()))
+
+
+def base58_check_encode(payload):
+    data = payload + hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4]
+    value = int.from_bytes(data, "big")
+    encoded = ""
+    while value:
+        value, remainder = divmod(value, 58)
+        encoded = XRPL_ALPHABET[remainder] + encoded
+    return XRPL_ALPHABET[0] * (len(data) - len(data.lstrip(b"\x00"))) + encoded
+
+
+def base58_check_decode(encoded):
+    value = 0
+    for character in encoded:
+        digit = XRPL_ALPHABET.find(character)
+        if digit < 0:
+            raise ValueError("Invalid base58 string: {}".format(encoded))
+        value = value * 58 + digit
+    body = value.to_bytes((value.bit_length() + 7) // 8, "big")
+    data = b"\x00" * (len(encoded) - len(encoded.lstrip(XRPL_ALPHABET[0]))) + body
+    payload, checksum = data[:-4], data[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        raise ValueError("Invalid checksum: {}".format(encoded))
+    return payload
+
+
+def _derive_wallets(seeds, key_type):
+    if key_type == KEY_TYPE_ED25519:
+        public_keys = _ed25519_public_keys(seeds)
+    elif key_type == KEY_TYPE_SECP256K1:
+        public_keys = _secp256k1_public_keys(seeds)
+    else:
+        raise ValueError("Unsupported key type: {}".format(key_type))
+
+    return [{
+        "account_id": derive_account_id(public_key),
+        "key_type": key_type,
+        "master_key": rfc1751.seed_to_english(seed),
+        "master_seed": encode_seed(seed, key_type),
+        "master_seed_hex": seed.hex().upper(),
+        "public_key": base58_check_encode(ACCOUNT_PUBLIC_KEY_PREFIX + public_key),
+        "public_key_hex": public_key.hex().upper(),
+        "status": "success"
+    } for seed, public_key in zip(seeds, public_keys)]
+
+
+def _batch_inverse(values, modulus):
+    """
+    Modular inverses of all values with one inversion (Montgomery's trick)
+    """
+    prefix_products = []
+    product = 1
+    for value in values:
+        prefix_products.append(product)
+        product = product * value % modulus
+    inverse = pow(product, -1, modulus)
+    inverses = [0] * len(values)
+    for index in range(len(values) - 1, -1, -1):
+        inverses[index] = inverse * prefix_products[index] % modulus
+        inverse = inverse * values[index] % modulus
+    return inverses
+
+
+def _secp256k1_private_key(data):
+    """
+    First valid secp256k1 scalar from SHA512-Half(data + 32 bit counter)
+    """
+    counter = 0
+    while True:
+        key = int.from_bytes(hashlib.sha512(data + struct.pack(">I", counter)).digest()[:32], "big")
+        if 0 < key < SECP256K1_N:
+            return key
+        counter += 1
+
+
+def _secp256k1_private_keys(seeds):
+    """
+    Master private keys of account 0 of each seed's key family (rippled's generateKeyPair for secp256k1)
+    """
+    root_private_keys = [_secp256k1_private_key(seed) for seed in seeds]
+    root_public_keys = _secp256k1_compressed_points(root_private_keys)
+    return [(root_private_key + _secp256k1_private_key(root_public_key + struct.pack(">I", 0))) % SECP256K1_N
+            for root_private_key, root_public_key in zip(root_private_keys, root_public_keys)]
+
+
+def _secp256k1_public_keys(seeds):
+    return _secp256k1_compressed_points(_secp256k1_private_keys(seeds))
+
+
+def _secp256k1_sign(digest, private_key):
+    n = SECP256K1_N
+    z = int.from_bytes(digest, "big")
+    key = b"\x00" * 32
+    value = b"\x01" * 32
+    seed_material = private_key.to_bytes(32, "big") + (z % n).to_bytes(32, "big")
+    key = hmac.new(key, value + b"\x00" + seed_material, hashlib.sha256).digest()
+    value = hmac.new(key, value, hashlib.sha256).digest()
+    key = hmac.new(key, value + b"\x01" + seed_material, hashlib.sha256).digest()
+    value = hmac.new(key, value, hashlib.sha256).digest()
+    while True:
+        value = hmac.new(key, value, hashlib.sha256).digest()
+        nonce = int.from_bytes(value, "big")
+        if 0 < nonce < n:
+            r = _secp256k1_to_affine(_secp256k1_multiply_generator(nonce))[0] % n
+            s = pow(nonce, -1, n) * (z + r * private_key) % n
+            if r and s:
+                return _der_encode(r, min(s, n - s))
+        key = hmac.new(key, value + b"\x00", hashlib.sha256).digest()
+        value = hmac.new(key, value, hashlib.sha256).digest()
+
+
+def _der_encode(r, s):
+    def encode_integer(value):
+        data = value.to_bytes((value.bit_length() + 8) // 8, "big")
+        return b"\x02" + bytes([len(data)]) + data
+
+    body = encode_integer(r) + encode_integer(s)
+    return b"\x30" + bytes([len(body)]) + body
+
+
+def _secp256k1_compressed_points(scalars):
+    points = [_secp256k1_multiply_generator(scalar) for scalar in scalars]
+    z_inverses = _batch_inverse([z for x, y, z in points], SECP256K1_P)
+    compressed_points = []
+    for (x, y, z), z_inverse in zip(points, z_inverses):
+        z_inverse_squared = z_inverse * z_inverse % SECP256K1_P
+        affine_x = x * z_inverse_squared % SECP256K1_P
+        affine_y = y * z_inverse_squared * z_inverse % SECP256K1_P
+        compressed_points.append(bytes([2 + (affine_y & 1)]) + affine_x.to_bytes(32, "big"))
+    return compressed_points
+
+
+def _secp256k1_multiply_generator(scalar):
+    """
+    scalar * G in Jacobian coordinates (scalar in [1, n-1])
+    """
+    table = _get_secp256k1_table()
+    point = (0, 1, 0)
+    for window in range(WINDOW_COUNT):
+        digit = (scalar >> (window * WINDOW_BITS)) & (WINDOW_SIZE - 1)
+        if digit:
+            point = _secp256k1_add_affine(point, table[window][digit])
+    return point
+
+
+def _secp256k1_add_affine(point, affine_point):
+    p = SECP256K1_P
+    x1, y1, z1 = point
+    x2, y2 = affine_point
+    if z1 == 0:
+        return x2, y2, 1
+    z1_squared = z1 * z1 % p
+    h = (x2 * z1_squared - x1) % p
+    r = (y2 * z1_squared * z1 - y1) % p
+    if h == 0:
+        return _secp256k1_double(point) if r == 0 else (0, 1, 0)
+    h_squared = h * h % p
+    h_cubed = h_squared * h % p
+    x1_h_squared = x1 * h_squared % p
+    x3 = (r * r - h_cubed - 2 * x1_h_squared) % p
+    y3 = (r * (x1_h_squared - x3) - y1 * h_cubed) % p
+    return x3, y3, h * z1 % p
+
+
+def _secp256k1_double(point):
+    p = SECP256K1_P
+    x, y, z = point
+    if y == 0 or z == 0:
+        return 0, 1, 0
+    y_squared = y * y % p
+    s = 4 * x * y_squared % p
+    m = 3 * x * x % p
+    x3 = (m * m - 2 * s) % p
+    y3 = (m * (s - x3) - 8 * y_squared * y_squared) % p
+    return x3, y3, 2 * y * z % p
+
+
+def _secp256k1_to_affine(point):
+    x, y, z = point
+    z_inverse = pow(z, -1, SECP256K1_P)
+    z_inverse_squared = z_inverse * z_inverse % SECP256K1_P
+    return x * z_inverse_squared % SECP256K1_P, y * z_inverse_squared * z_inverse % SECP256K1_P
+
+
+def _get_secp256k1_table():
+    """
+    table[window][digit] = digit * 256^window * G (affine)
+    """
+    global _secp256k1_table
+    if _secp256k1_table is None:
+        table = []
+        base = SECP256K1_G
+        for window in range(WINDOW_COUNT):
+            row = [None, base]
+            point = (base[0], base[1], 1)
+            for digit in range(2, WINDOW_SIZE):
+                point = _secp256k1_add_affine(point, base)
+                row.append(_secp256k1_to_affine(point))
+            table.append(row)
+            base = _secp256k1_to_affine(_secp256k1_add_affine(point, base))
+        _secp256k1_table = table
+    return _secp256k1_table
+
+
+def _ed25519_private_keys(seeds):
+    """
+    SHA512-Half(seed) (rippled's generateKeyPair for ed25519)
+    """
+    return [hashlib.sha512(seed).digest()[:32] for seed in seeds]
+
+
+def _ed25519_scalar(private_key):
+    scalar = int.from_bytes(hashlib.sha512(private_key).digest()[:32], "little")
+    return (scalar & ((1 << 254) - 8)) | (1 << 254)
+
+
+def _ed25519_public_keys(seeds):
+    """
+    ED-prefixed public keys of each seed
+    """
+    points = [_ed25519_multiply_base(_ed25519_scalar(private_key)) for private_key in _ed25519_private_keys(seeds)]
+    z_inverses = _batch_inverse([z for x, y, z, t in points], ED25519_Q)
+    return [b"\xed" + _ed25519_encode_point(point, z_inverse) for point, z_inverse in zip(points, z_inverses)]
+
+
+def _ed25519_encode_point(point, z_inverse):
+    x, y, z, t = point
+    affine_x = x * z_inverse % ED25519_Q
+    affine_y = y * z_inverse % ED25519_Q
+    return (affine_y | ((affine_x & 1) << 255)).to_bytes(32, "little")
+
+
+def _ed25519_sign(message, private_key, public_key):
+    """
+    RFC 8032 Ed25519 signature
+    @param public_key: 32 byte public key (without the 0xED prefix)
+    """
+    digest = hashlib.sha512(private_key).digest()
+    nonce = int.from_bytes(hashlib.sha512(digest[32:] + message).digest(), "little") % ED25519_L
+    nonce_point = _ed25519_multiply_base(nonce)
+    encoded_nonce_point = _ed25519_encode_point(nonce_point, pow(nonce_point[2], -1, ED25519_Q))
+    challenge = int.from_bytes(hashlib.sha512(encoded_nonce_point + public_key + message).digest(),
+                               "little") % ED25519_L
+    s = (nonce + challenge * _ed25519_scalar(private_key)) % ED25519_L
+    return encoded_nonce_point + s.to_bytes(32, "little")
+
+
+def _ed25519_multiply_base(scalar):
+    """
+    scalar * B in extended coordinates
+    """
+    table = _get_ed25519_table()
+    point = (0, 1, 1, 0)
+    for window in range(WINDOW_COUNT):
+        digit = (scalar >> (window * WINDOW_BITS)) & (WINDOW_SIZE - 1)
+        if digit:
+            point = _ed25519_add_precomputed(point, table[window][digit])
+    return point
+
+
+def _ed25519_add_precomputed(point, precomputed):
+    """
+    Add an affine point given as (y - x, y + x, 2d * x * y)
+    """
+    q = ED25519_Q
+    x1, y1, z1, t1 = point
+    y_minus_x, y_plus_x, t2d = precomputed
+    a = (y1 - x1) * y_minus_x % q
+    b = (y1 + x1) * y_plus_x % q
+    c = t1 * t2d % q
+    d = 2 * z1 % q
+    e, f, g, h = b - a, d - c, d + c, b + a
+    return e * f % q, g * h % q, f * g % q, e * h % q
+
+
+def _ed25519_precompute(point):
+    q = ED25519_Q
+    x, y, z, t = point
+    z_inverse = pow(z, -1, q)
+    x, y = x * z_inverse % q, y * z_inverse % q
+    return (y - x) % q, (y + x) % q, 2 * ED25519_D * x * y % q
+
+
+def _get_ed25519_table():
+    """
+    table[window][digit] = digit * 256^window * B, precomputed for mixed addition
+    """
+    global _ed25519_table
+    if _ed25519_table is None:
+        table = []
+        base_x, base_y = ED25519_B
+        base = (base_x, base_y, 1, base_x * base_y % ED25519_Q)
+        for window in range(WINDOW_COUNT):
+            base_precomputed = _ed25519_precompute(base)
+            row = [None, base_precomputed]
+            point = base
+            for digit in range(2, WINDOW_SIZE):
+                point = _ed25519_add_precomputed(point, base_precomputed)
+                row.append(_ed25519_precompute(point))
+            table.append(row)
+            base = _ed25519_add_precomputed(point, base_precomputed)
+        _ed25519_table = table
+    return _ed25519_table
+
+
+def ripemd160(data):
+    try:
+        return hashlib.new("ripemd160", data).digest()
+    except ValueError:
+        # OpenSSL 3 builds without the legacy provider do not offer RIPEMD-160
+        return _ripemd160(data)
+
+
+_RIPEMD160_R = [
+    0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15, 7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8,
+    3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12, 1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2,
+    4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13]
+_RIPEMD160_R_PRIME = [
+    5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12, 6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2,
+    15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13, 8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14,
+    12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11]
+_RIPEMD160_S = [
+    11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8, 7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12,
+    11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5, 11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12,
+    9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6]
+_RIPEMD160_S_PRIME = [
+    8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6, 9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11,
+    9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5, 15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8,
+    8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11]
+_RIPEMD160_K = [0x00000000, 0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xA953FD4E]
+_RIPEMD160_K_PRIME = [0x50A28BE6, 0x5C4DD124, 0x6D703EF3, 0x7A6D76E9, 0x00000000]
+
+
+def _ripemd160_f(round_index, x, y, z):
+    if round_index == 0:
+        return x ^ y ^ z
+    if round_index == 1:
+        return (x & y) | (~x & z)
+    if round_index == 2:
+        return (x | ~y) ^ z
+    if round_index == 3:
+        return (x & z) | (y & ~z)
+    return x ^ (y | ~z)
+
+
+def _ripemd160(data):
+    def rotate_left(value, bits):
+        value &= 0xFFFFFFFF
+        return ((value << bits) | (value >> (32 - bits))) & 0xFFFFFFFF
+
+    message = data + b"\x80" + b"\x00" * ((55 - len(data)) % 64) + struct.pack("<Q", 8 * len(data))
+    h = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0]
+    for offset in range(0, len(message), 64):
+        words = struct.unpack("<16I", message[offset:offset + 64])
+        a, b, c, d, e = h
+        a_prime, b_prime, c_prime, d_prime, e_prime = h
+        for step in range(80):
+            round_index = step // 16
+            t = rotate_left(a + _ripemd160_f(round_index, b, c, d) + words[_RIPEMD160_R[step]] +
+                            _RIPEMD160_K[round_index], _RIPEMD160_S[step]) + e
+            a, b, c, d, e = e, t & 0xFFFFFFFF, b, rotate_left(c, 10), d
+            t = rotate_left(a_prime + _ripemd160_f(4 - round_index, b_prime, c_prime, d_prime) +
+                            words[_RIPEMD160_R_PRIME[step]] + _RIPEMD160_K_PRIME[round_index],
+                            _RIPEMD160_S_PRIME[step]) + e_prime
+            a_prime, b_prime, c_prime, d_prime, e_prime = e_prime, t & 0xFFFFFFFF, b_prime, rotate_left(c_prime, 10), \
+                d_prime
+        t = (h[1] + c + d_prime) & 0xFFFFFFFF
+        h[1] = (h[2] + d + e_prime) & 0xFFFFFFFF
+        h[2] = (h[3] + e + a_prime) & 0xFFFFFFFF
+        h[3] = (h[4] + a + b_prime) & 0xFFFFFFFF
+        h[4] = (h[0] + b + c_prime) & 0xFFFFFFFF
+        h[0] = t
+    return struct.pack("<5I", *h)
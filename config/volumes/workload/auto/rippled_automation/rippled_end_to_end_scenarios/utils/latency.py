@@ -0,0 +1,308 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+STAGE_SUBMIT = "submit"  # submit sent -> engine_result received
+STAGE_VALIDATED = "validated"  # submit sent -> validated transaction seen
+APPLIED_RESULTS = ("tesSUCCESS", "terQUEUED")
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """
+    Log-linear latency histogram (HDR style).
+
+    Values are counted in microseconds: exactly below 2 * 2^sub_bucket_bits, then in 2^sub_bucket_bits buckets per
+    power of two, so every bucket is within 2^-sub_bucket_bits of the values it holds whatever their magnitude.
+    Recording is a dictionary increment and histograms of any range merge by adding counts.
+    """
+    def __init__(self, sub_bucket_bits=constants.LATENCY_SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_buckets = 1 << sub_bucket_bits
+        self.counts = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, seconds):
+        seconds = max(seconds, 0)
+        self.counts[self.bucket_index(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def bucket_index(self, microseconds):
+        if microseconds < 2 * self.sub_buckets:
+            return microseconds
+        shift = microseconds.bit_length() - self.sub_bucket_bits - 1
+        return shift * self.sub_buckets + (microseconds >> shift)
+
+    def bucket_upper_bound(self, index):
+        """
+        Highest value (seconds) counted in a bucket
+        """
+        if index < 2 * self.sub_buckets:
+            return index / 1e6
+        shift = index // self.sub_buckets - 1
+        mantissa = index - shift * self.sub_buckets
+        return (((mantissa + 1) << shift) - 1) / 1e6
+
+    def percentile(self, percentile):
+        if not self.count:
+            return None
+        threshold = self.count * percentile / 100
+        cumulative = 0
+        for index in sorted(self.counts):
+            cumulative += self.counts[index]
+            if cumulative >= threshold:
+                return min(self.bucket_upper_bound(index), self.max)
+        return self.max
+
+    def cumulative_counts(self, bounds):
+        """
+        Counts of values at most each bound (seconds), for fixed-bucket exports like Prometheus histograms
+        """
+        indices = sorted(self.counts)
+        cumulative_counts = []
+        cumulative = 0
+        position = 0
+        for bound in bounds:
+            while position < len(indices) and self.bucket_upper_bound(indices[position]) <= bound:
+                cumulative += self.counts[indices[position]]
+                position += 1
+            cumulative_counts.append(cumulative)
+        return cumulative_counts
+
+    def summary(self):
+        summary = {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+        }
+        for percentile in PERCENTILES:
+            summary["p{}".format(percentile).replace(".", "_")] = self.percentile(percentile)
+        return summary
+
+
+class TransactionLatencyRecorder:
+    """
+    Submit-to-validated latency of transactions, by transaction type and result.
+
+    For every submitted transaction the server calls submitted() with the time the submit was sent and its
+    engine_result was received; applied transactions are then matched by hash against the validated transactions
+    stream (or validated() from a validation wait) to time submit -> validated. Transactions validated per ledger
+    are counted from the same stream. Histograms are published as a JSON summary file and/or Prometheus histograms.
+    """
+    def __init__(self, pending_timeout=constants.LATENCY_PENDING_TIMEOUT):
+        """
+        @param pending_timeout: seconds after which an applied transaction not seen validated is counted as lost
+        """
+        self.pending_timeout = pending_timeout
+        self.histograms = {}  # (stage, transaction type, result) -> LatencyHistogram
+        self.not_validated = Counter()
+        self.ledger_transactions = OrderedDict()  # ledger index -> transactions validated in it
+        self.start_time = time.time()
+        self._pending = OrderedDict()  # hash -> (transaction type, submit time)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._summary_path = None
+
+    def attach(self, tx_tracker):
+        """
+        Match validated transactions from a TransactionTracker's stream, starting the tracker
+        return: True if the stream is available
+        """
+        tx_tracker.ws_client.add_stream_listener(self._on_message)
+        return tx_tracker.start()
+
+    def record_submit(self, response, sent):
+        """
+        Record a submit from its JSON-RPC response ({"result": {...}}); other responses are ignored
+        @param sent: time.monotonic() when the request was sent
+        """
+        result = response.get("result", {})
+        if "engine_result" in result:
+            tx_json = result.get("tx_json", {})
+            self.submitted(tx_json.get("TransactionType"), sent, time.monotonic(), result["engine_result"],
+                           tx_json.get("hash"))
+
+    def submitted(self, transaction_type, sent, received, engine_result, tx_hash=None):
+        """
+        @param sent: time.monotonic() when the submit was sent
+        @param received: time.monotonic() when its response arrived
+        """
+        with self._lock:
+            self._record(STAGE_SUBMIT, transaction_type, engine_result, received - sent)
+            if tx_hash and (engine_result in APPLIED_RESULTS or engine_result.startswith("tec")):
+                self._pending[tx_hash] = (transaction_type, sent)
+
+    def validated(self, tx_hash, transaction_result, ledger_index=None):
+        now = time.monotonic()
+        with self._lock:
+            if ledger_index is not None:
+                self.ledger_transactions[ledger_index] = self.ledger_transactions.get(ledger_index, 0) + 1
+                while len(self.ledger_transactions) > constants.LATENCY_LEDGER_HISTORY:
+                    self.ledger_transactions.popitem(last=False)
+            pending = self._pending.pop(tx_hash, None)
+            if pending is not None:
+                transaction_type, sent = pending
+                self._record(STAGE_VALIDATED, transaction_type, transaction_result, now - sent)
+
+    def _record(self, stage, transaction_type, result, latency):
+        key = (stage, transaction_type or "unknown", result or "unknown")
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(latency)
+
+    def _on_message(self, message):
+        if message.get("type") != "transaction" or not message.get("validated"):
+            return
+        tx_hash = message.get("hash") or message.get("transaction", {}).get("hash")
+        transaction_result = message.get("meta", {}).get("TransactionResult", message.get("engine_result"))
+        self.validated(tx_hash, transaction_result, message.get("ledger_index"))
+
+    def expire(self):
+        """
+        Count applied transactions not seen validated within pending_timeout as not validated
+        """
+        expired_before = time.monotonic() - self.pending_timeout
+        with self._lock:
+            while self._pending:
+                tx_hash, (transaction_type, sent) = next(iter(self._pending.items()))
+                if sent > expired_before:
+                    break
+                del self._pending[tx_hash]
+                self.not_validated[transaction_type] += 1
+
+    def summary(self):
+        self.expire()
+        with self._lock:
+            histograms = [dict(stage=stage, transaction_type=transaction_type, result=result, **histogram.summary())
+                          for (stage, transaction_type, result), histogram in sorted(self.histograms.items())]
+            ledger_counts = list(self.ledger_transactions.values())
+            summary = {
+                "time": int(time.time()),
+                "elapsed": time.time() - self.start_time,
+                "histograms": histograms,
+                "pending": len(self._pending),
+                "not_validated": dict(self.not_validated),
+                "ledgers": {
+                    "count": len(ledger_counts),
+                    "first": next(iter(self.ledger_transactions), None),
+                    "last": next(reversed(self.ledger_transactions), None),
+                    "transactions_per_ledger_mean": sum(ledger_counts) / len(ledger_counts) if ledger_counts else None,
+                    "transactions_per_ledger_max": max(ledger_counts, default=None),
+                }
+            }
+        for stage in (STAGE_SUBMIT, STAGE_VALIDATED):
+            stage_histogram = LatencyHistogram()
+            with self._lock:
+                for (histogram_stage, _, _), histogram in self.histograms.items():
+                    if histogram_stage == stage:
+                        stage_histogram.merge(histogram)
+            summary["{}_all".format(stage)] = stage_histogram.summary()
+        return summary
+
+    def write_summary(self, path=None):
+        path = path or self._summary_path
+        if not path:
+            return
+        temp_path = "{}.tmp".format(path)
+        with open(temp_path, "w") as summary_file:
+            json.dump(self.summary(), summary_file, indent=2)
+        os.replace(temp_path, path)
+
+    def log_summary(self):
+        summary = self.summary()
+        for stage in (STAGE_SUBMIT, STAGE_VALIDATED):
+            stage_summary = summary["{}_all".format(stage)]
+            if stage_summary["count"]:
+                log.info("Latency {}: {} transactions, mean {:.3f} s, p50 {:.3f} s, p99 {:.3f} s, max {:.3f} s".format(
+                    stage, stage_summary["count"], stage_summary["mean"], stage_summary["p50"],
+                    stage_summary["p99"], stage_summary["max"]))
+        if summary["ledgers"]["count"]:
+            log.info("{} ledgers, {:.1f} transactions per ledger (max {}), {} not validated".format(
+                summary["ledgers"]["count"], summary["ledgers"]["transactions_per_ledger_mean"],
+                summary["ledgers"]["transactions_per_ledger_max"], sum(summary["not_validated"].values())))
+
+    def collect(self):
+        """
+        Prometheus collector: latency histograms by transaction type and result
+        """
+        from prometheus_client.core import GaugeMetricFamily, HistogramMetricFamily
+
+        bounds = constants.LATENCY_PROMETHEUS_BUCKETS
+        families = {
+            STAGE_SUBMIT: HistogramMetricFamily("rippled_tx_submit_latency_seconds",
+                                                "Time from submit sent to engine_result received",
+                                                labels=["transaction_type", "result"]),
+            STAGE_VALIDATED: HistogramMetricFamily("rippled_tx_validation_latency_seconds",
+                                                   "Time from submit sent to validated transaction seen",
+                                                   labels=["transaction_type", "result"]),
+        }
+        with self._lock:
+            for (stage, transaction_type, result), histogram in self.histograms.items():
+                buckets = [(str(bound), count) for bound, count in zip(bounds,
+                                                                       histogram.cumulative_counts(bounds))]
+                buckets.append(("+Inf", histogram.count))
+                families[stage].add_metric([transaction_type, result], buckets, histogram.total)
+            last_ledger_transactions = next(reversed(self.ledger_transactions.values()), 0)
+        yield from families.values()
+        ledger_family = GaugeMetricFamily("rippled_ledger_validated_transactions",
+                                          "Transactions in the last validated ledger")
+        ledger_family.add_metric([], last_ledger_transactions)
+        yield ledger_family
+
+    def start_publishing(self, summary_path=None, metrics_port=None, interval=constants.LATENCY_SUMMARY_INTERVAL):
+        """
+        Write the summary file every interval seconds and/or serve the histograms to Prometheus on metrics_port
+        """
+        self._summary_path = summary_path
+        if metrics_port:
+            try:
+                from prometheus_client import REGISTRY, start_http_server
+            except ImportError as e:
+                log.warning("prometheus_client not installed; latency histograms not exported ({})".format(e))
+            else:
+                start_http_server(int(metrics_port))
+                REGISTRY.register(self)
+                log.info("Serving latency histograms on port {}".format(metrics_port))
+        if summary_path and self._thread is None:
+            self._thread = threading.Thread(target=self._publish, args=(interval,), name="latency_summary",
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write_summary()
+
+    def _publish(self, interval):
+        while not self._stop_event.wait(interval):
+            try:
+                self.write_summary()
+            except Exception as e:
+                log.warning("Failed to write latency summary {}: {}".format(self._summary_path, e))
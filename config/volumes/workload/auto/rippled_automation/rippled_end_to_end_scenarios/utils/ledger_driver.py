@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import time
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.utils.ws_client import WebSocketClient
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+
+class StandaloneLedgerDriver:
+    """
+    Advances the ledger of a standalone server with the admin "ledger_accept" RPC.
+
+    Submissions are counted as pending. A ledger is closed when batch_size submissions are pending, when the oldest
+    pending submission is older than interval, or before any other request while submissions are pending, so reads
+    always see submitted transactions validated. Requests with nothing pending never close a ledger; waits for the
+    ledger to advance close ledgers themselves (close_ledger()). close() stops the interval timer.
+    """
+    SUBMIT_METHODS = ("submit", "submit_multisigned")
+    batch_size = constants.STANDALONE_LEDGER_BATCH_SIZE
+    interval = constants.STANDALONE_LEDGER_INTERVAL
+
+    def __init__(self, send_request, batch_size=None, interval=None):
+        """
+        @param send_request: coroutine function sending a JSON-RPC request to the server
+        """
+        self._send_request = send_request
+        self.batch_size = batch_size or StandaloneLedgerDriver.batch_size
+        self.interval = StandaloneLedgerDriver.interval if interval is None else interval
+        self.pending = 0
+        self.ledgers_closed = 0
+        self._first_pending_time = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._timer_thread = None
+
+    @classmethod
+    def configure(cls, batch_size=None, interval=None):
+        """
+        Set defaults for drivers created from now on
+        @param batch_size: pending submissions closing a ledger right away
+        @param interval: seconds a submission may stay pending
+        """
+        if batch_size:
+            cls.batch_size = int(batch_size)
+        if interval is not None:
+            cls.interval = float(interval)
+        log.debug("Standalone ledger driver defaults: batch size {}, interval {}".format(cls.batch_size,
+                                                                                         cls.interval))
+
+    async def before_request(self, request):
+        method = request.get("method")
+        if method in StandaloneLedgerDriver.SUBMIT_METHODS or method == "ledger_accept":
+            return
+        if self.pending:
+            await self.close_ledger()
+
+    async def after_request(self, request):
+        if request.get("method") not in StandaloneLedgerDriver.SUBMIT_METHODS:
+            return
+        with self._lock:
+            self.pending += 1
+            if self._first_pending_time is None:
+                self._first_pending_time = time.time()
+            batch_full = self.pending >= self.batch_size
+        if batch_full:
+            await self.close_ledger()
+        else:
+            self._start_timer()
+
+    async def flush(self):
+        """
+        Close a ledger if submissions are pending
+        """
+        if self.pending:
+            await self.close_ledger()
+
+    async def close_ledger(self):
+        with self._lock:
+            pending = self.pending
+            self.pending = 0
+            self._first_pending_time = None
+        response = await self._send_request({"method": "ledger_accept", "params": [{}]})
+        self.ledgers_closed += 1
+        log.debug("Standalone mode; ledger {} closed with {} pending submissions".format(
+            response.get("result", {}).get("ledger_current_index"), pending))
+        return response
+
+    def close(self):
+        """
+        Stop closing ledgers of pending submissions on the interval timer
+        """
+        self._stop_event.set()
+        if self._timer_thread is not None:
+            self._timer_thread.join(self.interval)
+            self._timer_thread = None
+
+    def _start_timer(self):
+        with self._lock:
+            if self._timer_thread is not None or not self.interval or self._stop_event.is_set():
+                return
+            self._timer_thread = threading.Thread(target=self._close_pending_ledgers, name="standalone_ledger_driver",
+                                                  daemon=True)
+        self._timer_thread.start()
+
+    def _close_pending_ledgers(self):
+        while not self._stop_event.wait(self.interval / 4):
+            with self._lock:
+                first_pending_time = self._first_pending_time
+            if first_pending_time is not None and time.time() - first_pending_time >= self.interval:
+                try:
+                    asyncio.run_coroutine_threadsafe(self.flush(), WebSocketClient.get_loop()).result(
+                        constants.HTTP_READ_TIMEOUT)
+                except Exception as e:
+                    log.warning("Failed to close standalone ledger: {}".format(e))
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.utils.ws_client import WebSocketClient
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+
+class LedgerCloseMonitor:
+    """
+    Shared subscriber to a server's "ledger" stream.
+
+    One monitor is kept per websocket address. It publishes the index and close time of the last validated ledger
+    to any number of waiters: threads block on a condition variable, coroutines on futures resolved from the stream
+    listener. Waits return None when the stream is unavailable so callers can fall back to polling.
+    """
+    _monitors = {}
+    _lock = threading.Lock()
+
+    def __init__(self, ws_address):
+        self.ws_address = ws_address
+        self.ws_client = WebSocketClient.get(ws_address)
+        self.ledger_index = None
+        self.ledger_time = None
+        self._condition = threading.Condition()
+        self._async_waiters = []
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._retry_after = 0
+        self.ws_client.add_stream_listener(self._on_message)
+
+    @classmethod
+    def get(cls, ws_address):
+        """
+        Return the monitor shared by all server handles for this websocket address
+        @param ws_address: websocket URL (example: ws://localhost:6005)
+        """
+        with cls._lock:
+            monitor = cls._monitors.get(ws_address)
+            if monitor is None:
+                monitor = cls._monitors[ws_address] = cls(ws_address)
+        return monitor
+
+    def start(self, timeout=constants.STREAM_CONNECT_TIMEOUT):
+        """
+        Subscribe to the ledger stream (or reconnect if the connection dropped)
+        return: True if the stream is available
+        """
+        with self._start_lock:
+            if self._started and self.ws_client.is_connected():
+                return True
+            if time.time() < self._retry_after:
+                return False
+            try:
+                if not self._started:
+                    response = self.ws_client.subscribe(timeout=timeout, streams=["ledger"])
+                    if response.get("status") != "success":
+                        raise Exception(response.get("error", response))
+                    self._started = True
+                    result = response.get("result", {})
+                    if "ledger_index" in result:
+                        self._publish(result["ledger_index"], result.get("ledger_time"))
+                    log.debug("Subscribed to ledger stream on {}".format(self.ws_address))
+                elif not self.ws_client.is_connected():
+                    log.debug("Reconnecting to ledger stream on {}...".format(self.ws_address))
+                    self.ws_client.connect(timeout=timeout)
+            except Exception as e:
+                log.warning("Ledger stream unavailable on {} ({}); polling instead".format(self.ws_address, e))
+                self._retry_after = time.time() + constants.STREAM_RETRY_INTERVAL
+                return False
+        return True
+
+    def is_available(self):
+        return self._started and self.ws_client.is_connected()
+
+    def wait_for_ledger_index(self, ledger_index, timeout=None):
+        """
+        Block until a ledger with index >= ledger_index is validated
+        return: True when reached, False on timeout, None if the stream is unavailable
+        """
+        return self.wait(lambda index, close_time: index >= int(ledger_index), timeout)
+
+    def wait_for_close_time(self, close_time, timeout=None):
+        """
+        Block until a validated ledger closes after close_time (seconds since ripple epoch)
+        return: True when reached, False on timeout, None if the stream is unavailable
+        """
+        return self.wait(lambda index, ledger_time: ledger_time is not None and ledger_time > close_time, timeout)
+
+    def wait_for_next_ledger(self, timeout=None):
+        if not self.start():
+            return None
+        current = self.ledger_index or 0
+        return self.wait_for_ledger_index(current + 1, timeout)
+
+    def wait(self, predicate, timeout=None):
+        """
+        Block until predicate(ledger_index, ledger_time) holds for the last validated ledger
+        """
+        end_time = None if timeout is None else time.time() + timeout
+        while True:
+            if not self.start():
+                return None
+            with self._condition:
+                if self._is_satisfied(predicate):
+                    return True
+                remaining = None if end_time is None else end_time - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                wait_time = constants.STREAM_WAIT_SLICE if remaining is None else \
+                    min(remaining, constants.STREAM_WAIT_SLICE)
+                self._condition.wait(wait_time)
+
+    async def async_wait_for_ledger_index(self, ledger_index, timeout=None):
+        return await self.async_wait(lambda index, close_time: index >= int(ledger_index), timeout)
+
+    async def async_wait_for_close_time(self, close_time, timeout=None):
+        return await self.async_wait(lambda index, ledger_time: ledger_time is not None and ledger_time > close_time,
+                                     timeout)
+
+    async def async_wait(self, predicate, timeout=None):
+        """
+        Awaitable counterpart of wait(), usable from any event loop
+        """
+        loop = asyncio.get_running_loop()
+        end_time = None if timeout is None else time.time() + timeout
+        while True:
+            if not self.is_available():
+                if not await loop.run_in_executor(None, self.start):
+                    return None
+
+            future = loop.create_future()
+            waiter = (predicate, loop, future)
+            with self._condition:
+                if self._is_satisfied(predicate):
+                    return True
+                self._async_waiters.append(waiter)
+            try:
+                remaining = None if end_time is None else end_time - time.time()
+                wait_time = constants.STREAM_WAIT_SLICE if remaining is None else \
+                    max(min(remaining, constants.STREAM_WAIT_SLICE), 0)
+                await asyncio.wait({future}, timeout=wait_time)
+                if future.done():
+                    return True
+                if remaining is not None and remaining <= wait_time:
+                    return False
+            finally:
+                with self._condition:
+                    if waiter in self._async_waiters:
+                        self._async_waiters.remove(waiter)
+
+    def _is_satisfied(self, predicate):
+        return self.ledger_index is not None and predicate(self.ledger_index, self.ledger_time)
+
+    def _on_message(self, message):
+        if message.get("type") == "ledgerClosed":
+            self._publish(message["ledger_index"], message.get("ledger_time"))
+
+    def _publish(self, ledger_index, ledger_time):
+        with self._condition:
+            if self.ledger_index is not None and int(ledger_index) <= self.ledger_index:
+                return
+            self.ledger_index = int(ledger_index)
+            self.ledger_time = ledger_time
+            log.debug("Ledger {} validated (close time {})".format(self.ledger_index, self.ledger_time))
+            self._condition.notify_all()
+
+            for waiter in list(self._async_waiters):
+                predicate, loop, future = waiter
+                if self._is_satisfied(predicate):
+                    self._async_waiters.remove(waiter)
+                    loop.call_soon_threadsafe(self._resolve, future)
+
+    @staticmethod
+    def _resolve(future):
+        if not future.done():
+            future.set_result(True)
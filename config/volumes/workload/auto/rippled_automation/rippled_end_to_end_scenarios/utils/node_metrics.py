@@ -0,0 +1,236 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.utils.transport import HttpTransport
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+# endpoint_targets define sections of 2 kinds
+# 1. objects that have a dictionary of endpoints; so there is no final endpoint defined in this list
+# Example: result -> info -> counters -> rpc, these paths lead to a dictionary from task type to object of
+# counters (e.g. `started`, `finished`, `duration_us`)
+# 2. objects that have a final endpoint; so 'end_points' is defined in the list.
+# An empty 'end_points' list parses all the end_points in that path
+# Example: result -> info -> validated_leger -> age
+# 'rippled_command' is the CLI form of the admin RPC: the method followed by its flags ("server_info counters" is
+# {"method": "server_info", "params": [{"counters": true}]})
+ENDPOINT_TARGETS = [
+    {
+        'rippled_command': 'server_info counters',
+        'targets': [
+            {
+                'path': ['result', 'info', 'counters', 'rpc'],
+                'metric_type': 'counter'
+            },
+            {
+                'path': ['result', 'info', 'counters', 'job_queue'],
+                'metric_type': 'counter'
+            },
+            {
+                'path': ['result', 'info', 'validated_ledger'],
+                'end_points': ['age'],
+                'metric_type': 'gauge'
+            },
+        ]
+    },
+    {
+        'rippled_command': 'get_counts',
+        'targets': [
+            {
+                'path': ['result'],
+                'end_points': [],
+                'metric_type': 'gauge'
+            },
+        ]
+    }
+]
+
+NODE_UP_METRIC = "rippled_node_up"
+
+
+def command_request(rippled_command):
+    """
+    Admin RPC request of a rippled CLI command ("server_info counters")
+    """
+    method, *flags = rippled_command.split()
+    return {"method": method, "params": [{flag: True for flag in flags}]}
+
+
+def parse_targets(endpoint_target, response):
+    """
+    Samples of the targets of one command's response
+    @param endpoint_target: item of ENDPOINT_TARGETS
+    @param response: JSON-RPC response of its rippled_command
+    return: list of (metric name, metric type, labels dict, value)
+    """
+    samples = []
+    for target in endpoint_target['targets']:
+        section = response
+        try:
+            for step in target['path']:
+                section = section[step]
+        except (KeyError, TypeError) as cause:
+            log.debug("Cannot parse {}: missing {}".format(endpoint_target['rippled_command'], cause))
+            continue
+
+        metric_type = target['metric_type']
+        metric_prefix = endpoint_target['rippled_command'].split(' ')[-1] \
+            if len(target['path']) == 1 else target['path'][-1]
+        if 'end_points' in target:
+            for end_point in target['end_points'] or section.keys():
+                value = to_number(section.get(end_point))
+                if value is not None:
+                    samples.append(("{}_{}".format(metric_prefix, end_point).replace('::', '_'), metric_type,
+                                    {"object": metric_prefix}, value))
+        else:
+            for task, counters in section.items():
+                if not isinstance(counters, dict):
+                    continue
+                for key, value in counters.items():
+                    value = to_number(value)
+                    if value is not None:
+                        samples.append(("{}_{}".format(metric_prefix, key), metric_type, {"task": task}, value))
+    return samples
+
+
+def to_number(value):
+    """
+    Metric value of a JSON field (rippled reports counters as strings); None for lists, objects and text
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+class NodeMetricsCollector:
+    """
+    server_info counters and get_counts of any number of rippled nodes over admin JSON-RPC.
+
+    Every node is sampled through the pooled keep-alive HttpTransport shared with the server handles, each
+    (node, command) request on its own worker thread, so a sample of the whole network costs one round trip to
+    the slowest node. Every metric carries a node label; rippled_node_up tells whether the node answered. The
+    collector is a Prometheus custom collector (serve with prometheus_client) and renders the text exposition
+    format for a push gateway.
+    """
+    def __init__(self, nodes, endpoint_targets=None, node_names=None):
+        """
+        @param nodes: admin RPC addresses (host:port or http://host:port)
+        @param endpoint_targets: commands and targets to parse (ENDPOINT_TARGETS by default)
+        @param node_names: node label of each address (host:port by default)
+        """
+        self.endpoint_targets = endpoint_targets or ENDPOINT_TARGETS
+        self.addresses = [node if "://" in node else "http://{}".format(node) for node in nodes]
+        self.node_names = node_names or [address.split("://", 1)[1] for address in self.addresses]
+        self.transports = [HttpTransport.get(address) for address in self.addresses]
+        self.requests = [command_request(endpoint_target['rippled_command'])
+                         for endpoint_target in self.endpoint_targets]
+        self.samples = []
+        self.sample_time = None
+        self.sample_duration = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=len(self.addresses) * len(self.requests),
+                                            thread_name_prefix="node_metrics")
+        self._lock = threading.Lock()
+
+    def query(self, transport, request):
+        try:
+            response = transport.post(json=request, timeout=(constants.HTTP_CONNECT_TIMEOUT,
+                                                             constants.NODE_METRICS_TIMEOUT)).json()
+        except Exception as e:
+            log.debug("{} {} failed: {}".format(transport.address, request["method"], e))
+            return None
+        if not response or response.get("result", {}).get("status") == "error":
+            log.debug("{} {} failed: {}".format(transport.address, request["method"], response))
+            return None
+        return response
+
+    def sample(self):
+        """
+        Query every node and replace the published samples
+        return: list of (metric name, metric type, labels dict, value)
+        """
+        start_time = time.monotonic()
+        futures = [[self._executor.submit(self.query, transport, request) for request in self.requests]
+                   for transport in self.transports]
+        samples = []
+        for node_name, node_futures in zip(self.node_names, futures):
+            node_up = False
+            for endpoint_target, future in zip(self.endpoint_targets, node_futures):
+                response = future.result()
+                if response is None:
+                    continue
+                node_up = True
+                samples.extend((name, metric_type, dict(labels, node=node_name), value)
+                               for name, metric_type, labels, value in parse_targets(endpoint_target, response))
+            samples.append((NODE_UP_METRIC, "gauge", {"node": node_name}, 1.0 if node_up else 0.0))
+        with self._lock:
+            self.samples = samples
+            self.sample_time = time.time()
+            self.sample_duration = time.monotonic() - start_time
+        return samples
+
+    def run(self, interval=constants.NODE_METRICS_INTERVAL, on_sample=None, stop_event=None):
+        """
+        Sample every interval seconds (skipping intervals a slow sample overran) until stop_event is set
+        @param on_sample: called with the samples after each sample (example: push to a gateway)
+        """
+        stop_event = stop_event or threading.Event()
+        next_time = time.monotonic()
+        while not stop_event.is_set():
+            samples = self.sample()
+            log.debug("Sampled {} metrics of {} nodes in {:.0f} ms".format(len(samples), len(self.addresses),
+                                                                            self.sample_duration * 1000))
+            if on_sample:
+                try:
+                    on_sample(samples)
+                except Exception as e:
+                    log.warning("Failed to publish node metrics: {}".format(e))
+            next_time += interval
+            now = time.monotonic()
+            if next_time < now:
+                next_time = now + interval - (now - next_time) % interval
+            stop_event.wait(next_time - now)
+
+    def exposition(self, samples=None):
+        """
+        Samples in the Prometheus text exposition format
+        """
+        if samples is None:
+            with self._lock:
+                samples = self.samples
+        lines = []
+        typed = set()
+        for name, metric_type, labels, value in sorted(samples, key=lambda sample: sample[0]):
+            if name not in typed:
+                typed.add(name)
+                lines.append("# TYPE {} {}".format(name, metric_type))
+            lines.append("{}{{{}}} {}".format(name, ",".join('{}="{}"'.format(key, label_value)
+                                                             for key, label_value in labels.items()), value))
+        return "\n".join(lines) + "\n"
+
+    def collect(self):
+        """
+        Prometheus collector: the last sample of every node
+        """
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        with self._lock:
+            samples = self.samples
+        families = {}
+        for name, metric_type, labels, value in samples:
+            family = families.get(name)
+            if family is None:
+                family_class = CounterMetricFamily if metric_type == "counter" else GaugeMetricFamily
+                family = families[name] = family_class(name, "rippled {}".format(name), labels=list(labels))
+            family.add_metric(list(labels.values()), value)
+        yield from families.values()
+
+    def close(self):
+        self._executor.shutdown(wait=False)
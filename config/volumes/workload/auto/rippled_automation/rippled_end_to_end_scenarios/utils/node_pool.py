@@ -0,0 +1,123 @@
+import asyncio
+import itertools
+import time
+from collections import Counter
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+
+log = log_helper.get_logger()
+
+POLICY_ROUND_ROBIN = "round_robin"
+POLICY_LEAST_OUTSTANDING = "least_outstanding"
+POLICIES = (POLICY_ROUND_ROBIN, POLICY_LEAST_OUTSTANDING)
+
+
+class PoolNode:
+    """
+    One server of a NodePool with its request statistics
+    """
+    def __init__(self, server):
+        """
+        @param server: AsyncRippledServer of the node
+        """
+        self.server = server
+        self.address = server.address
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.engine_results = Counter()
+        self.status = {}
+
+    def record(self, latency, response):
+        self.requests += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        result = (response or {}).get("result", {})
+        if "engine_result" in result:
+            self.engine_results[result["engine_result"]] += 1
+        elif "error" in result:
+            self.errors += 1
+
+    def summary(self):
+        average_latency = self.total_latency / self.requests if self.requests else 0
+        accepted = sum(count for engine_result, count in self.engine_results.items()
+                       if engine_result in ("tesSUCCESS", "terQUEUED"))
+        submitted = sum(self.engine_results.values())
+        return "{}: {} requests ({} outstanding, {} errors), latency avg {:.0f} ms max {:.0f} ms, " \
+               "submits accepted {}/{}, {}".format(
+                   self.address, self.requests, self.outstanding, self.errors, average_latency * 1000,
+                   self.max_latency * 1000, accepted, submitted,
+                   ", ".join("{} {}".format(key, value) for key, value in self.status.items()) or "no status")
+
+
+class NodePool:
+    """
+    Spreads requests of one AsyncRippledServer over several servers of the same network.
+
+    Each request goes to the next node (round robin) or to the node with the fewest requests in flight
+    (least outstanding). Requests for an account stick to the node the account was first sent to, so its
+    transactions reach one server in sequence order and reads of its state see its own submissions.
+    """
+    def __init__(self, servers, policy=POLICY_ROUND_ROBIN):
+        """
+        @param servers: AsyncRippledServer of each node (requests are sent with their _send_direct())
+        @param policy: "round_robin" or "least_outstanding"
+        """
+        if policy not in POLICIES:
+            raise ValueError("Unknown node pool policy: {} (known: {})".format(policy, ", ".join(POLICIES)))
+        self.nodes = [PoolNode(server) for server in servers]
+        self.policy = policy
+        self._next_node = itertools.cycle(self.nodes)
+        self._account_nodes = {}
+
+    def choose(self, account_id=None):
+        node = self._account_nodes.get(account_id) if account_id else None
+        if node is None:
+            if self.policy == POLICY_LEAST_OUTSTANDING:
+                node = min(self.nodes, key=lambda pool_node: (pool_node.outstanding, pool_node.requests))
+            else:
+                node = next(self._next_node)
+            if account_id:
+                self._account_nodes[account_id] = node
+        return node
+
+    async def send_request(self, request, account_id=None):
+        node = self.choose(account_id)
+        node.outstanding += 1
+        start_time = time.monotonic()
+        try:
+            response = await node.server._send_direct(request)
+        finally:
+            node.outstanding -= 1
+        node.record(time.monotonic() - start_time, response)
+        return response
+
+    async def refresh_status(self):
+        """
+        Fetch the load factor and transaction queue state of every node
+        """
+        await asyncio.gather(*[self._refresh_node_status(node) for node in self.nodes])
+
+    async def _refresh_node_status(self, node):
+        try:
+            server_info, fee = await asyncio.gather(
+                node.server._send_direct({"method": "server_info", "params": [{}]}),
+                node.server._send_direct({"method": "fee", "params": [{}]}))
+        except Exception as e:
+            node.status = {"status": "unreachable ({})".format(e)}
+            return
+        info = server_info.get("result", {}).get("info", {})
+        fee_result = fee.get("result", {})
+        node.status = {
+            "state": info.get("server_state"),
+            "load_factor": info.get("load_factor"),
+            "queue": "{}/{}".format(fee_result.get("current_queue_size"), fee_result.get("max_queue_size")),
+            "expected_ledger_size": fee_result.get("expected_ledger_size"),
+        }
+
+    async def log_status(self):
+        await self.refresh_status()
+        for node in self.nodes:
+            log.info("Node {}".format(node.summary()))
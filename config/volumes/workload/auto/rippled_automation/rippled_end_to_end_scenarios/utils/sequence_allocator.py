@@ -0,0 +1,99 @@
+import concurrent.futures
+import threading
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+
+log = log_helper.get_logger()
+
+
+class SequenceAllocator:
+    """
+    Client-side account sequence numbers.
+
+    One allocator is kept per server address. An account is seeded once from account_info and sequences are then
+    handed out locally, so any number of threads or coroutines can submit transactions from the same account back to
+    back. Allocation never awaits while holding the lock, so it is safe from threads and event loops alike; seeding
+    is done outside the lock and the first seed to arrive wins.
+
+    Submitters of an account also queue up behind each other (join_queue/leave_queue) so a sequence always reaches
+    the server after its predecessor was applied, never ahead of it (terPRE_SEQ).
+    """
+    _allocators = {}
+    _lock = threading.Lock()
+
+    def __init__(self, address):
+        self.address = address
+        self._next_sequence = {}
+        self._queue_tails = {}
+        self._sequence_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, address):
+        with cls._lock:
+            allocator = cls._allocators.get(address)
+            if allocator is None:
+                allocator = cls._allocators[address] = cls(address)
+        return allocator
+
+    def is_seeded(self, account_id):
+        return account_id in self._next_sequence
+
+    def peek(self, account_id):
+        """
+        Next sequence that would be handed out for the account, or None if it is not seeded
+        """
+        return self._next_sequence.get(account_id)
+
+    def seed(self, account_id, sequence):
+        """
+        Set the next sequence of an account unless another caller seeded it first
+        """
+        with self._sequence_lock:
+            if account_id not in self._next_sequence:
+                log.debug("Sequence for {} seeded at {}".format(account_id, sequence))
+                self._next_sequence[account_id] = int(sequence)
+
+    def allocate(self, account_id):
+        """
+        Hand out the next sequence of a seeded account
+        """
+        with self._sequence_lock:
+            sequence = self._next_sequence[account_id]
+            self._next_sequence[account_id] = sequence + 1
+        return sequence
+
+    def release(self, account_id, sequence):
+        """
+        Give back a sequence that was not consumed (transaction not applied). If later sequences were handed out
+        meanwhile the account is resynced instead, as the gap cannot be closed locally
+        """
+        with self._sequence_lock:
+            if self._next_sequence.get(account_id) == sequence + 1:
+                self._next_sequence[account_id] = sequence
+            else:
+                self._next_sequence.pop(account_id, None)
+
+    def invalidate(self, account_id):
+        """
+        Forget the account's sequence; it is seeded again from the ledger on next use
+        """
+        with self._sequence_lock:
+            if self._next_sequence.pop(account_id, None) is not None:
+                log.debug("Sequence for {} invalidated".format(account_id))
+
+    def join_queue(self, account_id):
+        """
+        Queue up to submit from an account
+        return: (future of the previous submitter, or None if there is none; future to pass to leave_queue())
+        """
+        turn = concurrent.futures.Future()
+        with self._sequence_lock:
+            previous = self._queue_tails.get(account_id)
+            self._queue_tails[account_id] = turn
+        return previous, turn
+
+    def leave_queue(self, account_id, turn):
+        with self._sequence_lock:
+            if self._queue_tails.get(account_id) is turn:
+                del self._queue_tails[account_id]
+        turn.set_result(None)
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+from collections import deque
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+CONSUMED_TICKET_RESULTS = ("tefNO_TICKET", "tefPAST_SEQ")  # the ticket is gone: do not hand it out again
+
+
+class TicketManager:
+    """
+    Tickets of one account handed out to concurrent submitters.
+
+    A transaction using a ticket (Sequence 0, TicketSequence) does not depend on the account's other transactions,
+    so any number of them can be in flight at once, in any order and through any node, where sequence numbers force
+    one account's submissions to queue up behind each other. Tickets are created in batches of up to
+    MAX_TICKETS_PER_ACCOUNT with TicketCreate, refilled in the background when few are left, and tickets of
+    transactions that were not applied are recycled. Tickets the account already owns are reclaimed first.
+
+    One manager is kept per server address and account (get()), so every submitter shares the same tickets.
+    """
+    _managers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, rippled, account_id, secret, batch_size=constants.TICKET_BATCH_SIZE,
+                 low_water=constants.TICKET_LOW_WATER):
+        """
+        @param rippled: AsyncRippledServer
+        @param batch_size: tickets per TicketCreate (at most MAX_TICKETS_PER_ACCOUNT)
+        @param low_water: refill in the background once fewer tickets than this are left
+        """
+        self.rippled = rippled
+        self.account_id = account_id
+        self.secret = secret
+        self.batch_size = min(int(batch_size), constants.MAX_TICKETS_PER_ACCOUNT)
+        self.low_water = low_water
+        self.created = 0
+        self.recycled = 0
+        self._available = deque()
+        self._handed_out = set()  # every ticket handed out, never reclaimed from the ledger
+        self._refill_lock = None
+        self._refill_task = None
+
+    @classmethod
+    def get(cls, rippled, account_id, secret, **kwargs):
+        """
+        @param kwargs: batch_size, low_water of a manager created by this call
+        """
+        key = (rippled.address, account_id)
+        with cls._lock:
+            manager = cls._managers.get(key)
+            if manager is None:
+                manager = cls._managers[key] = cls(rippled, account_id, secret, **kwargs)
+        return manager
+
+    @classmethod
+    async def submit_all(cls, rippled, payloads, wait_for_ledger_close=False, verbose=False):
+        """
+        Submit payloads of one account all at once, each with a ticket of the account
+        """
+        managers = [cls.get(rippled, payload["tx_json"]["Account"], payload["secret"],
+                            batch_size=min(len(payloads), constants.TICKET_BATCH_SIZE))
+                    for payload in payloads]
+        return await asyncio.gather(*[manager.submit(payload, wait_for_ledger_close=wait_for_ledger_close,
+                                                     verbose=verbose)
+                                      for manager, payload in zip(managers, payloads)])
+
+    @property
+    def available(self):
+        return len(self._available)
+
+    async def submit(self, payload, wait_for_ledger_close=False, verbose=False):
+        """
+        Submit a payload ({"tx_json": {...}, "secret": ...}) of the account with the next ticket
+        """
+        ticket = await self.acquire()
+        tx_json = dict(payload["tx_json"], Sequence=0, TicketSequence=ticket)
+        try:
+            response = await self.rippled.execute_transaction(payload=dict(payload, tx_json=tx_json),
+                                                              wait_for_ledger_close=False, verbose=verbose)
+        except Exception:
+            self.release(ticket)
+            raise
+        self.settle(ticket, response)
+        if wait_for_ledger_close and response.get("engine_result") in ("tesSUCCESS", "terQUEUED"):
+            if not await self.rippled.is_transaction_validated(response, verbose=False):
+                raise Exception("Transaction not validated")
+        return response
+
+    async def acquire(self):
+        """
+        Hand out a ticket, creating more if none are left
+        """
+        while not self._available:
+            if not await self.refill():
+                raise Exception("No tickets available for {}".format(self.account_id))
+        ticket = self._available.popleft()
+        self._handed_out.add(ticket)
+        if len(self._available) < self.low_water and (self._refill_task is None or self._refill_task.done()):
+            self._refill_task = asyncio.create_task(self.refill())
+        return ticket
+
+    def release(self, ticket):
+        """
+        Give back a ticket whose transaction was not applied
+        """
+        self.recycled += 1
+        self._available.appendleft(ticket)
+
+    def settle(self, ticket, response):
+        engine_result = response.get("engine_result", "")
+        if engine_result in CONSUMED_TICKET_RESULTS:
+            log.debug("Ticket {} of {} is gone ({})".format(ticket, self.account_id, engine_result))
+        elif engine_result[:3] not in ("tes", "tec") and engine_result != "terQUEUED":
+            log.debug("Ticket {} not consumed ({}); recycling".format(ticket, engine_result or response.get("error")))
+            self.release(ticket)
+
+    async def refill(self):
+        """
+        Reclaim tickets the account owns that were never handed out, otherwise create a batch of tickets
+        return: False if no tickets could be added, True otherwise (including after waiting a ledger for tickets in
+                flight when the account owns as many tickets as it may)
+        """
+        if self._refill_lock is None:
+            self._refill_lock = asyncio.Lock()
+        async with self._refill_lock:
+            if len(self._available) >= self.low_water:
+                return True
+            owned = await self.owned_tickets()
+            reclaimed = sorted(set(owned) - self._handed_out - set(self._available))
+            if reclaimed:
+                self._available.extend(reclaimed)
+                log.debug("Reclaimed {} tickets of {}".format(len(reclaimed), self.account_id))
+                return True
+
+            count = min(self.batch_size, constants.MAX_TICKETS_PER_ACCOUNT - len(owned))
+            if count <= 0:
+                # Every ticket the account may own is in flight; wait for some to be consumed or recycled
+                await self.rippled.wait_for_ledger_close(int(await self.rippled.ledger_current(verbose=False)) + 1,
+                                                         verbose=False)
+                return True
+            response = await self.rippled.execute_transaction(payload={
+                "tx_json": {
+                    "TransactionType": "TicketCreate",
+                    "Account": self.account_id,
+                    "TicketCount": count,
+                },
+                "secret": self.secret
+            }, wait_for_ledger_close=False, verbose=False)
+            if "tx_json" not in response or not await self.rippled.is_transaction_validated(response, verbose=False):
+                log.warning("TicketCreate for {} failed: {}".format(
+                    self.account_id, response.get("engine_result", response.get("error"))))
+                return bool(self._available)
+            # A TicketCreate with sequence S creates tickets S + 1 to S + count
+            sequence = int(response["tx_json"]["Sequence"])
+            self._available.extend(range(sequence + 1, sequence + 1 + count))
+            self.created += count
+            log.debug("Created {} tickets for {} ({} available)".format(count, self.account_id,
+                                                                        len(self._available)))
+            return True
+
+    async def owned_tickets(self):
+        """
+        TicketSequence of every ticket the account owns in the current ledger
+        """
+        result = await self.rippled.execute_command({"method": "account_objects", "params": [{
+            "account": self.account_id, "type": "ticket", "ledger_index": "current",
+            "limit": constants.MAX_TICKETS_PER_ACCOUNT}]}, verbose=False)
+        return [account_object["TicketSequence"] for account_object in result.get("account_objects", [])
+                if account_object.get("LedgerEntryType") == "Ticket"]
@@ -0,0 +1,181 @@
+import gzip
+import json
+import os
+import threading
+import time
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+RECORDING_VERSION = 1
+TRANSACTION_METHODS = ("submit", "submit_multisigned")
+
+
+def open_recording(path, mode):
+    """
+    Recording file, gzip compressed if path ends in .gz
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", compresslevel=1)
+    return open(path, mode)
+
+
+def part_path(path, part):
+    """
+    File of one part of a rolled recording: the part number inserted before the extensions
+    (workload_traffic.jsonl.gz -> workload_traffic.0001.jsonl.gz)
+    """
+    directory, name = os.path.split(path)
+    stem, dot, extensions = name.partition(".")
+    return os.path.join(directory, "{}.{:04d}{}{}".format(stem, part, dot, extensions))
+
+
+def compact_result(result):
+    """
+    Submit results reduced to their outcome and transaction identity; other results as they are
+    """
+    if "engine_result" not in result:
+        return result
+    tx_json = result.get("tx_json", {})
+    return {
+        "engine_result": result["engine_result"],
+        "hash": tx_json.get("hash"),
+        "Account": tx_json.get("Account"),
+        "Sequence": tx_json.get("Sequence"),
+        "TransactionType": tx_json.get("TransactionType"),
+    }
+
+
+class TrafficRecorder:
+    """
+    Log of every request sent to a server and its response, with times relative to the start of the recording.
+
+    The file is JSON lines: a header ({"version", "start" and metadata such as the workload seed}) followed by one
+    {"t": seconds since start the request was sent, "rt": response time, "method", "params", "result"} per request.
+    Submit results keep only their engine_result and transaction identity. Lines are buffered and written every
+    TRAFFIC_RECORDER_FLUSH_LINES requests, so recording costs the event loop little even at high rates.
+
+    A long run rolls over to a new part (part_path()) every roll_requests requests; each part has its own header
+    ("part": its number) and times relative to its own start. Parts continue each other, so they are replayed in
+    order. Recording stops after max_parts parts, bounding the disk a run that never ends can use.
+    """
+    def __init__(self, path, roll_requests=None, max_parts=None, **metadata):
+        """
+        @param path: recording file (.gz to compress)
+        @param roll_requests: requests per part (default: a single file)
+        @param max_parts: parts to record before recording stops (default: no limit)
+        @param metadata: recorded in the header
+        """
+        self.path = path
+        self.roll_requests = roll_requests
+        self.max_parts = max_parts
+        self.metadata = metadata
+        self.count = 0
+        self.part = 0
+        self.paths = []
+        self.start_time = None
+        self._part_count = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._file = None
+        self._open_part()
+
+    def _open_part(self):
+        header = dict(version=RECORDING_VERSION, start=time.time(), **self.metadata)
+        if self.roll_requests:
+            self.part += 1
+            header["part"] = self.part
+            path = part_path(self.path, self.part)
+        else:
+            path = self.path
+        self.paths.append(path)
+        self.start_time = time.monotonic()
+        self._part_count = 0
+        self._file = open_recording(path, "w")
+        self._write_line(header)
+        self._file.flush()
+
+    def record(self, request, response, sent):
+        """
+        @param sent: time.monotonic() when the request was sent
+        """
+        received = time.monotonic()
+        with self._lock:
+            if self._file is None:
+                return
+            line = {
+                "t": round(max(sent - self.start_time, 0), 6),
+                "rt": round(received - sent, 6),
+                "method": request.get("method"),
+                "params": request.get("params"),
+                "result": compact_result((response or {}).get("result", {})),
+            }
+            self._buffer.append(json.dumps(line, separators=(",", ":")))
+            self.count += 1
+            self._part_count += 1
+            if self.roll_requests and self._part_count >= self.roll_requests:
+                self._roll()
+            elif len(self._buffer) >= constants.TRAFFIC_RECORDER_FLUSH_LINES:
+                self._flush()
+
+    def _roll(self):
+        self._flush()
+        self._file.close()
+        self._file = None
+        if self.max_parts and self.part >= self.max_parts:
+            log.warning("Recorded {} parts of {} requests; recording stopped".format(self.part, self.roll_requests))
+            return
+        self._open_part()
+        log.info("Recording part {} to {}".format(self.part, self.paths[-1]))
+
+    def flush(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer = []
+        self._file.flush()
+
+    def _write_line(self, line):
+        self._file.write(json.dumps(line, separators=(",", ":")) + "\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._flush()
+                self._file.close()
+                self._file = None
+        log.info("Recorded {} requests to {}".format(
+            self.count, self.paths[0] if len(self.paths) == 1 else "{} parts ({} to {})".format(
+                len(self.paths), self.paths[0], self.paths[-1])))
+
+
+def read_recording(path):
+    """
+    Header and requests of a recording, tolerating a last line cut short by an interrupted run
+    return: (header dict, list of request dicts)
+    """
+    header = None
+    requests = []
+    with open_recording(path, "r") as recording:
+        try:
+            for line in recording:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    log.warning("Skipping truncated line in recording {}".format(path))
+                    continue
+                if header is None:
+                    header = entry
+                else:
+                    requests.append(entry)
+        except EOFError:
+            log.warning("Recording {} ends early (interrupted run)".format(path))
+    if not header or header.get("version") != RECORDING_VERSION:
+        raise ValueError("{} is not a version {} traffic recording".format(path, RECORDING_VERSION))
+    return header, requests
@@ -0,0 +1,102 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+
+class HttpTransport:
+    """
+    Pooled keep-alive JSON-RPC transport.
+
+    One transport is kept per server address and shared by every server handle (RippledServer, ClioServer,
+    Witnesses, ...) pointing to that address, so connections opened by one handle are reused by the others.
+    The underlying urllib3 pool is thread safe; with pool_block set, callers beyond pool_size wait for a free
+    connection instead of opening new ones.
+    """
+    pool_size = constants.HTTP_POOL_SIZE
+    connect_timeout = constants.HTTP_CONNECT_TIMEOUT
+    read_timeout = constants.HTTP_READ_TIMEOUT
+    keep_alive = True
+
+    _transports = {}
+    _lock = threading.Lock()
+
+    def __init__(self, address, pool_size=None, connect_timeout=None, read_timeout=None, keep_alive=None):
+        self.address = address
+        self.pool_size = pool_size or HttpTransport.pool_size
+        self.timeout = (connect_timeout or HttpTransport.connect_timeout, read_timeout or HttpTransport.read_timeout)
+        self.keep_alive = HttpTransport.keep_alive if keep_alive is None else keep_alive
+
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, pool_block=True, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.session.headers.update({"Connection": "keep-alive" if self.keep_alive else "close"})
+
+    @classmethod
+    def configure(cls, pool_size=None, connect_timeout=None, read_timeout=None, keep_alive=None):
+        """
+        Set defaults for transports created from now on
+        @param pool_size: max number of connections kept open per server
+        @param connect_timeout: seconds to wait for a connection to be established
+        @param read_timeout: seconds to wait for a response
+        @param keep_alive: reuse connections across requests
+        """
+        if pool_size:
+            cls.pool_size = int(pool_size)
+        if connect_timeout:
+            cls.connect_timeout = float(connect_timeout)
+        if read_timeout:
+            cls.read_timeout = float(read_timeout)
+        if keep_alive is not None:
+            cls.keep_alive = keep_alive
+        log.debug("HTTP transport defaults: pool size {}, timeouts {}/{}, keep-alive {}".format(
+            cls.pool_size, cls.connect_timeout, cls.read_timeout, cls.keep_alive))
+
+    @classmethod
+    def get(cls, address):
+        """
+        Return the transport shared by all server handles for this address
+        @param address: server URL (example: http://localhost:5005)
+        """
+        with cls._lock:
+            transport = cls._transports.get(address)
+            if transport is None:
+                log.debug("Creating HTTP transport for {}".format(address))
+                transport = cls._transports[address] = cls(address)
+        return transport
+
+    @classmethod
+    def get_all_stats(cls):
+        with cls._lock:
+            transports = list(cls._transports.values())
+        return {transport.address: transport.get_stats() for transport in transports}
+
+    def post(self, data=None, json=None, timeout=None):
+        return self.session.post(self.address, data=data, json=json, timeout=timeout or self.timeout)
+
+    def get_stats(self):
+        """
+        Connection counters for this server
+        return: dict with number of requests, new and reused connections
+        """
+        pools = self.adapter.poolmanager.pools
+        num_requests = new_connections = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool:
+                num_requests += pool.num_requests
+                new_connections += pool.num_connections
+        return {
+            "requests": num_requests,
+            "new_connections": new_connections,
+            "reused_connections": max(num_requests - new_connections, 0),
+        }
+
+    def close(self):
+        self.session.close()
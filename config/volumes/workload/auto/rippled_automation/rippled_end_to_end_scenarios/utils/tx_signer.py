@@ -0,0 +1,149 @@
+import threading
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import keypairs
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.utils.binary_codec import BinaryCodec, UnsupportedTransaction, \
+    decode_account_id
+
+log = log_helper.get_logger()
+
+
+class LocalSigner:
+    """
+    Signs transactions on the client instead of the server.
+
+    Produces the same signed tx_json and tx_blob as rippled's "sign" and "sign_for" methods, so a signed transaction
+    can be submitted as a blob ("submit" with tx_blob). Keypairs are derived once per secret. Transactions the codec
+    cannot serialize raise UnsupportedTransaction and are left to the server.
+    """
+    def __init__(self, definitions):
+        """
+        @param definitions: result of the "server_definitions" RPC
+        """
+        self.codec = BinaryCodec(definitions)
+        self._keypairs = {}
+        self._lock = threading.Lock()
+
+    def get_keypair(self, secret, key_type=None):
+        with self._lock:
+            keypair = self._keypairs.get((secret, key_type))
+        if keypair is None:
+            try:
+                keypair = keypairs.derive_keypair(secret, key_type)
+            except ValueError as e:
+                raise UnsupportedTransaction("Invalid secret ({})".format(e))
+            with self._lock:
+                self._keypairs[(secret, key_type)] = keypair
+        return keypair
+
+    def sign(self, tx_json, secret, key_type=None):
+        """
+        Single-sign a transaction
+        return: (signed tx_json including its hash, tx_blob)
+        """
+        private_key, public_key = self.get_keypair(secret, key_type)
+        public_key_hex = public_key.hex().upper()
+        tx_json = dict(tx_json)
+        if tx_json.setdefault("SigningPubKey", public_key_hex) != public_key_hex:
+            raise UnsupportedTransaction("SigningPubKey does not match the secret")
+        signature = keypairs.sign(self.codec.signing_data(tx_json), private_key, public_key)
+        tx_json["TxnSignature"] = signature.hex().upper()
+        return self.serialize(tx_json)
+
+    def sign_for(self, tx_json, account_id, secret, key_type=None):
+        """
+        Add account_id's signature to a multi-signed transaction, keeping Signers sorted by account as required
+        return: (tx_json with the signature added to Signers, tx_blob)
+        """
+        private_key, public_key = self.get_keypair(secret, key_type)
+        tx_json = dict(tx_json)
+        if tx_json.setdefault("SigningPubKey", "") != "":
+            raise UnsupportedTransaction("Multi-signed transactions must have an empty SigningPubKey")
+        signature = keypairs.sign(self.codec.multisigning_data(tx_json, account_id), private_key, public_key)
+        signer = {
+            "Signer": {
+                "Account": account_id,
+                "SigningPubKey": public_key.hex().upper(),
+                "TxnSignature": signature.hex().upper()
+            }
+        }
+        signers = [entry for entry in tx_json.get("Signers", []) if entry["Signer"]["Account"] != account_id]
+        tx_json["Signers"] = sorted(signers + [signer], key=lambda entry: decode_account_id(entry["Signer"]["Account"]))
+        return self.serialize(tx_json)
+
+    def serialize(self, tx_json):
+        """
+        return: (tx_json including its hash, tx_blob) of a signed transaction
+        """
+        tx_blob = self.codec.encode(tx_json)
+        tx_json = dict(tx_json, hash=self.codec.transaction_hash(tx_blob))
+        return tx_json, tx_blob.hex().upper()
+
+
+class RequestSigner:
+    """
+    Signs the sign/sign_for/submit/submit_multisigned requests of a server on the client.
+
+    The LocalSigner is built from the server's "server_definitions" on first use. Requests that cannot be signed
+    locally, and every request once the server turns out not to provide its definitions, are left to the server.
+    """
+    def __init__(self):
+        self.signer = None
+        self.available = True
+
+    async def get_signer(self, send_request):
+        """
+        LocalSigner for the server's binary format, or None if the server does not provide its definitions
+        @param send_request: coroutine function sending a JSON-RPC request to the server
+        """
+        if self.signer is None and self.available:
+            response = await send_request({"method": "server_definitions", "params": [{}]})
+            result = response.get("result", {})
+            if "FIELDS" not in result:
+                log.warning("server_definitions not available ({}); signing on the server".format(
+                    result.get("error", result)))
+                self.available = False
+                return None
+            self.signer = LocalSigner(result)
+        return self.signer
+
+    async def sign_request(self, request, send_request):
+        """
+        Sign a sign/sign_for/submit/submit_multisigned request locally
+        @param send_request: coroutine function sending a JSON-RPC request to the server (for its definitions)
+        return: (request to send, None), or (None, response) for a request answered locally (sign, sign_for).
+                Requests that cannot be signed locally are returned as is to be signed by the server
+        """
+        method = request.get("method")
+        try:
+            params = request["params"][0]
+            tx_json = params["tx_json"]
+        except (KeyError, IndexError, TypeError) as e:
+            return request, None
+        if method not in ("sign", "sign_for", "submit", "submit_multisigned") or \
+                set(params) - {"tx_json", "secret", "key_type", "account", "fail_hard"} or \
+                "Sequence" not in tx_json or "Fee" not in tx_json or \
+                method != "submit_multisigned" and "secret" not in params:
+            return request, None
+
+        signer = await self.get_signer(send_request)
+        if signer is None:
+            return request, None
+        try:
+            if method == "submit_multisigned":
+                signed_tx_json, tx_blob = signer.serialize(tx_json)
+            elif method == "sign_for":
+                signed_tx_json, tx_blob = signer.sign_for(tx_json, params["account"], params["secret"],
+                                                          params.get("key_type"))
+            else:
+                signed_tx_json, tx_blob = signer.sign(tx_json, params["secret"], params.get("key_type"))
+        except (UnsupportedTransaction, ValueError, KeyError) as e:
+            log.debug("Signing on the server: {}".format(e))
+            return request, None
+
+        if method in ("sign", "sign_for"):
+            return None, {"result": {"status": "success", "tx_json": signed_tx_json, "tx_blob": tx_blob}}
+        submit_params = {"tx_blob": tx_blob}
+        if "fail_hard" in params:
+            submit_params["fail_hard"] = params["fail_hard"]
+        return {"method": "submit", "params": [submit_params]}, None
@@ -0,0 +1,184 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.utils.ledger_events import LedgerCloseMonitor
+from rippled_automation.rippled_end_to_end_scenarios.utils.ws_client import WebSocketClient
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+
+class TransactionTracker:
+    """
+    Shared subscriber to a server's "transactions" stream.
+
+    One tracker is kept per websocket address. Waiters register a transaction hash and get a future resolved with
+    the transaction result as soon as the validated transaction is streamed. Recently validated hashes are cached so
+    transactions validated before anyone waits on them are resolved immediately. A hash is looked up with the
+    caller's "tx" function only if it was not streamed within a few ledger closes (missed), or on timeout.
+    """
+    _trackers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, ws_address):
+        self.ws_address = ws_address
+        self.ws_client = WebSocketClient.get(ws_address)
+        self.ledger_monitor = LedgerCloseMonitor.get(ws_address)
+        self._futures = {}
+        self._validated = OrderedDict()
+        self._futures_lock = threading.Lock()
+        self._started = False
+        self._start_lock = threading.Lock()
+        self._retry_after = 0
+        self.ws_client.add_stream_listener(self._on_message)
+
+    @classmethod
+    def get(cls, ws_address):
+        """
+        Return the tracker shared by all server handles for this websocket address
+        @param ws_address: websocket URL (example: ws://localhost:6005)
+        """
+        with cls._lock:
+            tracker = cls._trackers.get(ws_address)
+            if tracker is None:
+                tracker = cls._trackers[ws_address] = cls(ws_address)
+        return tracker
+
+    def start(self, timeout=constants.STREAM_CONNECT_TIMEOUT):
+        """
+        Subscribe to the transactions stream (or reconnect if the connection dropped)
+        return: True if the stream is available
+        """
+        with self._start_lock:
+            if self._started and self.ws_client.is_connected():
+                return True
+            if time.time() < self._retry_after:
+                return False
+            try:
+                if not self._started:
+                    response = self.ws_client.subscribe(timeout=timeout, streams=["transactions"])
+                    if response.get("status") != "success":
+                        raise Exception(response.get("error", response))
+                    self._started = True
+                    log.debug("Subscribed to transactions stream on {}".format(self.ws_address))
+                elif not self.ws_client.is_connected():
+                    log.debug("Reconnecting to transactions stream on {}...".format(self.ws_address))
+                    self.ws_client.connect(timeout=timeout)
+            except Exception as e:
+                log.warning("Transactions stream unavailable on {} ({}); polling instead".format(self.ws_address, e))
+                self._retry_after = time.time() + constants.STREAM_RETRY_INTERVAL
+                return False
+        return self.ledger_monitor.start(timeout=timeout)
+
+    def is_available(self):
+        return self._started and self.ws_client.is_connected()
+
+    def track(self, tx_hash):
+        """
+        Future resolving to the TransactionResult of tx_hash once it is validated
+        """
+        future = concurrent.futures.Future()
+        with self._futures_lock:
+            if tx_hash in self._validated:
+                future.set_result(self._validated[tx_hash])
+                return future
+            return self._futures.setdefault(tx_hash, future)
+
+    def wait_for_transaction(self, tx_hash, lookup, timeout=30):
+        """
+        Block until tx_hash is validated
+        @param lookup: function returning the "tx" response for a hash, used only for missed hashes
+        return: TransactionResult when validated, False if not validated within timeout, None if the stream is
+                unavailable
+        """
+        if not self.start():
+            return None
+
+        future = self.track(tx_hash)
+        end_time = time.time() + timeout
+        checked_ledger_index = self.ledger_monitor.ledger_index
+        try:
+            while True:
+                remaining = end_time - time.time()
+                try:
+                    return future.result(timeout=max(min(remaining, constants.STREAM_WAIT_SLICE), 0))
+                except concurrent.futures.TimeoutError:
+                    pass
+                if not self.is_available():
+                    return None
+
+                if checked_ledger_index is None:
+                    checked_ledger_index = self.ledger_monitor.ledger_index
+                if remaining <= constants.STREAM_WAIT_SLICE or self._is_missed(checked_ledger_index):
+                    transaction_result = self._parse_lookup(lookup(tx_hash))
+                    if transaction_result or remaining <= constants.STREAM_WAIT_SLICE:
+                        return transaction_result or False
+                    checked_ledger_index = self.ledger_monitor.ledger_index
+        finally:
+            self._release(tx_hash, future)
+
+    async def async_wait_for_transaction(self, tx_hash, lookup, timeout=30):
+        """
+        Awaitable counterpart of wait_for_transaction(); lookup is a coroutine function
+        """
+        loop = asyncio.get_running_loop()
+        if not self.is_available() and not await loop.run_in_executor(None, self.start):
+            return None
+
+        future = self.track(tx_hash)
+        wrapped_future = asyncio.wrap_future(future)
+        end_time = time.time() + timeout
+        checked_ledger_index = self.ledger_monitor.ledger_index
+        try:
+            while True:
+                remaining = end_time - time.time()
+                await asyncio.wait({wrapped_future}, timeout=max(min(remaining, constants.STREAM_WAIT_SLICE), 0))
+                if wrapped_future.done():
+                    return wrapped_future.result()
+                if not self.is_available():
+                    return None
+
+                if checked_ledger_index is None:
+                    checked_ledger_index = self.ledger_monitor.ledger_index
+                if remaining <= constants.STREAM_WAIT_SLICE or self._is_missed(checked_ledger_index):
+                    transaction_result = self._parse_lookup(await lookup(tx_hash))
+                    if transaction_result or remaining <= constants.STREAM_WAIT_SLICE:
+                        return transaction_result or False
+                    checked_ledger_index = self.ledger_monitor.ledger_index
+        finally:
+            self._release(tx_hash, future)
+
+    def _is_missed(self, checked_ledger_index):
+        ledger_index = self.ledger_monitor.ledger_index
+        return ledger_index is not None and checked_ledger_index is not None and \
+            ledger_index >= checked_ledger_index + constants.TX_TRACKER_MISSED_LEDGERS
+
+    @staticmethod
+    def _parse_lookup(tx_response):
+        if tx_response.get("validated") and "meta" in tx_response:
+            log.debug("  Transaction {} resolved with tx lookup".format(tx_response.get("hash")))
+            return tx_response["meta"]["TransactionResult"]
+        return None
+
+    def _release(self, tx_hash, future):
+        with self._futures_lock:
+            if not future.done() and self._futures.get(tx_hash) is future:
+                del self._futures[tx_hash]
+
+    def _on_message(self, message):
+        if message.get("type") != "transaction" or not message.get("validated"):
+            return
+
+        tx_hash = message.get("hash") or message.get("transaction", {}).get("hash")
+        transaction_result = message.get("meta", {}).get("TransactionResult", message.get("engine_result"))
+        with self._futures_lock:
+            self._validated[tx_hash] = transaction_result
+            if len(self._validated) > constants.TX_TRACKER_CACHE_SIZE:
+                self._validated.popitem(last=False)
+            future = self._futures.pop(tx_hash, None)
+        if future is not None and not future.done():
+            future.set_result(transaction_result)
@@ -0,0 +1,199 @@
+import asyncio
+import concurrent.futures
+import itertools
+import json
+import threading
+
+import websockets
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+
+log = log_helper.get_logger()
+
+
+class WebSocketClient:
+    """
+    Persistent, multiplexed WebSocket connection to a server.
+
+    A single connection is kept per server address and served by one background event loop shared by all
+    clients. Every request is tagged with a client-generated "id" so any number of requests can be in flight on
+    the same socket; the caller's own "id" (if any) is restored in the response. Messages without a matching
+    request (ledger, transaction, validation streams, ...) are handed to the registered stream listeners.
+    """
+    REQUEST_ID_PREFIX = "ws_client_"
+
+    _clients = {}
+    _lock = threading.Lock()
+    _loop = None
+    _loop_thread = None
+
+    def __init__(self, address):
+        self.address = address
+        self._connection = None
+        self._connect_lock = None
+        self._request_ids = itertools.count(1)
+        self._pending = {}
+        self._stream_listeners = []
+        self._subscriptions = []
+
+    @classmethod
+    def get(cls, address):
+        """
+        Return the client shared by all server handles for this address
+        @param address: server URL (example: ws://localhost:6005)
+        """
+        with cls._lock:
+            client = cls._clients.get(address)
+            if client is None:
+                log.debug("Creating WebSocket client for {}".format(address))
+                client = cls._clients[address] = cls(address)
+        return client
+
+    @classmethod
+    def get_loop(cls):
+        """
+        Event loop (running in a daemon thread) serving all WebSocket clients
+        """
+        with cls._lock:
+            if cls._loop is None:
+                cls._loop = asyncio.new_event_loop()
+                cls._loop_thread = threading.Thread(target=cls._loop.run_forever, name="ws_client_loop", daemon=True)
+                cls._loop_thread.start()
+        return cls._loop
+
+    def add_stream_listener(self, callback):
+        """
+        Register a callback for stream messages. Callbacks run on the client event loop and must not block
+        @param callback: callable taking the decoded stream message
+        """
+        self._stream_listeners.append(callback)
+
+    def remove_stream_listener(self, callback):
+        if callback in self._stream_listeners:
+            self._stream_listeners.remove(callback)
+
+    def submit(self, payload, timeout=constants.WS_REQUEST_TIMEOUT):
+        """
+        Send a request without waiting for the response
+        @param payload: request in websocket format ({"command": ..., ...})
+        @param timeout: seconds to wait for the response before the request is dropped (TimeoutError)
+        return: concurrent.futures.Future resolving to the decoded response
+        """
+        return asyncio.run_coroutine_threadsafe(self._request(payload, timeout), self.get_loop())
+
+    def request(self, payload, timeout=constants.WS_REQUEST_TIMEOUT):
+        future = self.submit(payload, timeout)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()  # drops the pending request on the client loop
+            raise
+
+    async def async_request(self, payload, timeout=constants.WS_REQUEST_TIMEOUT):
+        """
+        Awaitable request, usable from any event loop
+        """
+        return await asyncio.wait_for(asyncio.wrap_future(self.submit(payload, timeout)), timeout)
+
+    def subscribe(self, timeout=constants.WS_REQUEST_TIMEOUT, **kwargs):
+        """
+        Subscribe this connection to streams; subscriptions are restored if the connection is re-established
+        @param kwargs: subscribe parameters (example: streams=["ledger"])
+        """
+        payload = dict(command="subscribe", **kwargs)
+        response = self.request(payload, timeout=timeout)
+        if payload not in self._subscriptions:
+            self._subscriptions.append(payload)
+        return response
+
+    def unsubscribe(self, timeout=constants.WS_REQUEST_TIMEOUT, **kwargs):
+        response = self.request(dict(command="unsubscribe", **kwargs), timeout=timeout)
+        subscription = dict(command="subscribe", **kwargs)
+        if subscription in self._subscriptions:
+            self._subscriptions.remove(subscription)
+        return response
+
+    def is_connected(self):
+        return self._connection is not None
+
+    def connect(self, timeout=constants.WS_REQUEST_TIMEOUT):
+        """
+        Open the connection (restoring subscriptions) if it is not open yet
+        """
+        asyncio.run_coroutine_threadsafe(self._get_connection(), self.get_loop()).result(timeout)
+
+    def close(self):
+        connection = self._connection
+        self._subscriptions.clear()
+        if connection is not None:
+            asyncio.run_coroutine_threadsafe(connection.close(), self.get_loop()).result(
+                constants.WS_REQUEST_TIMEOUT)
+
+    async def _request(self, payload, timeout=None):
+        connection = await self._get_connection()
+        request = dict(payload)
+        caller_id = request.get("id")
+        request_id = "{}{}".format(WebSocketClient.REQUEST_ID_PREFIX, next(self._request_ids))
+        request["id"] = request_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await connection.send(json.dumps(request))
+            response = await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+            future.cancel()
+
+        if caller_id is None:
+            response.pop("id", None)
+        else:
+            response["id"] = caller_id
+        return response
+
+    async def _get_connection(self):
+        if self._connection is not None:
+            return self._connection
+
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._connection is None:
+                log.debug("Connecting to {}...".format(self.address))
+                connection = await websockets.connect(self.address, max_size=None)
+                self._connection = connection
+                asyncio.get_running_loop().create_task(self._read_messages(connection))
+
+                for subscription in self._subscriptions:
+                    log.debug("Restoring subscription: {}".format(subscription))
+                    request = dict(subscription, id="{}{}".format(WebSocketClient.REQUEST_ID_PREFIX,
+                                                                  next(self._request_ids)))
+                    await connection.send(json.dumps(request))
+        return self._connection
+
+    async def _read_messages(self, connection):
+        try:
+            async for message in connection:
+                self._dispatch(json.loads(message))
+        except websockets.ConnectionClosed as e:
+            log.warning("WebSocket connection to {} closed: {}".format(self.address, e))
+        finally:
+            if self._connection is connection:
+                self._connection = None
+            for future in list(self._pending.values()):
+                if not future.done():
+                    future.set_exception(ConnectionError("WebSocket connection to {} closed".format(self.address)))
+
+    def _dispatch(self, message):
+        if message.get("type") == "response":
+            future = self._pending.get(message.get("id"))
+            if future is not None and not future.done():
+                future.set_result(message)
+            return
+
+        for callback in list(self._stream_listeners):
+            try:
+                callback(message)
+            except Exception as e:
+                log.error("Stream listener failed: {}".format(e))
@@ -0,0 +1,113 @@
+from collections import Counter
+
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+
+log = log_helper.get_logger()
+
+QUEUED_RESULTS = ("terQUEUED",)
+REJECTED_RESULTS = ("telCAN_NOT_QUEUE", "telCAN_NOT_QUEUE_BALANCE", "telCAN_NOT_QUEUE_BLOCKS",
+                    "telCAN_NOT_QUEUE_BLOCKED", "telCAN_NOT_QUEUE_FEE", "telCAN_NOT_QUEUE_FULL", "highFee")
+
+
+class AdaptiveRateController:
+    """
+    Offered load that settles just below the server's fee escalation point.
+
+    Once per ledger it reads server_info (load_factor) and the "fee" RPC (open ledger size against the expected
+    ledger size, transaction queue fill) and the share of submits queued (terQUEUED) or refused by the queue
+    (telCAN_NOT_QUEUE*) since the last update, then adjusts the rate additively-increase/multiplicatively-decrease:
+      - refused submits, a filling queue or many queued submits: back off by decrease_factor
+      - open ledger fee escalated (load_factor or open ledger level above normal): ease off by hold_factor
+      - open ledger well below its expected size: add increase_step (at least increase_fraction of the rate)
+    Usable as the schedule of an OpenLoopGenerator (rate_at(), time_after()).
+    """
+    def __init__(self, rippled, initial_tps=constants.BACKPRESSURE_INITIAL_TPS, min_tps=constants.BACKPRESSURE_MIN_TPS,
+                 max_tps=None, increase_step=constants.BACKPRESSURE_INCREASE_STEP,
+                 increase_fraction=constants.BACKPRESSURE_INCREASE_FRACTION,
+                 decrease_factor=constants.BACKPRESSURE_DECREASE_FACTOR,
+                 hold_factor=constants.BACKPRESSURE_HOLD_FACTOR):
+        """
+        @param rippled: AsyncRippledServer to read load from
+        @param initial_tps: rate until the first update (default BACKPRESSURE_INITIAL_TPS)
+        """
+        self.rippled = rippled
+        self.rate = float(initial_tps or constants.BACKPRESSURE_INITIAL_TPS)
+        self.min_tps = float(min_tps)
+        self.max_tps = float(max_tps) if max_tps else None
+        self.increase_step = float(increase_step)
+        self.increase_fraction = float(increase_fraction)
+        self.decrease_factor = float(decrease_factor)
+        self.hold_factor = float(hold_factor)
+        self.status = {}
+        self._previous_results = Counter()
+
+    def rate_at(self, elapsed):
+        return self.rate
+
+    def time_after(self, start, count):
+        return start + count / self.rate
+
+    async def read_status(self):
+        """
+        return: load_factor, open ledger and queue sizes from server_info and fee
+        """
+        server_info = await self.rippled.execute_command({"method": "server_info", "params": [{}]}, verbose=False)
+        fee = await self.rippled.execute_command({"method": "fee", "params": [{}]}, verbose=False)
+        info = server_info.get("info", {})
+        levels = fee.get("levels", {})
+        return {
+            "load_factor": float(info.get("load_factor", 1)),
+            "current_ledger_size": int(fee.get("current_ledger_size", 0)),
+            "expected_ledger_size": int(fee.get("expected_ledger_size", 0)),
+            "current_queue_size": int(fee.get("current_queue_size", 0)),
+            "max_queue_size": int(fee.get("max_queue_size", 0)),
+            "open_ledger_level": int(levels.get("open_ledger_level", 0)),
+            "reference_level": int(levels.get("reference_level", 0)),
+        }
+
+    async def update(self, results):
+        """
+        Adjust the rate from the server's state and the submit results since the last update
+        @param results: cumulative Counter of submit results (engine_result or error)
+        """
+        interval_results = Counter(results)
+        interval_results.subtract(self._previous_results)
+        self._previous_results = Counter(results)
+        submitted = sum(count for count in interval_results.values() if count > 0)
+        queued = sum(interval_results[result] for result in QUEUED_RESULTS)
+        rejected = sum(interval_results[result] for result in REJECTED_RESULTS)
+
+        try:
+            self.status = await self.read_status()
+        except Exception as e:
+            log.warning("Backpressure: server state unavailable ({}); keeping {:.1f} TPS".format(e, self.rate))
+            return self.rate
+        status = self.status
+        queue_fill = status["current_queue_size"] / status["max_queue_size"] if status["max_queue_size"] else 0
+        escalated = status["load_factor"] > 1 or status["open_ledger_level"] > status["reference_level"] > 0
+
+        if rejected or queue_fill > constants.BACKPRESSURE_MAX_QUEUE_FILL or \
+                submitted and queued / submitted > constants.BACKPRESSURE_MAX_QUEUED_SHARE:
+            reason = "back off"
+            rate = self.rate * self.decrease_factor
+        elif escalated:
+            reason = "escalated"
+            rate = self.rate * self.hold_factor
+        elif status["current_ledger_size"] < status["expected_ledger_size"] * constants.BACKPRESSURE_LEDGER_HEADROOM:
+            reason = "increase"
+            rate = self.rate + max(self.increase_step, self.rate * self.increase_fraction)
+        else:
+            reason = "hold"
+            rate = self.rate
+        rate = max(rate, self.min_tps)
+        if self.max_tps:
+            rate = min(rate, self.max_tps)
+
+        log.info("Backpressure: {} {:.1f} -> {:.1f} TPS (load factor {}, open ledger {}/{}, queue {}/{}, "
+                 "queued {}, refused {} of {} submits)".format(
+                    reason, self.rate, rate, status["load_factor"], status["current_ledger_size"],
+                    status["expected_ledger_size"], status["current_queue_size"], status["max_queue_size"],
+                    queued, rejected, submitted))
+        self.rate = rate
+        return rate
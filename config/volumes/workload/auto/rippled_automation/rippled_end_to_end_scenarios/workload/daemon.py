@@ -0,0 +1,248 @@
+import asyncio
+import random
+from collections import Counter
+
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+
+log = log_helper.get_logger()
+
+ISSUER_CURRENCIES = ["USD", "EUR", "JPY", "CNY", "GBP"]
+ACTION_WEIGHTS = {
+    "payment": 35,
+    "iou_payment": 25,
+    "trust_set": 15,
+    "nft_mint": 10,
+    "nft_burn": 5,
+    "nft_transfer": 5,
+    "designate_issuer": 5,
+}
+
+
+class WorkloadDaemon:
+    """
+    Long-running workload reusing its accounts, trust lines and NFTs across rounds and restarts.
+
+    Every round tops the account set up towards target_accounts (a few accounts per round), then submits round_size
+    actions drawn from what the current state allows: XRP payments, new issuers and trust lines, IOU payments along
+    existing trust lines, NFT mints, burns and transfers. The round ends once its transactions are validated (or
+    failed); validated effects are applied to the state, which is checkpointed after every round.
+    """
+    def __init__(self, rippled, state, target_accounts=50, round_size=50, new_accounts_per_round=10, rng=None):
+        """
+        @param rippled: AsyncRippledServer
+        @param state: WorkloadState
+        """
+        self.rippled = rippled
+        self.state = state
+        self.target_accounts = max(int(target_accounts), 2)
+        self.round_size = int(round_size)
+        self.new_accounts_per_round = int(new_accounts_per_round)
+        self.rng = rng or random.SystemRandom()
+        self.results = Counter()
+
+    async def run(self, rounds=None):
+        """
+        Run rounds (forever if None), resuming from the state's last checkpoint
+        """
+        if self.state.load(self.rippled):
+            await self.prune()
+        completed_rounds = 0
+        while rounds is None or completed_rounds < rounds:
+            await self.run_round()
+            completed_rounds += 1
+            self.state.rounds += 1
+            self.state.save()
+            log.info("Round {}: {}; {}".format(self.state.rounds, dict(self.results.most_common()),
+                                               self.state.summary()))
+            if self.rippled.node_pool:
+                await self.rippled.node_pool.log_status()
+
+    async def prune(self):
+        """
+        Forget accounts missing from the validated ledger (the network was reset or they were never validated)
+        """
+        account_ids = list(self.state.accounts)
+        responses = await asyncio.gather(*[self.rippled.get_account_info(account_id, ledger_index="validated",
+                                                                         verbose=False)
+                                           for account_id in account_ids])
+        missing = [account_id for account_id, response in zip(account_ids, responses)
+                   if response.get("error") == "actNotFound"]
+        for account_id in missing:
+            self.state.remove_account(account_id)
+        if missing:
+            log.info("Dropped {} accounts not found on ledger: {}".format(len(missing), self.state.summary()))
+
+    async def run_round(self):
+        self.results = Counter()
+        actions = []
+        new_accounts = min(self.target_accounts - len(self.state.accounts), self.new_accounts_per_round)
+        actions.extend(self.create_account() for _ in range(max(new_accounts, 0)))
+        if len(self.state.accounts) >= 2:
+            for _ in range(self.round_size):
+                action = self.choose_action()
+                if action:
+                    actions.append(getattr(self, action)())
+
+        submitted = await asyncio.gather(*actions)
+        await asyncio.gather(*[self.complete(*submission) for submission in submitted if submission])
+
+    def choose_action(self):
+        available = [action for action in ACTION_WEIGHTS if self.is_available(action)]
+        if not available:
+            return None
+        return self.rng.choices(available, weights=[ACTION_WEIGHTS[action] for action in available])[0]
+
+    def is_available(self, action):
+        if action == "iou_payment":
+            return any(self.state.trust_lines.values())
+        if action == "trust_set":
+            return bool(self.state.issuers)
+        if action in ("nft_burn", "nft_transfer"):
+            return any(self.state.nfts.values())
+        if action == "designate_issuer":
+            return len(self.state.issuers) < len(ISSUER_CURRENCIES)
+        return True
+
+    async def complete(self, action, response, on_result=None):
+        """
+        Wait for a submitted action's transaction and apply its effect
+        """
+        validated = "tx_json" in response and \
+            await self.rippled.is_transaction_validated(response, verbose=False)
+        self.results["{} {}".format(action, response.get("engine_result", response.get("error")))] += 1
+        if on_result:
+            await on_result(validated, response)
+
+    async def submit(self, account, tx_json):
+        payload = {"tx_json": dict(tx_json, Account=account.account_id), "secret": account.master_seed}
+        return await self.rippled.execute_transaction(payload=payload, wait_for_ledger_close=False, verbose=False)
+
+    def pick_accounts(self, count=1):
+        return self.rng.sample(list(self.state.accounts.values()), count)
+
+    async def create_account(self):
+        account = await self.rippled.create_account(verbose=False)
+        response = await self.rippled.fund_account(account.account_id, constants.WORKLOAD_ACCOUNT_BALANCE,
+                                                   wait_for_ledger_close=False, verbose=False)
+
+        async def on_result(validated, response):
+            if validated:
+                self.state.add_account(account)
+        return "create_account", response, on_result
+
+    async def payment(self):
+        source, destination = self.pick_accounts(2)
+        response = await self.rippled.make_payment(source, destination, str(self.rng.randrange(1, 1000000)),
+                                                   wait_for_ledger_close=False, verbose=False)
+        return "payment", response
+
+    async def designate_issuer(self):
+        account, = self.pick_accounts()
+        currencies = [currency for currency in ISSUER_CURRENCIES if currency not in self.state.issuers.values()]
+        if not currencies or account.account_id in self.state.issuers:
+            return None
+        currency = currencies[0]
+        self.state.issuers[account.account_id] = currency
+        response = await self.submit(account, {"TransactionType": "AccountSet",
+                                               "SetFlag": constants.FLAGS_DEFAULT_RIPPLE_asfDefaultRipple})
+
+        async def on_result(validated, response):
+            if not validated:
+                self.state.issuers.pop(account.account_id, None)
+        return "designate_issuer", response, on_result
+
+    async def trust_set(self):
+        account, = self.pick_accounts()
+        issuer_id = self.rng.choice(list(self.state.issuers))
+        line = (self.state.issuers[issuer_id], issuer_id)
+        if issuer_id == account.account_id or line in self.state.trust_lines[account.account_id]:
+            return None
+        response = await self.rippled.create_trustline(account, {"currency": line[0], "issuer": issuer_id},
+                                                       wait_for_ledger_close=False, verbose=False)
+
+        async def on_result(validated, response):
+            if validated and account.account_id in self.state.accounts:
+                self.state.trust_lines[account.account_id].add(line)
+        return "trust_set", response, on_result
+
+    async def iou_payment(self):
+        holder_id = self.rng.choice([account_id for account_id, lines in self.state.trust_lines.items() if lines])
+        currency, issuer_id = self.rng.choice(sorted(self.state.trust_lines[holder_id]))
+        # issue, redeem, or pay another holder through the issuer
+        counterparties = [issuer_id] + [account_id for account_id in self.state.holders(currency, issuer_id)
+                                        if account_id != holder_id]
+        counterparty_id = self.rng.choice(counterparties)
+        if counterparty_id == issuer_id or self.rng.random() < 0.5:
+            source, destination = self.state.accounts[counterparty_id], self.state.accounts[holder_id]
+        else:
+            source, destination = self.state.accounts[holder_id], self.state.accounts[counterparty_id]
+        amount = {"currency": currency, "issuer": issuer_id, "value": str(self.rng.randrange(1, 1000))}
+        response = await self.rippled.make_payment(source, destination, amount, wait_for_ledger_close=False,
+                                                   verbose=False)
+        return "iou_payment", response
+
+    async def nft_mint(self):
+        account, = self.pick_accounts()
+        response = await self.submit(account, {"TransactionType": "NFTokenMint",
+                                               "NFTokenTaxon": self.rng.randrange(10),
+                                               "Flags": 8})  # tfTransferable
+
+        async def on_result(validated, response):
+            if validated and account.account_id in self.state.accounts:
+                tx_response = await self.rippled.tx(response["tx_json"]["hash"], verbose=False)
+                nft_id = tx_response.get("meta", {}).get("nftoken_id")
+                if nft_id:
+                    self.state.nfts[account.account_id].add(nft_id)
+        return "nft_mint", response, on_result
+
+    def take_nft(self):
+        """
+        Remove a random NFT from the state while a transaction moves or burns it
+        return: (owner, NFTokenID), or (None, None) if there are no NFTs left
+        """
+        owners = [account_id for account_id, nfts in self.state.nfts.items() if nfts]
+        if not owners:
+            return None, None
+        owner_id = self.rng.choice(owners)
+        nft_id = self.rng.choice(sorted(self.state.nfts[owner_id]))
+        self.state.nfts[owner_id].discard(nft_id)
+        return self.state.accounts[owner_id], nft_id
+
+    async def nft_burn(self):
+        owner, nft_id = self.take_nft()
+        if owner is None:
+            return None
+        response = await self.submit(owner, {"TransactionType": "NFTokenBurn", "NFTokenID": nft_id})
+
+        async def on_result(validated, response):
+            if not validated and owner.account_id in self.state.accounts:
+                self.state.nfts[owner.account_id].add(nft_id)
+        return "nft_burn", response, on_result
+
+    async def nft_transfer(self):
+        """
+        Free sell offer to another account, accepted by that account once validated
+        """
+        owner, nft_id = self.take_nft()
+        if owner is None:
+            return None
+        buyer = self.rng.choice([account for account in self.state.accounts.values() if account is not owner])
+        response = await self.submit(owner, {"TransactionType": "NFTokenCreateOffer", "NFTokenID": nft_id,
+                                             "Amount": "0", "Destination": buyer.account_id,
+                                             "Flags": 1})  # tfSellNFToken
+
+        async def on_result(validated, response):
+            new_owner = owner
+            if validated:
+                tx_response = await self.rippled.tx(response["tx_json"]["hash"], verbose=False)
+                offer_id = tx_response.get("meta", {}).get("offer_id")
+                if offer_id:
+                    accept_response = await self.submit(buyer, {"TransactionType": "NFTokenAcceptOffer",
+                                                                "NFTokenSellOffer": offer_id})
+                    if await self.rippled.is_transaction_validated(accept_response, verbose=False):
+                        new_owner = buyer
+                    self.results["nft_accept {}".format(accept_response.get("engine_result"))] += 1
+            if new_owner.account_id in self.state.accounts:
+                self.state.nfts[new_owner.account_id].add(nft_id)
+        return "nft_transfer", response, on_result
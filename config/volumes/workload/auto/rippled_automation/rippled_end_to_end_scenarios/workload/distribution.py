@@ -0,0 +1,129 @@
+import asyncio
+from collections import Counter
+
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+
+log = log_helper.get_logger()
+
+
+class IOUDistributor:
+    """
+    Trust lines and issuer balances of one token for many holders in a few ledgers.
+
+    Holders are taken in batches: the TrustSets of a whole batch are submitted together (one per holder) and tracked
+    until validated, then the issuer pays every holder whose trust line validated. The payments of a batch are
+    submitted alongside the TrustSets of the next one. A batch is sized so that both fit in the open ledger
+    (expected_ledger_size of the fee RPC, at most batch_size): past it, fees escalate and the transaction queue
+    takes only a few transactions of the issuer. Payments that were not applied (tel/ter results, dropped from the
+    queue, or failed requests) are retried with the next batch, up to IOU_DISTRIBUTION_MAX_RETRIES times. Issuer
+    payments are submitted without the server's busy retries, so a refused payment does not hold up the issuer's
+    other payments behind it.
+
+    As a batch takes at least one ledger, a distribution takes about len(holders) / (expected_ledger_size / 2) + 1
+    ledgers: with an expected ledger size of a few dozen transactions, 1,000 holders take dozens of ledgers. The
+    limit is the open ledger size, not the issuer's sequence: issuer tickets would fit no more payments per ledger.
+    """
+    def __init__(self, rippled, issuer, currency, limit=int(1e9),
+                 batch_size=constants.IOU_DISTRIBUTION_BATCH_SIZE):
+        """
+        @param rippled: AsyncRippledServer
+        @param issuer: issuing Account (account_id, master_seed)
+        @param limit: trust line limit of each holder
+        @param batch_size: most holders per batch
+        """
+        self.rippled = rippled
+        self.issuer = issuer
+        self.token = {"currency": currency, "issuer": issuer.account_id}
+        self.limit = limit
+        self.batch_size = max(int(batch_size), 1)
+
+    async def open_ledger_batch_size(self):
+        """
+        Holders per batch: half the open ledger's expected size (TrustSets and payments share it), at most batch_size
+        """
+        try:
+            fee = await self.rippled.execute_command({"method": "fee", "params": [{}]}, verbose=False)
+            expected_ledger_size = int(fee.get("expected_ledger_size", 0))
+        except Exception as e:
+            log.debug("Cannot read the open ledger size: {}".format(e))
+            expected_ledger_size = 0
+        if not expected_ledger_size:
+            return self.batch_size
+        return max(min(expected_ledger_size // 2, self.batch_size), 1)
+
+    async def distribute(self, holders, amount):
+        """
+        Create a trust line from every holder to the issuer and pay each of them amount
+        @param amount: token value (string) paid to each holder
+        return: holders whose trust line and payment validated
+        """
+        holders = [holder for holder in holders if holder.account_id != self.issuer.account_id]
+        batch_size = await self.open_ledger_batch_size()
+        distributed = []
+        to_pay = []  # holders with a validated trust line, not paid yet
+        retries = Counter()
+        start = 0
+        while start < len(holders) or to_pay:
+            batch, paying = holders[start:start + batch_size], to_pay[:batch_size]
+            start += len(batch)
+            to_pay = to_pay[batch_size:]
+            trusted, (paid, not_applied) = await asyncio.gather(self.create_trust_lines(batch),
+                                                                self.pay(paying, amount))
+            distributed.extend(paid)
+            for holder in not_applied:
+                retries[holder.account_id] += 1
+                if retries[holder.account_id] <= constants.IOU_DISTRIBUTION_MAX_RETRIES:
+                    to_pay.append(holder)
+                else:
+                    log.warning("Paying {} {} to {} failed {} times; giving up".format(
+                        amount, self.token["currency"], holder.account_id, retries[holder.account_id]))
+            to_pay.extend(trusted)
+        log.info("Distributed {} {} to {} of {} holders ({} payments retried)".format(
+            amount, self.token["currency"], len(distributed), len(holders), sum(retries.values())))
+        return distributed
+
+    async def create_trust_lines(self, holders):
+        responses = await asyncio.gather(*[self.rippled.create_trustline(holder, self.token, limit=self.limit,
+                                                                         wait_for_ledger_close=False, verbose=False)
+                                           for holder in holders], return_exceptions=True)
+        validated, _ = await self.validated(holders, responses)
+        return validated
+
+    async def pay(self, holders, amount):
+        """
+        return: holders whose payment validated, holders whose payment was not applied and may be retried
+        """
+        responses = await asyncio.gather(*[self.rippled.make_payment(self.issuer, holder,
+                                                                     dict(self.token, value=str(amount)),
+                                                                     wait_for_ledger_close=False, verbose=False,
+                                                                     retry_busy=False)
+                                           for holder in holders], return_exceptions=True)
+        return await self.validated(holders, responses)
+
+    async def validated(self, holders, responses):
+        """
+        @param responses: submit results, or the exception a submission raised (not applied)
+        return: holders whose transaction validated, holders whose transaction was not applied (tel/ter/tef result,
+                error, or queued and dropped); tem and tec failures are final
+        """
+        responses = [{"error": repr(response)} if isinstance(response, Exception) else response
+                     for response in responses]
+        validated = await asyncio.gather(*[self.rippled.is_transaction_validated(response, verbose=False)
+                                           if "tx_json" in response and
+                                           response.get("engine_result") in ("tesSUCCESS", "terQUEUED")
+                                           else self.failed(response)
+                                           for response in responses])
+        applied, not_applied = [], []
+        for holder, response, is_validated in zip(holders, responses, validated):
+            if is_validated:
+                applied.append(holder)
+            elif response.get("engine_result", "")[:3] not in ("tem", "tec"):
+                not_applied.append(holder)
+        return applied, not_applied
+
+    @staticmethod
+    async def failed(response):
+        log.debug("Not applied: {}".format(response.get("engine_result", response.get("error_message",
+                                                                                       response.get("error")))))
+        return False
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import os
+import time
+from collections import Counter
+
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.src.commands.account import Account
+from rippled_automation.rippled_end_to_end_scenarios.utils import keypairs
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.utils.ticket_manager import TicketManager
+from rippled_automation.rippled_end_to_end_scenarios.workload.tx_mix import PayloadRecorder
+
+log = log_helper.get_logger()
+
+BUILDER_STATE_VERSION = 1
+OBJECT_KINDS = ("accounts", "trust_lines", "offers", "nfts", "escrows", "oracles")
+XRP = "XRP"
+CURRENCY_FIRST_CHARACTERS = "ABCDEFGHIJKLMNOPQRSTUVW"  # never "XRP"
+CURRENCY_CHARACTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+MAX_CURRENCIES = len(CURRENCY_FIRST_CHARACTERS) * len(CURRENCY_CHARACTERS) ** 2
+
+
+def currency_code(index):
+    """
+    Three-character currency code of a trust line currency index (AAA, AAB, ...)
+    """
+    if index >= MAX_CURRENCIES:
+        raise ValueError("No currency code for index {} (max {})".format(index, MAX_CURRENCIES - 1))
+    first, rest = divmod(index, len(CURRENCY_CHARACTERS) ** 2)
+    second, third = divmod(rest, len(CURRENCY_CHARACTERS))
+    return CURRENCY_FIRST_CHARACTERS[first] + CURRENCY_CHARACTERS[second] + CURRENCY_CHARACTERS[third]
+
+
+def format_duration(seconds):
+    if seconds is None:
+        return "unknown"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return "{}:{:02d}:{:02d}".format(hours, minutes, seconds)
+
+
+class LedgerStateBuilder:
+    """
+    Fills a network with a target number of ledger objects, for paging and large-directory tests of read RPCs.
+
+    Objects are created kind by kind (accounts first, then trust lines, offers, NFTs, escrows and oracles) in
+    batches: the transactions of a batch are submitted by up to `parallel` concurrent submitters and the batch ends
+    once they are validated. Accounts are funded by the server's funding account; account 0 issues the tokens
+    and places the offers selling them (with its own tickets), and every other account holds trust lines, XRP
+    offers, NFTs, escrows and oracles in turn. Progress is checkpointed after every batch, so a build resumes
+    where it stopped, and logged with an estimate of the time left.
+    """
+    def __init__(self, rippled, targets, path=None, books=("XRP/USD",), batch_size=constants.BUILDER_BATCH_SIZE,
+                 parallel=constants.BUILDER_PARALLEL_SUBMITS):
+        """
+        @param rippled: AsyncRippledServer (with funding_tickets, accounts are funded with tickets)
+        @param targets: dict of object kind (OBJECT_KINDS) -> number of objects wanted
+        @param path: checkpoint file
+        @param books: order books to fill, "BASE/QUOTE" (XRP or a currency issued by account 0); offers sell BASE
+        """
+        unknown = set(targets) - set(OBJECT_KINDS)
+        if unknown:
+            raise ValueError("Unknown object kinds: {} (known: {})".format(", ".join(sorted(unknown)),
+                                                                           ", ".join(OBJECT_KINDS)))
+        self.rippled = rippled
+        self.targets = {kind: int(targets.get(kind, 0)) for kind in OBJECT_KINDS}
+        self.targets["accounts"] = max(self.targets["accounts"], 2)
+        self.path = path
+        self.books = [tuple(book.split("/")) for book in books]
+        self.batch_size = int(batch_size)
+        self.parallel = int(parallel)
+        self.accounts = []
+        self.created = dict.fromkeys(OBJECT_KINDS, 0)
+        self.next_index = dict.fromkeys(OBJECT_KINDS, 0)
+        self.results = Counter()
+        self.recorder = PayloadRecorder()
+        self._semaphore = None
+        self._start_time = None
+        self._created_at_start = 0
+
+    @property
+    def issuer(self):
+        return self.accounts[0]
+
+    @property
+    def holders(self):
+        return self.accounts[1:]
+
+    def load(self):
+        """
+        Resume from the last checkpoint
+        return: True if a checkpoint was loaded
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path) as state_file:
+            state = json.load(state_file)
+        if state.get("version") != BUILDER_STATE_VERSION:
+            log.warning("Ignoring ledger builder state {} (version {})".format(self.path, state.get("version")))
+            return False
+        self.accounts = [Account(keypairs.wallet_from_seed(seed)) for seed in state["accounts"]]
+        self.created.update(state["created"])
+        self.next_index.update(state["next_index"])
+        log.info("Resuming from {}: {}".format(self.path, self.summary()))
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        state = {
+            "version": BUILDER_STATE_VERSION,
+            "saved": int(time.time()),
+            "targets": self.targets,
+            "created": self.created,
+            "next_index": self.next_index,
+            "accounts": [account.master_seed for account in self.accounts],
+        }
+        temp_path = "{}.tmp".format(self.path)
+        with open(temp_path, "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(temp_path, self.path)
+
+    def summary(self):
+        return ", ".join("{} {}/{}".format(kind, self.created[kind], self.targets[kind]) for kind in OBJECT_KINDS)
+
+    async def build(self):
+        self.load()
+        self._semaphore = asyncio.Semaphore(self.parallel)
+        self._start_time = time.time()
+        self._created_at_start = sum(self.created.values())
+        if not self.accounts:
+            await self.create_issuer()
+        for kind in OBJECT_KINDS:
+            failed_batches = 0
+            while self.created[kind] < self.targets[kind]:
+                if await self.build_batch(kind):
+                    failed_batches = 0
+                else:
+                    failed_batches += 1
+                    if failed_batches >= constants.BUILDER_MAX_FAILED_BATCHES:
+                        raise Exception("No {} created in {} batches; results: {}".format(
+                            kind, failed_batches, dict(self.results.most_common())))
+        log.info("Ledger state built in {}: {}".format(format_duration(time.time() - self._start_time),
+                                                         self.summary()))
+
+    async def build_batch(self, kind):
+        """
+        Submit a batch of objects of a kind and wait until they are validated
+        return: number of objects created
+        """
+        count = min(self.batch_size, self.targets[kind] - self.created[kind])
+        start_index = self.next_index[kind]
+        self.next_index[kind] += count
+        if kind == "accounts":
+            amount = self.holder_balance()
+            created = await asyncio.gather(*[self.create_account(wallet, amount)
+                                             for wallet in keypairs.generate_wallets(count)])
+        else:
+            build = getattr(self, "build_{}".format(kind[:-1]))
+            created = await asyncio.gather(*[self.create(kind, *build(index))
+                                             for index in range(start_index, start_index + count)])
+        self.created[kind] += sum(created)
+        self.save()
+        self.log_progress(kind)
+        return sum(created)
+
+    async def create_issuer(self):
+        """
+        Account 0, issuing the tokens and placing the offers selling them
+        """
+        if not await self.create_account(keypairs.generate_wallet(), self.issuer_balance()):
+            raise Exception("Unable to fund the issuer account; results: {}".format(dict(self.results)))
+        self.created["accounts"] += 1
+        self.next_index["accounts"] += 1
+        self.save()
+
+    async def create_account(self, wallet, amount):
+        account = Account(wallet)
+        async with self._semaphore:
+            response = await self.rippled.fund_account(account.account_id, str(amount), wait_for_ledger_close=False,
+                                                       verbose=False)
+        if not await self.is_validated("accounts", response):
+            return False
+        self.accounts.append(account)
+        return True
+
+    def holder_balance(self):
+        """
+        XRP drops covering the owner reserve of a holder's share of the objects, with room for fees
+        """
+        holders = max(self.targets["accounts"] - 1, 1)
+        xrp_offers = sum(1 for base, quote in self.books if base == XRP)
+        offers = self.targets["offers"] * xrp_offers // len(self.books) if self.books else 0
+        owner_objects = self.targets["trust_lines"] + offers + self.targets["escrows"] + \
+            2 * self.targets["oracles"] + self.targets["nfts"] // (constants.MAX_NFTOKEN_PAGE_OBJECTS_LIMIT // 2) + 1
+        objects_per_holder = -(-owner_objects // holders) + constants.BUILDER_SPARE_OBJECTS
+        return int(constants.BASE_RESERVE) + int(constants.OWNER_RESERVE) * objects_per_holder + \
+            int(constants.DEFAULT_TRANSACTION_FEE) * objects_per_holder * 2 + int(constants.DEFAULT_ACCOUNT_BALANCE)
+
+    def issuer_balance(self):
+        """
+        XRP drops covering the offers selling tokens and a full set of tickets
+        """
+        iou_offers = sum(1 for base, quote in self.books if base != XRP)
+        offers = -(-self.targets["offers"] * iou_offers // len(self.books)) if self.books else 0
+        owner_objects = offers + constants.MAX_TICKETS_PER_ACCOUNT + constants.BUILDER_SPARE_OBJECTS
+        return int(constants.BASE_RESERVE) + int(constants.OWNER_RESERVE) * owner_objects + \
+            int(constants.DEFAULT_TRANSACTION_FEE) * owner_objects * 2 + int(constants.DEFAULT_ACCOUNT_BALANCE)
+
+    async def create(self, kind, account, tx_json, payload=None, hot=False):
+        """
+        Submit a transaction creating one object
+        @param hot: submit with tickets (an account submitting much of a batch)
+        """
+        payload = payload or {"tx_json": dict(tx_json, Account=account.account_id), "secret": account.master_seed}
+        async with self._semaphore:
+            if hot:
+                response = await TicketManager.get(self.rippled, account.account_id, account.master_seed).submit(
+                    payload)
+            else:
+                response = await self.rippled.execute_transaction(payload=payload, wait_for_ledger_close=False,
+                                                                  verbose=False)
+        return await self.is_validated(kind, response)
+
+    async def is_validated(self, kind, response):
+        self.results["{} {}".format(kind, response.get("engine_result", response.get("error")))] += 1
+        return "tx_json" in response and await self.rippled.is_transaction_validated(response, verbose=False)
+
+    def amount(self, currency, value):
+        if currency == XRP:
+            return str(int(value * 1000000))
+        return {"currency": currency, "issuer": self.issuer.account_id, "value": str(value)}
+
+    def build_trust_line(self, index):
+        holders = self.holders
+        holder = holders[index % len(holders)]
+        limit = self.amount(currency_code(index // len(holders)), constants.BUILDER_TRUST_LIMIT)
+        return holder, {"TransactionType": "TrustSet", "LimitAmount": limit}
+
+    def build_offer(self, index):
+        """
+        Offers of a book all sell 1 BASE for 2 to 1001 QUOTE, so they never cross each other (or the reverse book)
+        """
+        base, quote = self.books[index % len(self.books)]
+        book_index = index // len(self.books)
+        if base == XRP:
+            owner, hot = self.holders[book_index % len(self.holders)], False
+        else:
+            owner, hot = self.issuer, True
+        return owner, {"TransactionType": "OfferCreate", "TakerGets": self.amount(base, 1),
+                       "TakerPays": self.amount(quote, 2 + book_index % 1000)}, None, hot
+
+    def build_nft(self, index):
+        # Consecutive NFTs go to the same owner, filling its NFTokenPages
+        owner = self.holders[index // constants.MAX_NFTOKEN_PAGE_OBJECTS_LIMIT % len(self.holders)]
+        return owner, {"TransactionType": "NFTokenMint", "NFTokenTaxon": 0, "Flags": 8}  # tfTransferable
+
+    def build_escrow(self, index):
+        holders = self.holders
+        owner = holders[index % len(holders)]
+        destination = holders[(index + 1) % len(holders)] if len(holders) > 1 else self.issuer
+        now = int(time.time()) - constants.RIPPLE_EPOCH
+        return owner, {"TransactionType": "EscrowCreate", "Destination": destination.account_id, "Amount": "1",
+                       "FinishAfter": now + constants.BUILDER_ESCROW_FINISH_AFTER,
+                       "CancelAfter": now + 2 * constants.BUILDER_ESCROW_FINISH_AFTER}
+
+    def build_oracle(self, index):
+        holders = self.holders
+        owner = holders[index % len(holders)]
+        payload, = self.recorder.record("oracle_set", owner, oracle_document_id=index // len(holders), verbose=False)
+        return owner, None, payload
+
+    def log_progress(self, kind):
+        total = sum(self.targets.values())
+        done = sum(min(self.created[object_kind], self.targets[object_kind]) for object_kind in OBJECT_KINDS)
+        elapsed = time.time() - self._start_time
+        rate = (sum(self.created.values()) - self._created_at_start) / elapsed if elapsed else 0
+        log.info("{}: {}/{} created; all objects {}/{} ({:.0f}%) at {:.0f}/s, ETA {}".format(
+            kind, self.created[kind], self.targets[kind], done, total, 100 * done / total if total else 100, rate,
+            format_duration((total - done) / rate if rate else None)))
@@ -0,0 +1,201 @@
+import asyncio
+import math
+import random
+from collections import Counter
+
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+
+log = log_helper.get_logger()
+
+ARRIVAL_CONSTANT = "constant"
+ARRIVAL_POISSON = "poisson"
+
+
+class RateSchedule:
+    """
+    Target rate (transactions per second) over time: a constant rate, or a ramp linearly interpolated between
+    (seconds, tps) points and held at the last point. The rate may be 0 for a while (example: a ramp starting from
+    0) but not at the last point, which would stop the load for good.
+    """
+    def __init__(self, points):
+        """
+        @param points: list of (elapsed seconds, tps), sorted by time
+        """
+        if not points:
+            raise ValueError("Rate schedule needs at least one point")
+        self.points = sorted((float(elapsed), float(tps)) for elapsed, tps in points)
+        if any(tps < 0 for _, tps in self.points):
+            raise ValueError("Rate schedule rates cannot be negative")
+        if self.points[-1][1] <= 0:
+            raise ValueError("Rate schedule must end with a positive rate")
+
+    @classmethod
+    def parse(cls, tps=None, ramp=None):
+        """
+        @param tps: constant target rate
+        @param ramp: "seconds:tps,seconds:tps,..." (example: "0:10,60:100" ramps from 10 to 100 TPS in a minute)
+        """
+        if ramp:
+            return cls([point.split(":") for point in ramp.split(",")])
+        if tps is None:
+            raise ValueError("Rate schedule needs a rate or a ramp")
+        return cls([(0, tps)])
+
+    def rate_at(self, elapsed):
+        previous_time, previous_tps = self.points[0]
+        if elapsed <= previous_time:
+            return previous_tps
+        for point_time, point_tps in self.points[1:]:
+            if elapsed < point_time:
+                return previous_tps + (point_tps - previous_tps) * (elapsed - previous_time) / \
+                    (point_time - previous_time)
+            previous_time, previous_tps = point_time, point_tps
+        return previous_tps
+
+    def time_after(self, start, count):
+        """
+        Time at which count sends are due after start: the rate integrated from start reaches count
+        """
+        segments = [(start, self.points[0][1], self.points[0][0], self.points[0][1])]
+        segments += [(previous[0], previous[1], point[0], point[1])
+                     for previous, point in zip(self.points, self.points[1:])]
+        segments.append((self.points[-1][0], self.points[-1][1], math.inf, self.points[-1][1]))
+        for start_time, start_tps, end_time, end_tps in segments:
+            if end_time <= start:
+                continue
+            if start_time < start:
+                start_time, start_tps = start, self.rate_at(start)
+            if end_time == math.inf:
+                return start_time + count / start_tps
+            slope = (end_tps - start_tps) / (end_time - start_time)
+            sends = (start_tps + end_tps) / 2 * (end_time - start_time)
+            if sends < count:
+                count -= sends
+                continue
+            if slope == 0:
+                return start_time + count / start_tps
+            # count = start_tps * t + slope * t^2 / 2
+            return start_time + (math.sqrt(max(start_tps ** 2 + 2 * slope * count, 0)) - start_tps) / slope
+        return math.inf
+
+
+class OpenLoopGenerator:
+    """
+    Open-loop load generator.
+
+    Send times are drawn from the arrival process up front and never wait for responses: each transaction is
+    started as its own task at its scheduled time, and sends that fell behind (event loop busy) are started at once
+    rather than shifted, so response latency never lowers the offered rate. Sends are skipped, and counted, only
+    when max_in_flight transactions are already outstanding.
+    """
+    def __init__(self, send, schedule, arrival=ARRIVAL_CONSTANT, max_in_flight=10000, rng=None):
+        """
+        @param send: coroutine function sending one transaction and returning its result dict
+        @param schedule: RateSchedule (or any schedule with rate_at() and time_after())
+        @param arrival: "constant" (evenly spaced sends) or "poisson" (exponential gaps)
+        """
+        if arrival not in (ARRIVAL_CONSTANT, ARRIVAL_POISSON):
+            raise ValueError("Unknown arrival process: {}".format(arrival))
+        self.send = send
+        self.schedule = schedule
+        self.arrival = arrival
+        self.max_in_flight = max_in_flight
+        self.rng = rng or random.SystemRandom()
+        self.scheduled = 0
+        self.sent = 0
+        self.skipped = 0
+        self.completed = 0
+        self.failed = 0
+        self.results = Counter()
+        self._tasks = set()
+        self._start_time = None
+
+    def next_send_time(self, send_time, duration=None):
+        """
+        Scheduled time (seconds since start) of the send following the one at send_time: one send (an exponential
+        draw of sends for poisson arrivals) later along the schedule, so ramps from or through 0 are followed exactly
+        return: math.inf if no send is due before duration
+        """
+        count = self.rng.expovariate(1) if self.arrival == ARRIVAL_POISSON else 1
+        next_time = self.schedule.time_after(send_time, count)
+        if duration is not None and next_time >= duration:
+            return math.inf
+        return next_time
+
+    def elapsed(self):
+        return asyncio.get_running_loop().time() - self._start_time if self._start_time is not None else 0
+
+    async def run(self, duration=None):
+        """
+        Generate load for duration seconds (forever if None), then wait for outstanding sends
+        """
+        loop = asyncio.get_running_loop()
+        self._start_time = loop.time()
+        end_time = math.inf if duration is None else duration
+        if self.arrival == ARRIVAL_POISSON or self.schedule.rate_at(0) <= 0:
+            send_time = self.next_send_time(0, duration)
+        else:
+            send_time = 0
+        try:
+            while send_time < end_time:
+                delay = self._start_time + send_time - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.scheduled += 1
+                if len(self._tasks) >= self.max_in_flight:
+                    self.skipped += 1
+                else:
+                    task = asyncio.create_task(self._send_one())
+                    self._tasks.add(task)
+                    task.add_done_callback(self._tasks.discard)
+                send_time = self.next_send_time(send_time, duration)
+        finally:
+            if self._tasks:
+                await asyncio.wait(set(self._tasks))
+
+    async def _send_one(self):
+        self.sent += 1
+        try:
+            result = await self.send()
+            self.results[(result or {}).get("engine_result", (result or {}).get("error", "no result"))] += 1
+            self.completed += 1
+        except Exception as e:
+            self.failed += 1
+            self.results[type(e).__name__] += 1
+            log.debug("Send failed: {}".format(e))
+
+    def snapshot(self):
+        return {
+            "time": self.elapsed(),
+            "scheduled": self.scheduled,
+            "sent": self.sent,
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "in_flight": len(self._tasks),
+            "results": Counter(self.results),
+        }
+
+    async def report_per_ledger(self, wait_for_ledger):
+        """
+        Log achieved vs target rate for every closed ledger until cancelled
+        @param wait_for_ledger: coroutine function waiting for the next ledger close and returning its index
+        """
+        previous = self.snapshot()
+        while True:
+            ledger_index = await wait_for_ledger()
+            current = self.snapshot()
+            interval = current["time"] - previous["time"]
+            if interval <= 0:
+                continue
+            target_rate = (self.schedule.rate_at(previous["time"]) + self.schedule.rate_at(current["time"])) / 2
+            results = current["results"] - previous["results"]
+            log.info("Ledger {} ({:.1f} s): target {:.1f} TPS, sent {} ({:.1f} TPS), completed {} ({:.1f} TPS), "
+                     "in flight {}, skipped {}, failed {}, results {}".format(
+                        ledger_index, interval, target_rate,
+                        current["sent"] - previous["sent"], (current["sent"] - previous["sent"]) / interval,
+                        current["completed"] - previous["completed"],
+                        (current["completed"] - previous["completed"]) / interval,
+                        current["in_flight"], current["skipped"] - previous["skipped"],
+                        current["failed"] - previous["failed"], dict(results.most_common())))
+            previous = current
@@ -0,0 +1,100 @@
+import asyncio
+from collections import Counter
+
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.utils.traffic import TRANSACTION_METHODS, read_recording
+
+log = log_helper.get_logger()
+
+
+class TrafficReplayer:
+    """
+    Resubmits the transactions of a TrafficRecorder recording on their original schedule, scaled by speed.
+
+    Recorded requests carry their signed blob or secret and Sequence, so against a fresh network started from the
+    same genesis ledger the same transactions apply in the same order. Sends are scheduled on absolute times and
+    fired as tasks without waiting for earlier responses, so bursts go out at their recorded rate; only requests
+    of the same account wait for each other, keeping its sequences in order. Each replayed result is compared with
+    the recorded one.
+    """
+    def __init__(self, rippled, requests, speed=1.0, methods=TRANSACTION_METHODS):
+        """
+        @param rippled: AsyncRippledServer
+        @param requests: recorded requests (read_recording())
+        @param speed: replay speed relative to the recording (2: twice as fast); 0 sends as fast as possible
+        @param methods: recorded methods to replay (transaction submissions by default; reads are skipped)
+        """
+        self.rippled = rippled
+        self.requests = [request for request in requests if request.get("method") in methods]
+        self.speed = float(speed)
+        self.results = Counter()  # (recorded result, replayed result) -> count
+        self.sent = 0
+        self.max_lag = 0.0
+        self._account_tasks = {}
+
+    @classmethod
+    def from_file(cls, rippled, path, **kwargs):
+        header, requests = read_recording(path)
+        log.info("Replaying {} from {} ({} requests recorded, {})".format(
+            path, header.get("start"), len(requests),
+            ", ".join("{} {}".format(key, value) for key, value in header.items()
+                      if key not in ("version", "start")) or "no metadata"))
+        return cls(rippled, requests, **kwargs)
+
+    def due_time(self, request):
+        return request["t"] / self.speed if self.speed else 0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        progress_time = start_time + constants.REPLAY_PROGRESS_INTERVAL
+        tasks = []
+        for request in self.requests:
+            send_time = start_time + self.due_time(request)
+            delay = send_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.max_lag = max(self.max_lag, loop.time() - send_time)
+            account_id = self.get_account(request)
+            task = asyncio.create_task(self._replay(request, self._account_tasks.get(account_id)))
+            if account_id:
+                self._account_tasks[account_id] = task
+            tasks.append(task)
+            if loop.time() >= progress_time:
+                progress_time += constants.REPLAY_PROGRESS_INTERVAL
+                log.info("Replayed {} of {} requests, {:.1f} s in, lagging up to {:.3f} s".format(
+                    len(tasks), len(self.requests), loop.time() - start_time, self.max_lag))
+        await asyncio.gather(*tasks, return_exceptions=True)
+        log.info("Replayed {} requests in {:.1f} s (recorded over {:.1f} s), lagging up to {:.3f} s; {}".format(
+            self.sent, loop.time() - start_time, self.requests[-1]["t"] if self.requests else 0, self.max_lag,
+            self.summary()))
+
+    def get_account(self, request):
+        request_account = self.rippled.get_request_account({"method": request["method"],
+                                                            "params": request["params"]})
+        return request_account or request.get("result", {}).get("Account")
+
+    async def _replay(self, request, previous=None):
+        if previous is not None:
+            await asyncio.wait([previous])
+        wire_request = {"method": request["method"], "params": request["params"]}
+        recorded_result = request.get("result", {})
+        recorded = recorded_result.get("engine_result", recorded_result.get("error"))
+        try:
+            if self.rippled.signer:
+                wire_request, _ = await self.rippled.signer.sign_request(wire_request, self.rippled.send_request)
+            response = await self.rippled.send_request(wire_request)
+            result = (response or {}).get("result", {})
+            replayed = result.get("engine_result", result.get("error", "no result"))
+        except Exception as e:
+            replayed = type(e).__name__
+        self.sent += 1
+        self.results[(recorded, replayed)] += 1
+
+    def summary(self):
+        matched = sum(count for (recorded, replayed), count in self.results.items() if recorded == replayed)
+        mismatched = {"{} -> {}".format(recorded, replayed): count
+                      for (recorded, replayed), count in self.results.most_common() if recorded != replayed}
+        return "{} of {} results as recorded{}".format(matched, sum(self.results.values()),
+                                                        ", differing: {}".format(mismatched) if mismatched else "")
@@ -0,0 +1,91 @@
+import json
+import os
+import time
+
+from rippled_automation.rippled_end_to_end_scenarios.src.commands.account import Account
+from rippled_automation.rippled_end_to_end_scenarios.utils import keypairs
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+
+log = log_helper.get_logger()
+
+STATE_VERSION = 1
+
+
+class WorkloadState:
+    """
+    Accounts the workload owns, with the trust lines and NFTs each holds, persisted across restarts.
+
+    Only effects of validated transactions are recorded, so the state matches the ledger up to transactions still
+    in flight when the process stopped. The checkpoint file is replaced atomically.
+    """
+    def __init__(self, path=None):
+        self.path = path
+        self.accounts = {}  # account_id -> Account
+        self.trust_lines = {}  # account_id -> set of (currency, issuer)
+        self.nfts = {}  # account_id -> set of NFTokenIDs
+        self.issuers = {}  # account_id -> currency it issues
+        self.rounds = 0
+
+    def load(self, rippled=None):
+        """
+        Restore the last checkpoint
+        return: True if a checkpoint was loaded
+        """
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with open(self.path) as state_file:
+            state = json.load(state_file)
+        if state.get("version") != STATE_VERSION:
+            log.warning("Ignoring workload state {} (version {})".format(self.path, state.get("version")))
+            return False
+
+        for account_id, account_state in state["accounts"].items():
+            self.add_account(Account(keypairs.wallet_from_seed(account_state["seed"]), rippled=rippled))
+            self.trust_lines[account_id] = {tuple(line) for line in account_state.get("trust_lines", [])}
+            self.nfts[account_id] = set(account_state.get("nfts", []))
+        self.issuers = dict(state.get("issuers", {}))
+        self.rounds = state.get("rounds", 0)
+        log.info("Loaded workload state: {}".format(self.summary()))
+        return True
+
+    def save(self):
+        if not self.path:
+            return
+        state = {
+            "version": STATE_VERSION,
+            "saved": int(time.time()),
+            "rounds": self.rounds,
+            "issuers": self.issuers,
+            "accounts": {
+                account_id: {
+                    "seed": account.master_seed,
+                    "trust_lines": sorted(self.trust_lines[account_id]),
+                    "nfts": sorted(self.nfts[account_id])
+                } for account_id, account in self.accounts.items()
+            }
+        }
+        temp_path = "{}.tmp".format(self.path)
+        with open(temp_path, "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(temp_path, self.path)
+
+    def add_account(self, account):
+        self.accounts[account.account_id] = account
+        self.trust_lines.setdefault(account.account_id, set())
+        self.nfts.setdefault(account.account_id, set())
+
+    def remove_account(self, account_id):
+        self.accounts.pop(account_id, None)
+        self.trust_lines.pop(account_id, None)
+        self.nfts.pop(account_id, None)
+        self.issuers.pop(account_id, None)
+        for lines in self.trust_lines.values():
+            lines.difference_update({line for line in lines if line[1] == account_id})
+
+    def holders(self, currency, issuer):
+        return [account_id for account_id, lines in self.trust_lines.items() if (currency, issuer) in lines]
+
+    def summary(self):
+        return "{} accounts, {} issuers, {} trust lines, {} NFTs after {} rounds".format(
+            len(self.accounts), len(self.issuers), sum(len(lines) for lines in self.trust_lines.values()),
+            sum(len(nfts) for nfts in self.nfts.values()), self.rounds)
@@ -0,0 +1,381 @@
+import asyncio
+import copy
+import json
+import os
+import random
+from collections import Counter
+
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests.price_oracle.price_oracle_test_data import \
+    DEFAULT_BASE_ASSET, DEFAULT_QUOTE_ASSET, DEFAULT_SCALE
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests.rippled import RippledServer
+from rippled_automation.rippled_end_to_end_scenarios.utils import log_helper
+from rippled_automation.rippled_end_to_end_scenarios.workload.distribution import IOUDistributor
+
+log = log_helper.get_logger()
+
+DEFAULT_PROFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles", "default_mix.json")
+TRANSACTION_KINDS = {}
+IOU_KINDS = ("IOUPayment", "OfferCreate", "AMMDeposit", "AMMWithdraw", "AMMVote")
+AMM_KINDS = ("AMMDeposit", "AMMWithdraw", "AMMVote")
+
+
+class PayloadRecorder(RippledServer):
+    """
+    RippledServer that records the payloads of its transaction methods instead of submitting them, so the workload
+    builds transactions exactly like the test suites do (RippledServer and AMM_mixin methods).
+    Account sequences are left out and allocated at submission.
+    """
+    def __init__(self):
+        self.name = constants.RIPPLED_SERVER_NAME
+        self.payloads = []
+
+    def record(self, method_name, *args, **kwargs):
+        """
+        Run a builder method
+        return: list of the payloads it would have submitted
+        """
+        self.payloads = []
+        getattr(self, method_name)(*args, **kwargs)
+        return self.payloads
+
+    def execute_transaction(self, payload=None, method=None, secret=None, **kwargs):
+        payload = copy.deepcopy(payload)
+        if secret and "secret" not in payload:
+            payload["secret"] = secret
+        if payload["tx_json"].get("Sequence") is None:
+            payload["tx_json"].pop("Sequence", None)
+        self.payloads.append(payload)
+        return {}
+
+    def get_account_sequence(self, account_object_or_id, verbose=False):
+        return None
+
+
+def transaction_kind(name, needs=()):
+    """
+    Register a workload transaction builder
+    @param needs: profile keys the kind needs
+    """
+    def register(builder):
+        TRANSACTION_KINDS[name] = (builder, needs)
+        return builder
+    return register
+
+
+def sample(spec, rng):
+    """
+    Draw a parameter value: a constant, {"uniform": [low, high]} (integers), {"exponential": mean} or
+    {"choice": [values]} with optional "weights"
+    """
+    if not isinstance(spec, dict):
+        return spec
+    if "uniform" in spec:
+        low, high = spec["uniform"]
+        return rng.randint(int(low), int(high))
+    if "exponential" in spec:
+        return max(int(rng.expovariate(1 / float(spec["exponential"]))), 1)
+    if "choice" in spec:
+        return rng.choices(spec["choice"], weights=spec.get("weights"))[0]
+    raise ValueError("Unknown parameter distribution: {}".format(spec))
+
+
+def load_profile(path=DEFAULT_PROFILE):
+    """
+    Load a workload profile (JSON, or YAML when PyYAML is installed)
+    """
+    with open(path) as profile_file:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise Exception("PyYAML is required for YAML profiles ({}); use JSON instead".format(path))
+            profile = yaml.safe_load(profile_file)
+        else:
+            profile = json.load(profile_file)
+
+    transactions = profile.get("transactions")
+    if not transactions:
+        raise Exception("Workload profile {} has no transactions".format(path))
+    for kind, params in transactions.items():
+        if kind not in TRANSACTION_KINDS:
+            raise Exception("Unknown transaction kind in {}: {} (known: {})".format(path, kind,
+                                                                                   ", ".join(TRANSACTION_KINDS)))
+        missing = [key for key in TRANSACTION_KINDS[kind][1] if key not in profile]
+        if missing:
+            raise Exception("{} in {} needs profile keys: {}".format(kind, path, ", ".join(missing)))
+        if float(params.get("weight", 0)) <= 0:
+            raise Exception("{} in {} needs a positive weight".format(kind, path))
+    return profile
+
+
+class TransactionMix:
+    """
+    Weighted transaction mix described by a workload profile.
+
+    Each send() draws a transaction kind by weight, draws its parameters from the profile's distributions, builds
+    the payload and submits it without waiting for validation. Profile format (JSON):
+
+        {
+            "accounts": 50,
+            "currencies": ["USD"],
+            "transactions": {
+                "Payment": {"weight": 50, "amount": {"uniform": [1000, 1000000]}},
+                "OfferCreate": {"weight": 10, "xrp": {"exponential": 100000}, "value": {"uniform": [1, 100]}}
+            }
+        }
+    """
+    def __init__(self, rippled, profile, rng=None, retry_busy=True):
+        """
+        @param rippled: AsyncRippledServer
+        @param profile: profile dict (see load_profile)
+        @param retry_busy: False to count sends refused by a full queue instead of retrying them
+        """
+        self.rippled = rippled
+        self.profile = profile
+        self.rng = rng or random.SystemRandom()
+        self.retry_busy = retry_busy
+        self.recorder = PayloadRecorder()
+        self.kinds = list(profile["transactions"])
+        self.weights = [float(profile["transactions"][kind]["weight"]) for kind in self.kinds]
+        self.currencies = profile.get("currencies", ["USD"])
+        self.accounts = []
+        self.issuer = None
+        self.results = Counter()
+
+    def needs(self, kinds):
+        return any(kind in self.kinds for kind in kinds)
+
+    async def setup(self):
+        """
+        Fund the accounts and create the trust lines, balances and AMM the profile's transactions need
+        """
+        number_of_accounts = max(int(self.profile.get("accounts", 50)), 2)
+        balance = str(self.profile.get("account_balance", constants.WORKLOAD_ACCOUNT_BALANCE))
+        accounts = [await self.rippled.create_account(verbose=False) for _ in range(number_of_accounts)]
+        responses = await asyncio.gather(*[self.rippled.fund_account(account.account_id, balance,
+                                                                     wait_for_ledger_close=False, verbose=False)
+                                           for account in accounts])
+        validated = await asyncio.gather(*[self.rippled.is_transaction_validated(response, verbose=False)
+                                           for response in responses])
+        self.accounts = [account for account, is_validated in zip(accounts, validated) if is_validated]
+        if len(self.accounts) < 2:
+            raise Exception("Not enough funded accounts for the workload")
+        log.info("Workload: funded {} of {} accounts".format(len(self.accounts), number_of_accounts))
+
+        self.issuer = self.accounts[0]
+        if self.needs(IOU_KINDS):
+            await self.submit_all(self.recorder.record("set_default_ripple", self.issuer, verbose=False))
+            await asyncio.gather(*[IOUDistributor(self.rippled, self.issuer, currency).distribute(
+                self.holders(), constants.WORKLOAD_IOU_BALANCE) for currency in self.currencies])
+            log.info("Workload: distributed {} to {} holders".format(", ".join(self.currencies), len(self.holders())))
+
+        if self.needs(AMM_KINDS):
+            await self.submit_all(self.recorder.record(
+                "amm_create", self.issuer, constants.DEFAULT_AMM_XRP_CREATE,
+                dict(self.token(), value=constants.DEFAULT_AMM_TOKEN_CREATE), verbose=False))
+            log.info("Workload: created XRP/{} AMM".format(self.currencies[0]))
+
+    async def submit_all(self, payloads):
+        """
+        Submit payloads together and wait until they are validated
+        """
+        responses = await asyncio.gather(*[self.submit(payload) for payload in payloads])
+        await asyncio.gather(*[self.rippled.is_transaction_validated(response, verbose=False)
+                               for response in responses if "tx_json" in response])
+
+    async def submit(self, payload, retry_busy=True):
+        return await self.rippled.execute_transaction(payload=payload, wait_for_ledger_close=False, verbose=False,
+                                                      retry_busy=retry_busy)
+
+    async def send(self):
+        """
+        Submit one transaction drawn from the mix
+        return: submit result
+        """
+        kind = self.rng.choices(self.kinds, weights=self.weights)[0]
+        builder = TRANSACTION_KINDS[kind][0]
+        params = {key: sample(spec, self.rng) for key, spec in self.profile["transactions"][kind].items()
+                  if key != "weight"}
+        result = {}
+        for payload in builder(self, **params):
+            result = await self.submit(payload, retry_busy=self.retry_busy)
+            self.results[(kind, result.get("engine_result", result.get("error")))] += 1
+        return result
+
+    def holders(self):
+        return self.accounts[1:]
+
+    def pick(self, count=1):
+        return self.rng.sample(self.accounts, count)
+
+    def token(self, currency=None):
+        return {"currency": currency or self.rng.choice(self.currencies), "issuer": self.issuer.account_id}
+
+    def summary(self):
+        return {"{} {}".format(kind, result): count for (kind, result), count in sorted(self.results.items())}
+
+
+@transaction_kind("Payment")
+def build_payment(mix, amount=constants.DEFAULT_TRANSFER_AMOUNT):
+    source, destination = mix.pick(2)
+    return mix.recorder.record("make_payment", source, destination, str(amount), verbose=False)
+
+
+@transaction_kind("IOUPayment")
+def build_iou_payment(mix, value=1):
+    source, destination = mix.rng.sample(mix.holders(), 2) if len(mix.holders()) > 1 else (mix.issuer,
+                                                                                              mix.holders()[0])
+    return mix.recorder.record("make_payment", source, destination, dict(mix.token(), value=str(value)),
+                               verbose=False)
+
+
+@transaction_kind("TrustSet")
+def build_trust_set(mix, limit=int(1e9), currency=None):
+    account, issuer = mix.pick(2)
+    token = {"currency": currency or mix.rng.choice(mix.currencies), "issuer": issuer.account_id}
+    return mix.recorder.record("create_trustline", account, token, limit=str(limit), verbose=False)
+
+
+@transaction_kind("OfferCreate")
+def build_offer_create(mix, xrp=constants.DEFAULT_TRANSFER_AMOUNT, value=1):
+    account = mix.rng.choice(mix.holders())
+    taker_gets, taker_pays = str(xrp), dict(mix.token(), value=str(value))
+    if mix.rng.random() < 0.5:
+        taker_gets, taker_pays = taker_pays, taker_gets
+    return [{
+        "tx_json": {
+            "TransactionType": "OfferCreate",
+            "Account": account.account_id,
+            "TakerGets": taker_gets,
+            "TakerPays": taker_pays
+        },
+        "secret": account.master_seed
+    }]
+
+
+@transaction_kind("EscrowCreate")
+def build_escrow_create(mix, amount=constants.DEFAULT_TRANSFER_AMOUNT,
+                        finish_after=constants.DEFAULT_ESCROW_FINISH_AFTER,
+                        cancel_after=constants.DEFAULT_ESCROW_CANCEL_AFTER):
+    account, destination = mix.pick(2)
+    return [{
+        "tx_json": {
+            "TransactionType": "EscrowCreate",
+            "Account": account.account_id,
+            "Destination": destination.account_id,
+            "Amount": str(amount),
+            "FinishAfter": mix.recorder.get_rippled_epoch_time(int(finish_after)),
+            "CancelAfter": mix.recorder.get_rippled_epoch_time(int(cancel_after))
+        },
+        "secret": account.master_seed
+    }]
+
+
+@transaction_kind("PaymentChannelCreate")
+def build_payment_channel_create(mix, amount=constants.DEFAULT_TRANSFER_AMOUNT,
+                                 settle_delay=constants.DEFAULT_PAYCHAN_SETTLE_DELAY):
+    account, destination = mix.pick(2)
+    return [{
+        "tx_json": {
+            "TransactionType": "PaymentChannelCreate",
+            "Account": account.account_id,
+            "Destination": destination.account_id,
+            "Amount": str(amount),
+            "SettleDelay": int(settle_delay),
+            "PublicKey": account.public_key_hex
+        },
+        "secret": account.master_seed
+    }]
+
+
+@transaction_kind("CheckCreate")
+def build_check_create(mix, send_max=constants.DEFAULT_CHECK_MAX_SEND):
+    account, destination = mix.pick(2)
+    return [{
+        "tx_json": {
+            "TransactionType": "CheckCreate",
+            "Account": account.account_id,
+            "Destination": destination.account_id,
+            "SendMax": str(send_max)
+        },
+        "secret": account.master_seed
+    }]
+
+
+@transaction_kind("NFTokenMint")
+def build_nftoken_mint(mix, taxon=0, flags=0):
+    account, = mix.pick()
+    return [{
+        "tx_json": {
+            "TransactionType": "NFTokenMint",
+            "Account": account.account_id,
+            "NFTokenTaxon": int(taxon),
+            "Flags": int(flags)
+        },
+        "secret": account.master_seed
+    }]
+
+
+@transaction_kind("OracleSet")
+def build_oracle_set(mix, document_id=1, price=1000):
+    account, = mix.pick()
+    price_data = {
+        "PriceData": {
+            "AssetPrice": int(price),
+            "BaseAsset": DEFAULT_BASE_ASSET,
+            "QuoteAsset": DEFAULT_QUOTE_ASSET,
+            "Scale": DEFAULT_SCALE
+        }
+    }
+    return mix.recorder.record("oracle_set", account, oracle_document_id=int(document_id),
+                               price_data_series=[price_data], verbose=False)
+
+
+@transaction_kind("DIDSet")
+def build_did_set(mix, data_length=32):
+    account, = mix.pick()
+    return [{
+        "tx_json": {
+            "TransactionType": "DIDSet",
+            "Account": account.account_id,
+            "Data": mix.rng.randbytes(int(data_length)).hex().upper()
+        },
+        "secret": account.master_seed
+    }]
+
+
+@transaction_kind("AMMDeposit")
+def build_amm_deposit(mix, amount=constants.DEFAULT_AMM_XRP_DEPOSIT):
+    account = mix.rng.choice(mix.holders())
+    return mix.recorder.record("amm_deposit", account, "XRP", mix.token(mix.currencies[0]), amount=str(amount),
+                               verbose=False)
+
+
+@transaction_kind("AMMWithdraw")
+def build_amm_withdraw(mix, amount=constants.DEFAULT_AMM_XRP_WITHDRAWAL):
+    account = mix.rng.choice(mix.holders())
+    return mix.recorder.record("amm_withdraw", account, "XRP", mix.token(mix.currencies[0]), amount=str(amount))
+
+
+@transaction_kind("AMMVote")
+def build_amm_vote(mix, trading_fee=constants.DEFAULT_AMM_TRADING_FEE):
+    account = mix.rng.choice(mix.holders())
+    return mix.recorder.record("amm_vote", account, constants.XRP_ASSET, mix.token(mix.currencies[0]),
+                               trading_fee=int(trading_fee))
+
+
+@transaction_kind("XChainCommit", needs=("xchain_bridge",))
+def build_xchain_commit(mix, amount=constants.DEFAULT_TRANSFER_AMOUNT, claim_id=1):
+    account, destination = mix.pick(2)
+    return [{
+        "tx_json": {
+            "TransactionType": "XChainCommit",
+            "Account": account.account_id,
+            "XChainBridge": mix.profile["xchain_bridge"],
+            "XChainClaimID": int(claim_id),
+            "OtherChainDestination": destination.account_id,
+            "Amount": str(amount)
+        },
+        "secret": account.master_seed
+    }]
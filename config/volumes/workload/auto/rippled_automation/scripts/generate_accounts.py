@@ -1,29 +1,33 @@
 import requests
 import json
+import os
+import sys
 import time
+path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+sys.path.append(path)
+from rippled_automation.rippled_end_to_end_scenarios.utils import keypairs
+
 url = "http://localhost:51234/"
 account_json = {}
 list_of_accounts = []
 
 
 def generate_accounts(number_of_accounts = 10):
-    for i in range(number_of_accounts):
-        payload = "{\n    \"method\": \"wallet_propose\",\n    \"params\": [\n        {}\n    ]\n}"
-        time.sleep(1)
-        account_info = requests.request("POST", url, data=payload)
+    wallets = keypairs.generate_wallets(number_of_accounts)
+    for i, wallet in enumerate(wallets):
         payload = "{\n   \"method\":\"submit\",\n" \
                   "   \"params\":[\n{\n\"tx_json\":{\n\"Flags\": \"2147483648\"," \
                   "\n\"Account\":\"rh1HPuRVsYYvThxG2Bs1MfjmrVC73S16Fb\",\n\"Fee\":\"10\",\n\"Amount\":\"100000000000\"," \
                 "\n\"Destination\":\"<text>\",\n\"TransactionType\":\"Payment\"\n}," \
                 "\n\"secret\":\"snRzwEoNTReyuvz6Fb1CDXcaJUQdp\"\n}\n]\n}"
-        print(account_info.json()['result']['account_id'])
-        payload = payload.replace("<text>", account_info.json()['result']['account_id'])
+        print(wallet['account_id'])
+        payload = payload.replace("<text>", wallet['account_id'])
         response = requests.request("POST", url, data=payload)
         print (str(response))
         if response.status_code == 200:
             # if funding was successful then add this to the json array
             print(i)
-            list_of_accounts.append(account_info.json().get('result'))
+            list_of_accounts.append(wallet)
         else:
             print("Issues with funding these are the accounts created so far")
             outfile = open('accounts' + str(time.time()) + ' .json', 'w')
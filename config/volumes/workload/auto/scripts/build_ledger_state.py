@@ -0,0 +1,79 @@
+################################################################################
+# This script fills a rippled network with a target number of ledger objects
+# (accounts, trust lines, offers, NFTs, escrows and oracles) to run read RPC
+# tests and benchmarks (ledger_data, account_objects, book_offers, ...) against
+# large ledgers. Progress is checkpointed to --state; run the same command again
+# to resume an interrupted build.
+#
+# Usage:
+#   python3 scripts/build_ledger_state.py [optional parameters]
+#       [--rippledServer <rippled host:port (default: localhost:5005)>]
+#       [--wsPort <websocket port for ledger/transaction streams (default: 6005)>]
+#       [--accounts N] [--trustLines N] [--offers N] [--books XRP/USD,USD/EUR]
+#       [--nftPages N] [--escrows N] [--oracles N]
+#       [--state <checkpoint file (default: ledger_state.json)>]
+#       [--batchSize N] [--parallel N]
+#
+# Example (10^5 scale):
+#   python3 scripts/build_ledger_state.py --accounts 10000 --trustLines 100000 \
+#       --offers 100000 --books XRP/USD,USD/EUR --nftPages 1000 --escrows 10000 --oracles 10000
+################################################################################
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests.async_rippled import AsyncRippledServer
+from rippled_automation.rippled_end_to_end_scenarios.workload.ledger_builder import LedgerStateBuilder
+
+logging.basicConfig(level=logging.INFO,
+                    format='\r%(asctime)s (%(filename)20s:%(lineno)-4s) %(levelname)-8s %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Fill a rippled network with ledger objects")
+    parser.add_argument("--rippledServer", default="localhost:5005", help="rippled host:port")
+    parser.add_argument("--wsPort", type=int, default=constants.WS_STREAM_PORT,
+                        help="Websocket port for ledger and transaction streams (0 to poll)")
+    parser.add_argument("--accounts", type=int, default=1000, help="Accounts (the first one issues all tokens)")
+    parser.add_argument("--trustLines", type=int, default=0, help="Trust lines to the issuer")
+    parser.add_argument("--offers", type=int, default=0, help="Offers, spread over --books")
+    parser.add_argument("--books", default="XRP/USD", help="Comma-separated order books BASE/QUOTE to fill")
+    parser.add_argument("--nftPages", type=int, default=0,
+                        help="NFTokenPages at least (NFTs are minted {} per page)".format(
+                            constants.MAX_NFTOKEN_PAGE_OBJECTS_LIMIT))
+    parser.add_argument("--escrows", type=int, default=0, help="Escrows")
+    parser.add_argument("--oracles", type=int, default=0, help="Price oracles")
+    parser.add_argument("--state", default="ledger_state.json", help="Checkpoint file to resume from")
+    parser.add_argument("--batchSize", type=int, default=constants.BUILDER_BATCH_SIZE,
+                        help="Objects submitted per batch")
+    parser.add_argument("--parallel", type=int, default=constants.BUILDER_PARALLEL_SUBMITS,
+                        help="Submissions in flight at once")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    host = args.rippledServer.rsplit(":", 1)[0]
+    ws_address = "{}:{}".format(host, args.wsPort) if args.wsPort else None
+    rippled = AsyncRippledServer(args.rippledServer, ws_address=ws_address, funding_tickets=True)
+    targets = {
+        "accounts": args.accounts,
+        "trust_lines": args.trustLines,
+        "offers": args.offers,
+        "nfts": args.nftPages * constants.MAX_NFTOKEN_PAGE_OBJECTS_LIMIT,
+        "escrows": args.escrows,
+        "oracles": args.oracles,
+    }
+    builder = LedgerStateBuilder(rippled, targets, path=args.state, books=args.books.split(","),
+                                 batch_size=args.batchSize, parallel=args.parallel)
+    asyncio.run(builder.build())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,19 @@
 import argparse
+import asyncio
+import atexit
+import bisect
+import copy
 import distro
 import logging
 import os
+import threading
 import time
 import requests
 import socket
 import sys
-from prometheus_client.core import GaugeMetricFamily, REGISTRY
-from prometheus_client import start_http_server
+from prometheus_client.core import (CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily, REGISTRY,
+                                    SummaryMetricFamily)
+from prometheus_client import CollectorRegistry, generate_latest, start_http_server
 
 path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
 sys.path.append(path)
@@ -18,6 +24,137 @@ log = log_helper.get_logger()
 logging.info("")
 
 
+class PushGatewayPublisher(object):
+    """
+    Buffers metrics and pushes them to a push gateway from a background thread.
+
+    Every PUSH_INTERVAL seconds all buffered metrics are pushed as one exposition document (PUT, replacing the
+    previous one) to the job/instance group, with their labels as sample labels. The instance is suffixed with the
+    host name and process id, so processes pushing at the same time do not replace each other's metrics. A metric is dropped METRIC_TTL
+    seconds after its last update and the group is deleted once no metric is left, so publish() never blocks on the
+    gateway. Collectors added with add_collector() (counters, histograms, summaries aggregated in-process) are pushed
+    along with them until the publisher is closed. One publisher is kept per gateway (get()).
+    """
+    PUSH_INTERVAL = 5  # seconds between pushes
+    METRIC_TTL = 20  # seconds a metric stays on the gateway after its last update
+
+    _publishers = {}
+    _lock = threading.Lock()
+
+    def __init__(self, push_gateway_server, job_name, instance_name):
+        self.url = '{}/metrics/job/{}/instance/{}-{}-{}'.format(push_gateway_server, job_name, instance_name,
+                                                                socket.gethostname(), os.getpid())
+        self.session = requests.Session()
+        self.metrics = {}  # (key, labels) -> (value, expiry)
+        self.registry = CollectorRegistry(auto_describe=False)
+        self.collectors = []
+        self.pushed = False
+        self._metrics_lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="push_gateway_publisher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def get(cls, push_gateway_server, job_name, instance_name):
+        with cls._lock:
+            publisher = cls._publishers.get(push_gateway_server)
+            if publisher is None or publisher._stop_event.is_set():
+                publisher = cls._publishers[push_gateway_server] = cls(push_gateway_server, job_name,
+                                                                       instance_name)
+        return publisher
+
+    def publish(self, key, value, labels=None):
+        """
+        Buffer a metric for the next push
+        @param labels: dict of label key/value
+        """
+        labels = tuple(sorted((labels or {}).items()))
+        with self._metrics_lock:
+            self.metrics[(key, labels)] = (value, time.monotonic() + PushGatewayPublisher.METRIC_TTL)
+        self._wake_event.set()
+
+    def add_collector(self, collector):
+        """
+        Push the metrics of a prometheus collector (an object with collect()) with every push
+        """
+        with self._metrics_lock:
+            if collector in self.collectors:
+                return
+            self.collectors.append(collector)
+        self.registry.register(collector)
+        self._wake_event.set()
+
+    def exposition(self):
+        """
+        Live metrics as one exposition document; expired metrics are dropped
+        """
+        now = time.monotonic()
+        with self._metrics_lock:
+            self.metrics = {metric: (value, expiry) for metric, (value, expiry) in self.metrics.items()
+                            if expiry > now}
+            metrics = sorted(self.metrics.items())
+        data = ''
+        typed = set()
+        for (key, labels), (value, _) in metrics:
+            if key not in typed:
+                typed.add(key)
+                data += '# TYPE {} gauge\n'.format(key)
+            label_str = ','.join('{}="{}"'.format(label_key, label_value) for label_key, label_value in labels)
+            data += '{}{{{}}} {}\n'.format(key, label_str, value) if label_str else '{} {}\n'.format(key, value)
+        if self.collectors:
+            data += generate_latest(self.registry).decode('utf-8')
+        return data
+
+    def push(self):
+        """
+        return: True while there is something to push or delete (including after a failed push), False when idle
+        """
+        data = self.exposition()
+        try:
+            if data:
+                self.session.put(url=self.url, data=data, timeout=PushGatewayPublisher.PUSH_INTERVAL)
+                self.pushed = True
+            elif self.pushed:
+                self.session.delete(url=self.url, timeout=PushGatewayPublisher.PUSH_INTERVAL)
+                self.pushed = False
+        except requests.RequestException as e:
+            log.warning("Failed to push metrics to {}: {}".format(self.url, e))
+        return bool(data) or self.pushed
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self.push():
+                # Pushed (or failed to): push again, or retry, after the interval
+                self._stop_event.wait(PushGatewayPublisher.PUSH_INTERVAL)
+            else:
+                self._wake_event.wait()
+                self._wake_event.clear()
+
+    def close(self, wait_expiry=False):
+        """
+        Stop pushing and delete the group; with wait_expiry (a one-shot push from the command line), first keep the
+        last metrics on the gateway until they expire, so they are scraped
+        """
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        self._wake_event.set()
+        self._thread.join()
+        with self._metrics_lock:
+            last_expiry = max((expiry for _, expiry in self.metrics.values()), default=0)
+        if wait_expiry and last_expiry > time.monotonic():
+            self.push()
+            time.sleep(max(last_expiry - time.monotonic(), 0))
+        with self._metrics_lock:
+            self.metrics = {}
+        for collector in self.collectors:
+            self.registry.unregister(collector)
+        self.collectors = []
+        self.push()
+
+
 class PrometheusMetricCollector(object):
     PUSH_GATEWAY_SERVER = "http://172.16.0.69:9091"  # public: 34.222.118.252
 
@@ -29,12 +166,25 @@ class PrometheusMetricCollector(object):
     SERVER_HOST = "localhost"
     SERVER_PORT = 8000  # HTTP server endpoint port
     SOCKET_PORT = 65432  # Port to listen on from client
+    CLIENT_DRAIN_TIMEOUT = 5  # seconds to ingest what connected clients sent before STOP
     INSTANCE_NAME = '-'.join(item for item in distro.linux_distribution() if item)
+    DOCKER_RUN = None  # running in docker; detected on first use
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # seconds
 
+    FAMILY_CLASSES = {
+        "gauge": GaugeMetricFamily,
+        "counter": CounterMetricFamily,
+        "histogram": HistogramMetricFamily,
+        "summary": SummaryMetricFamily,
+    }
 
     def __init__(self):
-        self.metrics = {}
-        self.labels_key_value = {}
+        self.series = {}  # (metric type, name) -> {label items: value}
+        self.buckets = {}  # histogram name -> bucket upper bounds
+        self.publisher = None
+        self._lock = threading.Lock()
+        self._stop_event = None  # set on the STOP message in listen mode
+        self._clients = {}  # client handler task -> (reader, writer) in listen mode
 
     def initilize_metrics_collection(self):
         """
@@ -64,107 +214,241 @@ class PrometheusMetricCollector(object):
 
         return key.strip(), value
 
+    @staticmethod
+    def is_docker_run():
+        """
+        Find if this script is running in docker (detected once)
+        """
+        if PrometheusMetricCollector.DOCKER_RUN is None:
+            path = '/proc/self/cgroup'
+            PrometheusMetricCollector.DOCKER_RUN = (os.path.exists('/.dockerenv') or
+                                                    os.path.isfile(path) and any('docker' in line
+                                                                                 for line in open(path)))
+        return PrometheusMetricCollector.DOCKER_RUN
+
+    def label_items(self, labels):
+        """
+        Series key of labels given as a dict or like "release:1.8,version:beta"
+        """
+        if isinstance(labels, str):
+            labels = self.parse_labels(labels)
+        return tuple(sorted((str(label_key), str(label_value)) for label_key, label_value in (labels or {}).items()))
+
+    def set_gauge(self, name, value, labels=None):
+        """
+        Set the value of a gauge series
+        @param labels: dict or "release:1.8,version:beta"
+        """
+        with self._lock:
+            self.series.setdefault(("gauge", name), {})[self.label_items(labels)] = float(value)
+
+    def inc_counter(self, name, amount=1, labels=None):
+        """
+        Add amount to a counter series
+        """
+        self.push_from_docker()
+        items = self.label_items(labels)
+        with self._lock:
+            series = self.series.setdefault(("counter", name), {})
+            series[items] = series.get(items, 0.0) + amount
+
+    def observe_histogram(self, name, value, labels=None, buckets=None):
+        """
+        Count value in the fixed buckets of a histogram series (example: an RPC latency in seconds)
+        @param buckets: upper bounds of the histogram, fixed by its first observation (DEFAULT_BUCKETS by default)
+        """
+        self.push_from_docker()
+        items = self.label_items(labels)
+        with self._lock:
+            bounds = self.buckets.setdefault(name, tuple(buckets or PrometheusMetricCollector.DEFAULT_BUCKETS))
+            series = self.series.setdefault(("histogram", name), {})
+            histogram = series.get(items)
+            if histogram is None:
+                histogram = series[items] = [[0] * len(bounds), 0, 0.0]  # counts per bucket, count, sum
+            index = bisect.bisect_left(bounds, value)
+            if index < len(bounds):
+                histogram[0][index] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def observe_summary(self, name, value, labels=None):
+        """
+        Add value to the count and sum of a summary series
+        """
+        self.push_from_docker()
+        items = self.label_items(labels)
+        with self._lock:
+            series = self.series.setdefault(("summary", name), {})
+            summary = series.get(items)
+            if summary is None:
+                summary = series[items] = [0, 0.0]  # count, sum
+            summary[0] += 1
+            summary[1] += value
+
+    def push_from_docker(self):
+        """
+        In docker (no scrape endpoint), push the aggregated series to the gateway in the background
+        """
+        if self.publisher is None and PrometheusMetricCollector.is_docker_run():
+            self.publisher = PushGatewayPublisher.get(PrometheusMetricCollector.PUSH_GATEWAY_SERVER,
+                                                      PrometheusMetricCollector.JOB_NAME,
+                                                      PrometheusMetricCollector.INSTANCE_NAME)
+            self.publisher.add_collector(self)
+
     def collect(self):
         """
-        Method to feed data as prometheus scrapes for metrics
-        """
-        for key, value in self.metrics.items():
-            if self.metrics[key] is not None:
-                if self.labels_key_value:
-                    label_str = ','.join(
-                        "{}:{}".format(label_key, label_value) for label_key, label_value in
-                        self.labels_key_value.items())
-                    log.info("{}{{{}}} {}".format(key, label_str, value))
-                    g = GaugeMetricFamily(key, PrometheusMetricCollector.METRIC_HELP_NOTE,
-                                          labels=self.labels_key_value.keys())
-                    g.add_metric([label_value for label_key, label_value in self.labels_key_value.items()], value)
-                    self.metrics[key] = None
-                    self.labels_key_value = {}
+        Method to feed data as prometheus scrapes for metrics: one family per metric, one sample per label set
+        """
+        with self._lock:
+            snapshot = copy.deepcopy(self.series)
+        for (metric_type, name), series in sorted(snapshot.items()):
+            label_names = sorted({label_key for items in series for label_key, _ in items})
+            family = PrometheusMetricCollector.FAMILY_CLASSES[metric_type](
+                name, PrometheusMetricCollector.METRIC_HELP_NOTE, labels=label_names)
+            for items, value in series.items():
+                label_key_value = dict(items)
+                label_values = [label_key_value.get(label_name, "") for label_name in label_names]
+                if metric_type == "histogram":
+                    counts, count, total = value
+                    buckets = []
+                    cumulative = 0
+                    for bound, bucket_count in zip(self.buckets[name], counts):
+                        cumulative += bucket_count
+                        buckets.append((str(bound), cumulative))
+                    buckets.append(("+Inf", count))
+                    family.add_metric(label_values, buckets, total)
+                elif metric_type == "summary":
+                    family.add_metric(label_values, count_value=value[0], sum_value=value[1])
                 else:
-                    log.info("{} {}".format(key, value))
-                    g = GaugeMetricFamily(key, PrometheusMetricCollector.METRIC_HELP_NOTE)
-                    g.add_metric([], value)
-                    self.metrics[key] = None
-                yield g
+                    family.add_metric(label_values, value)
+            yield family
+
+    def parse_labels(self, labels):
+        """
+        Parse labels like "release:1.8,version:beta" into a dict
+        """
+        label_key_value = {}
+        if labels:
+            for label in labels.split(','):
+                label_key, label_value = self.parse_data(label)
+                label_key_value[label_key] = label_value
+        return label_key_value
 
     def push_metric_to_gateway(self, push_gateway_server, metric, labels=None):
         """
-        Method to support variable endpoints (host with changing client IPs, like CI runners) using push gateway
+        Method to support variable endpoints (host with changing client IPs, like CI runners) using push gateway.
+        The metric is buffered and pushed in the background (PushGatewayPublisher); this call does not block.
         @param push_gateway_server: push gateway server
         @param metric: message to be parsed and sent to the push gateway
         """
         key, value = self.parse_data(metric)
-        data = '{} {}\n'.format(key, value)
-
-        url = '{}/metrics/job/{}/instance/{}'.format(push_gateway_server, PrometheusMetricCollector.JOB_NAME,
-                                                     PrometheusMetricCollector.INSTANCE_NAME)
-        if labels:
-            label_key_values = labels.split(',')
-            for label_key_value in label_key_values:
-                label_key, label_value = self.parse_data(label_key_value)
-                url += "/{}/{}".format(label_key, label_value)
-
-            label_str = ','.join(
-                "{}:{}".format(label_key_value.split(':')[0], label_key_value.split(':')[1]) for label_key_value in
-                label_key_values)
+        label_key_value = self.parse_labels(labels)
+        if label_key_value:
+            label_str = ','.join("{}:{}".format(label_key, label_value)
+                                 for label_key, label_value in label_key_value.items())
             log.info("{}{{{}}} {}".format(key, label_str, value))
         else:
             log.info("{} {}".format(key, value))
 
-        response = requests.post(url=url, data=data)
-        time.sleep(20)
-        response = requests.delete(url=url)
+        publisher = PushGatewayPublisher.get(push_gateway_server, PrometheusMetricCollector.JOB_NAME,
+                                             PrometheusMetricCollector.INSTANCE_NAME)
+        publisher.publish(key, value, label_key_value)
+        return publisher
+
+    def ingest(self, message):
+        """
+        Record one message of the listen mode protocol: key:value[/labels[/metric type]], where labels are like
+        release:1.8,version:beta and the metric type is gauge (default), counter, histogram or summary
+        return: False on the stop message, True otherwise
+        """
+        if message == PrometheusMetricCollector.CONNECTION_STOP_MSG:
+            return False
+        metric, labels, metric_type = (message.split(PrometheusMetricCollector.KEY_LABEL_DELIMITER) + [None, None])[:3]
+        try:
+            key, value = self.parse_data(metric)
+            value = float(value)
+            if metric_type in (None, "", "gauge"):
+                self.set_gauge(key, value, labels)
+            elif metric_type == "counter":
+                self.inc_counter(key, value, labels)
+            elif metric_type == "histogram":
+                self.observe_histogram(key, value, labels)
+            elif metric_type == "summary":
+                self.observe_summary(key, value, labels)
+            else:
+                raise ValueError("Unknown metric type '{}'".format(metric_type))
+        except ValueError as e:
+            log.error("Error: {} ({})".format(e, message))
+        return True
+
+    async def handle_client(self, reader, writer):
+        """
+        Ingest the newline-delimited messages of one client until it disconnects or sends STOP
+        """
+        log.debug("Connected by: {}".format(writer.get_extra_info('peername')))
+        handler = asyncio.current_task()
+        self._clients[handler] = (reader, writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = line.decode('utf-8').strip()
+                if message and not self.ingest(message):
+                    log.info("Received STOP")
+                    PrometheusMetricCollector.KEEP_CONNECTION_ALIVE = False
+                    self._stop_event.set()
+                    break
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            log.warning("Dropped client {}: {}".format(writer.get_extra_info('peername'), e))
+        finally:
+            self._clients.pop(handler, None)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def close_clients(self):
+        """
+        Stop reading from the connected clients, ingest the lines they already sent and close their connections
+        """
+        for reader, writer in list(self._clients.values()):
+            writer.transport.pause_reading()
+            reader.feed_eof()
+        if self._clients:
+            _, pending = await asyncio.wait(list(self._clients),
+                                            timeout=PrometheusMetricCollector.CLIENT_DRAIN_TIMEOUT)
+            for handler in pending:
+                handler.cancel()
+            if pending:
+                log.warning("Closed {} clients before their lines were ingested".format(len(pending)))
+                await asyncio.wait(pending)
+
+    async def serve(self):
+        """
+        Accept any number of concurrent clients until a STOP message
+        """
+        self._stop_event = asyncio.Event()
+        server = await asyncio.start_server(self.handle_client, PrometheusMetricCollector.SERVER_HOST,
+                                            PrometheusMetricCollector.SOCKET_PORT)
+        PrometheusMetricCollector.KEEP_CONNECTION_ALIVE = True
+        log.info("Listening for metrics on {}:{}".format(PrometheusMetricCollector.SERVER_HOST,
+                                                         PrometheusMetricCollector.SOCKET_PORT))
+        async with server:
+            await self._stop_event.wait()
+            server.close()
+            await self.close_clients()
 
     def listen(self):
         """
         Socket open to listen to data, that can be pushed to prometheus
         """
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.bind((PrometheusMetricCollector.SERVER_HOST, PrometheusMetricCollector.SOCKET_PORT))
-            s.listen()
-
-            PrometheusMetricCollector.KEEP_CONNECTION_ALIVE = True
-            while PrometheusMetricCollector.KEEP_CONNECTION_ALIVE:
-                conn, addr = s.accept()
-                with conn:
-                    log.info("\nConnected by: ".format(addr))
-                    while True:
-                        data = conn.recv(1024)
-                        data_str = data.decode('utf-8')
-
-                        if data_str:
-                            log.info("Received: {}".format(data_str))
-                            if data_str == PrometheusMetricCollector.CONNECTION_STOP_MSG:
-                                PrometheusMetricCollector.KEEP_CONNECTION_ALIVE = False
-                            else:
-                                if PrometheusMetricCollector.KEY_LABEL_DELIMITER in data_str:
-                                    metric = data_str.split(PrometheusMetricCollector.KEY_LABEL_DELIMITER)[0]
-                                    labels = data_str.split(PrometheusMetricCollector.KEY_LABEL_DELIMITER)[1]
-                                else:
-                                    metric = data_str
-                                    labels = None
-
-                                try:
-                                    key, value = metric.split(':')
-                                except Exception as e:
-                                    log.error("Error: {}".format(e))
-
-                                if key and value is not None:
-                                    log.info("{} {}".format(key, value))
-                                    self.metrics[key] = value
-
-                                    if labels:
-                                        label_key_values = labels.split(',')
-                                        for label_key_value in label_key_values:
-                                            key, value = self.parse_data(label_key_value)
-                                            self.labels_key_value[key] = value
-
-                        else:
-                            break
+        asyncio.run(self.serve())
 
     def send_data(self, msg, labels=None):
         """
-        send data to the listening socket
+        send data to the listening socket (ConnectionError if no exporter is listening)
         @param msg: message to be parsed and sent to the stream
         @param labels: Optional labels like "release:1.8,version=beta"
         """
@@ -177,16 +461,14 @@ class PrometheusMetricCollector(object):
 
             if labels:
                 send_msg = "{}{}{}".format(send_msg, PrometheusMetricCollector.KEY_LABEL_DELIMITER, labels)
-
-                label_str = ','.join(
-                    "{}:{}".format(label_key, label_value) for label_key, label_value in self.labels_key_value.items())
-                log.info("Pushing metric {}{{{}}} {}".format(key, label_str, value))
+                log.info("Pushing metric {}{{{}}} {}".format(key, labels, value))
             else:
                 log.info("Pushing metric {} {}".format(key, value))
 
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.connect((PrometheusMetricCollector.SERVER_HOST, PrometheusMetricCollector.SOCKET_PORT))
-            s.sendall(bytes(send_msg, encoding='utf-8'))
+        client = MetricClient.get()
+        client.send_message(send_msg)
+        if not client.flush():
+            raise ConnectionError("Cannot reach the exporter listening on {}:{}".format(*client.address))
 
     def send_metric(self, metric, labels=None, push_gateway_mode=False):
         """
@@ -195,10 +477,7 @@ class PrometheusMetricCollector(object):
         @param labels: Optional labels like "release:1.8,version=beta"
         @param push_gateway_mode: forcefully use push gateway
         """
-        # Find if this script is running in docker
-        path = '/proc/self/cgroup'
-        docker_run = (os.path.exists('/.dockerenv') or
-                      os.path.isfile(path) and any('docker' in line for line in open(path)))
+        docker_run = PrometheusMetricCollector.is_docker_run()
 
         key, value = self.parse_data(metric)
         try:
@@ -215,12 +494,109 @@ class PrometheusMetricCollector(object):
             log.debug("Pushing metric to endpoint: {}:{}".format(PrometheusMetricCollector.SERVER_HOST,
                                                                  PrometheusMetricCollector.SERVER_PORT))
 
-            self.metrics[key] = value
-            if labels:
-                label_key_values = labels.split(',')
-                for label_key_value in label_key_values:
-                    label_key, label_value = self.parse_data(label_key_value)
-                    self.labels_key_value[label_key] = label_value
+            self.set_gauge(key, value, labels)
+
+
+class MetricClient(object):
+    """
+    Persistent connection streaming metrics to an exporter in listen mode.
+
+    Messages are buffered and written as one batch of newline-delimited lines when BATCH_LINES are buffered, every
+    FLUSH_INTERVAL seconds (from a background thread) and on flush(), over a single connection reopened on error.
+    Thread safe; one client is kept per exporter address (get()).
+    """
+    BATCH_LINES = 1000  # buffered messages written at once
+    FLUSH_INTERVAL = 1  # seconds between background flushes
+    MAX_BUFFERED_LINES = 100000  # oldest messages are dropped beyond this while the exporter is unreachable
+
+    _clients = {}
+    _lock = threading.Lock()
+
+    def __init__(self, host=None, port=None):
+        self.address = (host or PrometheusMetricCollector.SERVER_HOST, port or PrometheusMetricCollector.SOCKET_PORT)
+        self.buffer = []
+        self.dropped = 0
+        self.socket = None
+        self._buffer_lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metric_client", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def get(cls, host=None, port=None):
+        address = (host or PrometheusMetricCollector.SERVER_HOST, port or PrometheusMetricCollector.SOCKET_PORT)
+        with cls._lock:
+            client = cls._clients.get(address)
+            if client is None or client._stop_event.is_set():
+                client = cls._clients[address] = cls(*address)
+        return client
+
+    def send(self, key, value, labels=None, metric_type=None):
+        """
+        Buffer a metric
+        @param labels: dict or "release:1.8,version:beta"
+        @param metric_type: gauge (default), counter (value is added), histogram or summary (value is observed)
+        """
+        if isinstance(labels, dict):
+            labels = ','.join("{}:{}".format(label_key, label_value) for label_key, label_value in labels.items())
+        message = "{}:{}".format(key, value)
+        if labels or metric_type:
+            message += "{}{}".format(PrometheusMetricCollector.KEY_LABEL_DELIMITER, labels or '')
+        if metric_type:
+            message += "{}{}".format(PrometheusMetricCollector.KEY_LABEL_DELIMITER, metric_type)
+        self.send_message(message)
+
+    def send_message(self, message):
+        with self._buffer_lock:
+            self.buffer.append(message)
+            if len(self.buffer) > MetricClient.MAX_BUFFERED_LINES:
+                del self.buffer[0]
+                self.dropped += 1
+            full = len(self.buffer) >= MetricClient.BATCH_LINES
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the buffered messages; they stay buffered if the exporter cannot be reached
+        """
+        with self._send_lock:
+            with self._buffer_lock:
+                lines, self.buffer = self.buffer, []
+            if not lines:
+                return True
+            data = ''.join("{}\n".format(line) for line in lines).encode('utf-8')
+            try:
+                if self.socket is None:
+                    self.socket = socket.create_connection(self.address)
+                self.socket.sendall(data)
+                return True
+            except OSError as e:
+                log.debug("Cannot send metrics to {}:{}: {}".format(*self.address, e))
+                if self.socket is not None:
+                    self.socket.close()
+                    self.socket = None
+                with self._buffer_lock:
+                    self.buffer = lines + self.buffer
+                return False
+
+    def _run(self):
+        while not self._stop_event.wait(MetricClient.FLUSH_INTERVAL):
+            self.flush()
+
+    def close(self):
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        self.flush()
+        if self.dropped:
+            log.warning("Dropped {} metrics not sent to {}:{}".format(self.dropped, *self.address))
+        with self._send_lock:
+            if self.socket is not None:
+                self.socket.close()
+                self.socket = None
 
 
 def main(metric, labels, listen_mode=False, stop_mode=False, push_gateway_server=None):
@@ -232,7 +608,8 @@ def main(metric, labels, listen_mode=False, stop_mode=False, push_gateway_server
         cc.send_data(PrometheusMetricCollector.CONNECTION_STOP_MSG)
     elif metric:
         if push_gateway_server:
-            cc.push_metric_to_gateway(push_gateway_server, metric, labels)
+            # Keep the metric on the gateway until it expires, then delete it
+            cc.push_metric_to_gateway(push_gateway_server, metric, labels).close(wait_expiry=True)
         else:
             cc.send_data(metric, labels)
     else:
@@ -0,0 +1,74 @@
+################################################################################
+# This script subscribes to the ledger and validations streams of every node
+# and reports, per validated ledger, the close interval, the spread of the
+# ledger's publication across nodes, the validation quorum latency (overall and
+# per node), validator disagreements, the nodes that validated another hash and
+# the nodes lagging behind.
+#
+# Usage:
+#   python3 scripts/track_consensus.py [optional parameters]
+#       [--nodes <comma-separated websocket host:port (default: localhost:6005)>]
+#       [--duration <seconds to track, 0 until interrupted (default: 0)>]
+#       [--output <JSON lines file the ledger summaries are appended to>]
+#       [--port <serve the timings to prometheus on this port>]
+#       [--quorum N] [--lagThreshold <seconds>]
+#
+# Example (from the workload container):
+#   python3 scripts/track_consensus.py --nodes val0:6005,val1:6005,val2:6005,val3:6005,val4:6005,val5:6005
+################################################################################
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests import constants
+from rippled_automation.rippled_end_to_end_scenarios.utils.consensus_tracker import ConsensusTracker
+
+logging.basicConfig(level=logging.INFO,
+                    format='\r%(asctime)s (%(filename)20s:%(lineno)-4s) %(levelname)-8s %(message)s',
+                    datefmt='%Y-%m-%d %H:%M:%S')
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Track ledger close and validation timings of every node")
+    parser.add_argument("--nodes", default="localhost:{}".format(constants.WS_STREAM_PORT),
+                        help="Comma-separated websocket host:port of each node")
+    parser.add_argument("--duration", type=float, default=0, help="Seconds to track (0: until interrupted)")
+    parser.add_argument("--output", default=None, help="JSON lines file the ledger summaries are appended to")
+    parser.add_argument("--port", type=int, default=None, help="Serve the timings to prometheus on this port")
+    parser.add_argument("--quorum", type=int, default=None,
+                        help="Validations needed to validate a ledger (default: the nodes' validation_quorum)")
+    parser.add_argument("--lagThreshold", type=float, default=constants.CONSENSUS_LAG_THRESHOLD,
+                        help="Seconds behind the first node before a node counts as lagging")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    tracker = ConsensusTracker(args.nodes.split(","), quorum=args.quorum, lag_threshold=args.lagThreshold)
+    if args.port:
+        from prometheus_client import REGISTRY, start_http_server
+        start_http_server(args.port)
+        REGISTRY.register(tracker)
+        logging.info("Serving consensus timings on port {}".format(args.port))
+
+    if not tracker.start(path=args.output):
+        sys.exit(1)
+    try:
+        if args.duration:
+            time.sleep(args.duration)
+        else:
+            while True:
+                time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tracker.stop()
+        tracker.log_summary()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,26 @@
-from random import SystemRandom
+from collections import defaultdict
+from random import Random, SystemRandom
 from types import SimpleNamespace
+import argparse
 import asyncio
 import logging as log
-import requests
+import os
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.realpath(__file__)), "auto"))
+from rippled_automation.rippled_end_to_end_scenarios.end_to_end_tests.async_rippled import AsyncRippledServer
+from rippled_automation.rippled_end_to_end_scenarios.utils import keypairs
+from rippled_automation.rippled_end_to_end_scenarios.utils.latency import TransactionLatencyRecorder
+from rippled_automation.rippled_end_to_end_scenarios.utils.node_pool import NodePool
+from rippled_automation.rippled_end_to_end_scenarios.utils.traffic import TrafficRecorder
+from rippled_automation.rippled_end_to_end_scenarios.workload.backpressure import AdaptiveRateController
+from rippled_automation.rippled_end_to_end_scenarios.workload.daemon import WorkloadDaemon
+from rippled_automation.rippled_end_to_end_scenarios.workload.distribution import IOUDistributor
+from rippled_automation.rippled_end_to_end_scenarios.workload.rate_control import OpenLoopGenerator, RateSchedule
+from rippled_automation.rippled_end_to_end_scenarios.workload.replay import TrafficReplayer
+from rippled_automation.rippled_end_to_end_scenarios.workload.state import WorkloadState
+from rippled_automation.rippled_end_to_end_scenarios.workload.tx_mix import TransactionMix, load_profile
+
 
 MAX_NUMBER_OF_ACCOUNTS = 50
 MAX_TOKEN = 1000
@@ -14,6 +30,7 @@ DEFAULT_PAYMENT = 1000_000000 # 1000 XRP per account by default
 log_level = log.INFO
 FORMAT = "[%(asctime)s %(filename)s->%(funcName)s() %(lineno)s] %(levelname)s: %(message)s"
 log.getLogger("urllib3").setLevel(log.WARNING)
+log.getLogger("rippled_automation.rippled_end_to_end_scenarios.utils.log_helper").setLevel(log_level)
 
 log.basicConfig(format=FORMAT,
     datefmt='%Y-%m-%d:%H:%M:%S',
@@ -21,32 +38,97 @@ log.basicConfig(format=FORMAT,
 )
 genesis_account = SimpleNamespace()
 genesis_account.account_id = "rHb9CJAWyB4rj91VRWn96DkukG4bwdtyTh"
-genesis_account.seed = "snoPBrXtMeMyMHUVTgbuqAfg1SUTb"
+genesis_account.master_seed = "snoPBrXtMeMyMHUVTgbuqAfg1SUTb"
 
-host, port = sys.argv[1:3]
+parser = argparse.ArgumentParser(description="Submit transactions to rippled")
+parser.add_argument("host")
+parser.add_argument("port")
+parser.add_argument("ws_port", nargs="?", default=6005)
+parser.add_argument("--tps", type=float, help="Open-loop mode: send payments at this target rate")
+parser.add_argument("--ramp", help="Open-loop rate schedule 'seconds:tps,...' (example: 0:10,60:100); overrides --tps")
+parser.add_argument("--arrival", choices=["constant", "poisson"], default="constant",
+                    help="Open-loop arrival process")
+parser.add_argument("--duration", type=float, help="Open-loop run time in seconds (default: forever)")
+parser.add_argument("--accounts", type=int, default=MAX_NUMBER_OF_ACCOUNTS, help="Open-loop accounts to fund")
+parser.add_argument("--maxInFlight", type=int, default=10000,
+                    help="Open-loop limit on outstanding sends; sends over it are skipped")
+parser.add_argument("--adaptive", action="store_true",
+                    help="Open-loop mode: start at --tps and adapt the rate to the server's load and transaction queue")
+parser.add_argument("--minTps", type=float, default=1, help="Adaptive mode rate floor")
+parser.add_argument("--maxTps", type=float, help="Adaptive mode rate ceiling")
+parser.add_argument("--profile", help="Open-loop weighted transaction mix (JSON/YAML workload profile) "
+                                      "instead of XRP payments")
+parser.add_argument("--daemon", action="store_true",
+                    help="Run rounds forever, reusing accounts, trust lines and NFTs checkpointed in --state")
+parser.add_argument("--state", default=os.path.expanduser("~/workload_state.json"), help="Daemon checkpoint file")
+parser.add_argument("--rounds", type=int, help="Daemon rounds to run (default: forever)")
+parser.add_argument("--roundSize", type=int, default=50, help="Daemon transactions per round")
+parser.add_argument("--nodes", help="Comma-separated host:port of more nodes to spread requests over")
+parser.add_argument("--nodePolicy", choices=["round_robin", "least_outstanding"], default="round_robin",
+                    help="How requests are spread over --nodes")
+parser.add_argument("--tickets", action="store_true",
+                    help="Fund accounts with tickets of the funding account instead of its sequence")
+parser.add_argument("--latencySummary", help="Write submit/validation latency histograms to this JSON file")
+parser.add_argument("--metricsPort", type=int, help="Serve latency histograms to Prometheus on this port")
+parser.add_argument("--seed", type=int, help="Seed the workload's random choices and account keys (reproducible runs "
+                                             "against a fresh network)")
+parser.add_argument("--record", help="Record every request and response to this file (.gz to compress)")
+parser.add_argument("--recordRoll", type=int,
+                    help="Start a new part of the --record file every this many requests (file.0001.jsonl.gz, ...)")
+parser.add_argument("--recordParts", type=int, help="Stop recording after this many --recordRoll parts")
+parser.add_argument("--replay", nargs="+",
+                    help="Resubmit the transactions of --record files (parts in order) instead of generating a workload")
+parser.add_argument("--replaySpeed", type=float, default=1.0,
+                    help="Replay speed relative to the recording (0: as fast as possible)")
+args = parser.parse_args()
+if args.profile and args.tps is None and not args.ramp and not args.adaptive:
+    parser.error("--profile needs --tps, --ramp or --adaptive")
+if args.tps is not None and args.tps <= 0:
+    parser.error("--tps must be positive")
+if args.minTps <= 0:
+    parser.error("--minTps must be positive")
+if args.ramp:
+    try:
+        RateSchedule.parse(ramp=args.ramp)
+    except ValueError as e:
+        parser.error("--ramp: {}".format(e))
+if args.record and args.daemon and os.path.exists(args.state):
+    parser.error("--record needs a clean --state: accounts of {} are not funded when the recording is replayed "
+                 "against a fresh network".format(args.state))
+if args.adaptive and args.ramp:
+    parser.error("--adaptive sets its own rate; use --tps for the starting rate")
+host, port, ws_port = args.host, args.port, args.ws_port
 # host, port = "172.18.0.5", 5005
 
-url  = f"http://{host}:{port}"
-
-urand = SystemRandom()
+urand = Random(args.seed) if args.seed is not None else SystemRandom()
+node_pool = None
+if args.nodes:
+    node_addresses = [f"{host}:{port}"] + [node for node in args.nodes.split(",")
+                                           if node and node != f"{host}:{port}"]
+    node_pool = NodePool([AsyncRippledServer(node_address, server_name=node_address) for node_address in node_addresses],
+                         policy=args.nodePolicy)
+traffic_recorder = TrafficRecorder(args.record, roll_requests=args.recordRoll, max_parts=args.recordParts,
+                                   seed=args.seed, argv=sys.argv[1:]) if args.record else None
+latency_recorder = TransactionLatencyRecorder() if args.latencySummary or args.metricsPort else None
+rippled = AsyncRippledServer(f"{host}:{port}", ws_address=f"{host}:{ws_port}", funding_tickets=args.tickets,
+                             node_pool=node_pool, latency_recorder=latency_recorder, traffic_recorder=traffic_recorder,
+                             wallet_rng=urand if args.seed is not None else None)
 randrange = urand.randrange
 sample = urand.sample
 
-s = requests.Session()
-
 async def current_ledger() -> int:
-    payload = {"method": "ledger_current"}
+    payload = {"method": "ledger_current", "params": [{}]}
     try:
-        tx_response = s.post(url, json=payload)
-        return int(tx_response.json()["result"]["ledger_current_index"])
+        result = await rippled.execute_command(payload, verbose=False)
+        return int(result["ledger_current_index"])
     except Exception as e:
         log.error(repr(e))
         raise
 
 async def wait_until_ledger(wait_for_ledger_index):
     log.debug(f"Waiting for {wait_for_ledger_index} to close...")
-    while await current_ledger() <= wait_for_ledger_index:
-        await asyncio.sleep(2)
+    while not await rippled.wait_for_ledger_close(wait_for_ledger_index + 1, verbose=False):
+        pass
     log.debug(f"Ledger {wait_for_ledger_index + 1} arrived.")
 
 async def wait_for_next_ledger():
@@ -55,22 +137,19 @@ async def wait_for_next_ledger():
 async def wait_for_n_ledgers(n):
     await wait_until_ledger(await current_ledger() + n)
 
-async def wallet_propose():
-    try:
-        response = s.post(url, json={"method": "wallet_propose"})
-        result = response.json()["result"]
-        account = SimpleNamespace()
-        account.account_id = result["account_id"]
-        account.seed = result["master_seed"]
-        return account
-    except Exception as e:
-        log.error(repr(e))
+def wallet_propose():
+    wallet = keypairs.generate_wallet(rng=rippled.wallet_rng)
+    account = SimpleNamespace()
+    account.account_id = wallet["account_id"]
+    account.master_seed = wallet["master_seed"]
+    return account
 
-async def send_payment(destination, source=genesis_account, amount: dict|int=DEFAULT_PAYMENT):
+async def send_payment(destination, source=genesis_account, amount: dict|int=DEFAULT_PAYMENT, retry_high_fee=True):
+    # Without retry_high_fee, fee and queue refusals are returned for the caller to back off on
     payment_payload = {
         "method": "submit",
         "params": [{
-            "secret": source.seed,
+            "secret": source.master_seed,
             "tx_json": {
                 "TransactionType": "Payment",
                 "Account": source.account_id,
@@ -84,13 +163,11 @@ async def send_payment(destination, source=genesis_account, amount: dict|int=DEF
     # payment_payload.update({"method": "whoops"}) if urand(2) else ""
     try:
         wait = 3
-        response = s.post(url, json=payment_payload)
-        result = response.json()["result"]
-        while result.get("error") == "highFee":
+        result = await rippled.execute_command(payment_payload, verbose=False, retry_busy=retry_high_fee)
+        while retry_high_fee and result.get("error") == "highFee":
             print("Waiting for fee to die down.")
             await wait_for_n_ledgers(wait)
-            response = s.post(url, json=payment_payload)
-            result = response.json()["result"]
+            result = await rippled.execute_command(payment_payload, verbose=False)
             if result.get("error") == "highFee":
                 wait += 1
         # log.debug(json.dumps(result, indent=2))
@@ -100,50 +177,18 @@ async def send_payment(destination, source=genesis_account, amount: dict|int=DEF
         raise
 
 async def create_account():
-    account = await wallet_propose()
+    account = wallet_propose()
     try:
-        send_payment_response = await send_payment(destination=account)
+        if rippled.funding_tickets:
+            send_payment_response = await rippled.fund_account(account.account_id, str(DEFAULT_PAYMENT),
+                                                               wait_for_ledger_close=False, verbose=False)
+        else:
+            send_payment_response = await send_payment(destination=account)
         return (send_payment_response.get("status"), account)
     except Exception as e:
         log.error(repr(e))
         raise
 
-async def create_trustline(account, amount, limit=1e15):
-    trustline_limit = dict(amount, value=str(int(limit)))
-
-    log.debug((f"Creating Trustline for {account.account_id} for {limit} {amount['currency']}"))
-    log.debug(f"\tissued by: {amount['issuer']}")
-
-    trustset_payload = {
-        "method": "submit",
-        "params": [{
-            "tx_json": {
-                "TransactionType": "TrustSet",
-                "Account": account.account_id,
-                "LimitAmount": trustline_limit
-            },
-            "secret": account.seed
-        }]
-    }
-    try:
-        response = s.post(url, json=trustset_payload)
-        result = response.json()["result"]
-        await wait_for_next_ledger()
-        return result
-    except Exception as e:
-        log.error(repr(e))
-        raise
-
-async def distribute_currency(source, destination, currency: str="USD", amount: str="1000"):
-    token = {
-        "issuer": source.account_id,
-        "currency": currency,
-        }
-    await asyncio.sleep(3)
-    result = await create_trustline(destination, token)
-    payment_amount = dict(token, value=amount)
-    await send_payment(destination, source, payment_amount)
-
 async def mint_nft(account, taxon=0):
     payload = {
         "method": "submit",
@@ -153,13 +198,12 @@ async def mint_nft(account, taxon=0):
                 "Account": account.account_id,
                 "NFTokenTaxon": taxon
             },
-            "secret": account.seed
+            "secret": account.master_seed
         }]
     }
-    mint_response = s.post(url, json=payload)
+    mint_response = await rippled.execute_command(payload, verbose=False)
     log.debug(mint_response)
-    if mint_response.json()["result"]["status"] == "success":
-        log.debug(mint_response.json()["result"])
+    if mint_response["status"] == "success":
         log.debug("Minted nft")
     return mint_response
 
@@ -188,13 +232,100 @@ async def main():
 async def distribute(accounts):
     number_of_accounts = len(accounts)
     print(f"{len(accounts)} accounts created.")
+    issuers = {}
+    holders = defaultdict(dict)
     async with asyncio.TaskGroup() as tg:
-        # print(accounts)
         for _ in range(randrange(number_of_accounts)):
             alice, bob = sample(accounts, 2)
-            random_amount = str(randrange(MAX_TOKEN))
-            tg.create_task(distribute_currency(alice, bob, amount=random_amount))
+            issuers[alice.account_id] = alice
+            holders[alice.account_id][bob.account_id] = bob
             tg.create_task(mint_nft(alice, taxon=0))
+        # Each issuer's holders get their trust lines in one ledger and their tokens in the next
+        for issuer_id, issuer_holders in holders.items():
+            distributor = IOUDistributor(rippled, issuers[issuer_id], "USD", limit=int(1e15))
+            tg.create_task(distributor.distribute(list(issuer_holders.values()), str(randrange(1, MAX_TOKEN))))
+
+async def create_accounts(number_of_accounts):
+    accounts = []
+    async with asyncio.TaskGroup() as tg:
+        results = [tg.create_task(create_account()) for _ in range(number_of_accounts)]
+    for result in results:
+        status, account = result.result()
+        if status == "success":
+            accounts.append(account)
+    await wait_for_next_ledger()
+    log.info(f"Funded {len(accounts)} of {number_of_accounts} accounts.")
+    return accounts
+
+async def send_random_payment(accounts, retry_high_fee=True):
+    alice, bob = sample(accounts, 2)
+    return await send_payment(bob, alice, amount=str(randrange(1, MAX_TOKEN)), retry_high_fee=retry_high_fee)
+
+async def open_loop(tps, ramp=None, arrival="constant", duration=None, number_of_accounts=MAX_NUMBER_OF_ACCOUNTS,
+                    max_in_flight=10000, profile=None, adaptive=False, min_tps=1, max_tps=None):
+    # Adaptive mode backs off on highFee and queue refusals itself rather than retrying sends
+    controller = AdaptiveRateController(rippled, initial_tps=tps, min_tps=min_tps, max_tps=max_tps) \
+        if adaptive else None
+    if profile:
+        mix = TransactionMix(rippled, load_profile(profile), rng=urand, retry_busy=controller is None)
+        await mix.setup()
+        send = mix.send
+    else:
+        mix = None
+        accounts = await create_accounts(max(number_of_accounts, 2))
+        if len(accounts) < 2:
+            raise Exception("Not enough funded accounts to send payments")
+        send = lambda: send_random_payment(accounts, retry_high_fee=controller is None)
+
+    async def next_ledger():
+        ledger_index = await current_ledger()
+        await wait_until_ledger(ledger_index)
+        if controller:
+            await controller.update(generator.results)
+        if rippled.node_pool:
+            await rippled.node_pool.log_status()
+        return ledger_index
+
+    generator = OpenLoopGenerator(send, controller or RateSchedule.parse(tps, ramp),
+                                  arrival=arrival, max_in_flight=max_in_flight, rng=urand)
+    reporter = asyncio.create_task(generator.report_per_ledger(next_ledger))
+    try:
+        await generator.run(duration)
+    finally:
+        reporter.cancel()
+    log.info(f"Sent {generator.sent} of {generator.scheduled} scheduled transactions "
+             f"({generator.skipped} skipped, {generator.failed} failed) in {generator.elapsed():.1f} s.")
+    if mix:
+        log.info(f"Results by transaction: {mix.summary()}")
+
+async def legacy():
+    accounts = await main()
+    await distribute(accounts)
+
+async def run(workload):
+    if latency_recorder:
+        latency_recorder.start_publishing(summary_path=args.latencySummary, metrics_port=args.metricsPort)
+    try:
+        await workload
+    finally:
+        if latency_recorder:
+            latency_recorder.stop()
+            latency_recorder.log_summary()
+        if traffic_recorder:
+            traffic_recorder.close()
+
+async def replay(paths):
+    for path in paths:
+        await TrafficReplayer.from_file(rippled, path, speed=args.replaySpeed).run()
 
-accounts = asyncio.run(main())
-asyncio.run(distribute(accounts))
+if args.replay:
+    asyncio.run(run(replay(args.replay)))
+elif args.daemon:
+    daemon = WorkloadDaemon(rippled, WorkloadState(args.state), target_accounts=args.accounts,
+                            round_size=args.roundSize, rng=urand)
+    asyncio.run(run(daemon.run(args.rounds)))
+elif args.tps is not None or args.ramp or args.adaptive:
+    asyncio.run(run(open_loop(args.tps, args.ramp, args.arrival, args.duration, args.accounts, args.maxInFlight,
+                              args.profile, args.adaptive, args.minTps, args.maxTps)))
+else:
+    asyncio.run(run(legacy()))
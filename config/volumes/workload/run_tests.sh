@@ -29,8 +29,31 @@ sed -i 's/snRzwEoNTReyuvz6Fb1CDXcaJUQdp/snoPBrXtMeMyMHUVTgbuqAfg1SUTb/' ./ripple
 
 echo "Workload initialization complete"
 
+# Spread the workload over this node and every validator
+NODES=""
+for node in "$@"; do
+  NODES="${NODES:+${NODES},}${node}:5005"
+done
+
+# WORKLOAD_RECORD=1 records the traffic of each iteration for replay against a fresh network: the iteration then
+# starts from a clean state (its own checkpoint file) and a seed, and rolls over to a new file every
+# WORKLOAD_RECORD_ROLL requests, stopping after WORKLOAD_RECORD_PARTS files. Replay the files of every iteration
+# in order (more_txns.py --replay)
+OUTPUT_DIR=${ANTITHESIS_OUTPUT_DIR:-.}
+SEED=${WORKLOAD_SEED:-$RANDOM}
+
 while true; do
   echo "Iteration ${it:=1}"
-  python ~/more_txns.py localhost 5005
+  STATE=~/workload_state.json
+  RECORD=()
+  if [ "${WORKLOAD_RECORD:-0}" = "1" ]; then
+    STATE=${OUTPUT_DIR}/workload_state_${it}.json
+    rm -f "${STATE}"
+    echo "Recording with seed $((SEED + it))"
+    RECORD=(--seed $((SEED + it)) --record ${OUTPUT_DIR}/workload_traffic_${it}.jsonl.gz
+            --recordRoll ${WORKLOAD_RECORD_ROLL:-100000} --recordParts ${WORKLOAD_RECORD_PARTS:-20})
+  fi
+  python ~/more_txns.py localhost 5005 --daemon --state "${STATE}" --nodes "${NODES}" --tickets \
+    --latencySummary ${OUTPUT_DIR}/latency_summary.json "${RECORD[@]}"
   ((it++))
 done